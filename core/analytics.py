@@ -0,0 +1,206 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, DateField, Q, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from .generation import proficiency_band
+from .models import Interview, InterviewOutcomeRollup, ProgrammingSkill, Question, Response, SkillScoreRollup
+
+# Dashboards read only the rollup tables. Scores are added as responses are
+# inserted (core.scoring) and outcomes as interviews complete, so reads cost
+# the same however much history there is. Each score stays in the band its
+# skill had when it was scored. rebuild() recomputes both from scratch, e.g.
+# after changing ANALYTICS_PASS_SCORE.
+
+PERIODS = ('day', 'week', 'month')
+BUCKETS = 10
+
+
+def score_bucket(score):
+    # Scores run 0-100; 100 shares the top bucket
+    return min(int(score // 10), BUCKETS - 1)
+
+
+def bucket_label(bucket):
+    return f"{bucket * 10}-{bucket * 10 + 10}"
+
+
+def _increment(model, key_fields, rows):
+    """Add each row's deltas to the rollup row with its key, creating it when missing, in one statement.
+
+    `rows` maps key tuples to {field: delta}. Rollup counters are written only
+    as increments, so concurrent writers never overwrite each other's totals.
+    """
+    if not rows:
+        return
+    counters = list(next(iter(rows.values())))
+    fields = [model._meta.get_field(name) for name in (*key_fields, *counters)]
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    columns = [quote(field.column) for field in fields]
+    placeholders = '(' + ', '.join(['%s'] * len(fields)) + ')'
+    params = []
+    for key, deltas in rows.items():
+        values = (*key, *(deltas[name] for name in counters))
+        params.extend(field.get_db_prep_value(value, connection) for field, value in zip(fields, values))
+    updates = ', '.join(f"{column} = {table}.{column} + EXCLUDED.{column}" for column in columns[len(key_fields):])
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join([placeholders] * len(rows))} "
+            f"ON CONFLICT ({', '.join(columns[:len(key_fields)])}) DO UPDATE SET {updates}",
+            params
+        )
+
+
+def _skills(questions):
+    # Skills the callers already loaded are reused; the rest come in one query
+    skills = {question.skill_id: question.skill for question in questions if Question.skill.is_cached(question)}
+    missing = {question.skill_id for question in questions} - skills.keys()
+    if missing:
+        skills.update(ProgrammingSkill.objects.in_bulk(missing))
+    return skills
+
+
+def rollup_key(skill):
+    # (language, band) for a skill as it is now, or (None, None) when there is none
+    return (skill.language, proficiency_band(skill.proficiency)) if skill else (None, None)
+
+
+def stamp(responses):
+    """Set each response's rollup_language/rollup_band from its question's skill before the response is saved."""
+    skills = _skills([response.question for response in responses if response.question.skill_id])
+    for response in responses:
+        response.rollup_language, response.rollup_band = rollup_key(skills.get(response.question.skill_id))
+
+
+def record_scores(changes):
+    """Apply (language, band, score, sign) changes to the skill rollup; call inside the transaction that writes the scores."""
+    rows = defaultdict(lambda: {'responses': 0, 'score_sum': 0.0})
+    for language, band, score, sign in changes:
+        if score is None or language is None:
+            continue
+        row = rows[(language, band, score_bucket(score))]
+        row['responses'] += sign
+        row['score_sum'] += sign * score
+    _increment(SkillScoreRollup, ('language', 'band', 'bucket'), rows)
+
+
+def record_responses(responses):
+    record_scores([(response.rollup_language, response.rollup_band, response.score, 1) for response in responses])
+
+
+def _completion_day(completed_at, created_at):
+    # Interviews completed before completed_at existed count on their creation day
+    return timezone.localdate(completed_at or created_at)
+
+
+def _add_outcome(rows, day, total_score, question_count, sign):
+    row = rows[(day,)]
+    row['completed'] += sign
+    row['passed'] += sign if total_score is not None and total_score >= settings.ANALYTICS_PASS_SCORE else 0
+    row['score_sum'] += sign * (total_score or 0)
+    row['question_count'] += sign * question_count
+
+
+def record_completion(interview, total_score, completed_at):
+    """Count `interview` as completed; `interview` still holds its state from before this completion.
+
+    Completing an interview again moves it: its earlier outcome is taken back
+    out of the rollup before the new one is added.
+    """
+    question_count = getattr(interview, 'question_count', None)
+    if question_count is None:
+        question_count = interview.questions.count()
+    rows = defaultdict(lambda: {'completed': 0, 'passed': 0, 'score_sum': 0.0, 'question_count': 0})
+    if interview.status == 'completed':
+        _add_outcome(rows, _completion_day(interview.completed_at, interview.created_at), interview.total_score, question_count, -1)
+    _add_outcome(rows, _completion_day(completed_at, None), total_score, question_count, 1)
+    _increment(InterviewOutcomeRollup, ('day',), rows)
+
+
+def rebuild(chunk_size=2000):
+    """Recompute both rollups from every response and completed interview; returns the rows written."""
+    skill_rows = defaultdict(lambda: {'responses': 0, 'score_sum': 0.0})
+    responses = (
+        Response.objects.filter(score__isnull=False)
+        .filter(Q(rollup_language__isnull=False) | Q(question__skill__isnull=False))
+        .values_list('score', 'rollup_language', 'rollup_band', 'question__skill__language', 'question__skill__proficiency')
+    )
+    for score, language, band, skill_language, proficiency in responses.iterator(chunk_size=chunk_size):
+        # Responses scored before the rollup key was recorded count under the skill as it is now
+        if language is None:
+            language, band = skill_language, proficiency_band(proficiency)
+        row = skill_rows[(language, band, score_bucket(score))]
+        row['responses'] += 1
+        row['score_sum'] += score
+
+    outcome_rows = defaultdict(lambda: {'completed': 0, 'passed': 0, 'score_sum': 0.0, 'question_count': 0})
+    interviews = (
+        Interview.objects.filter(status='completed').annotate(question_count=Count('questions'))
+        .values_list('completed_at', 'created_at', 'total_score', 'question_count')
+    )
+    for completed_at, created_at, total_score, question_count in interviews.iterator(chunk_size=chunk_size):
+        _add_outcome(outcome_rows, _completion_day(completed_at, created_at), total_score, question_count, 1)
+
+    with transaction.atomic():
+        SkillScoreRollup.objects.all().delete()
+        InterviewOutcomeRollup.objects.all().delete()
+        SkillScoreRollup.objects.bulk_create(
+            [SkillScoreRollup(language=language, band=band, bucket=bucket, **totals)
+             for (language, band, bucket), totals in skill_rows.items()],
+            batch_size=500
+        )
+        InterviewOutcomeRollup.objects.bulk_create(
+            [InterviewOutcomeRollup(day=day, **totals) for (day,), totals in outcome_rows.items()],
+            batch_size=500
+        )
+    return len(skill_rows) + len(outcome_rows)
+
+
+def _ratio(numerator, denominator, digits=2):
+    return round(numerator / denominator, digits) if denominator else None
+
+
+def skill_summary(language=None):
+    rows = SkillScoreRollup.objects.filter(responses__gt=0).order_by('language', 'band', 'bucket')
+    if language:
+        rows = rows.filter(language__iexact=language)
+    summary = {}
+    for row in rows:
+        entry = summary.setdefault((row.language, row.band), {
+            'language': row.language, 'band': row.band, 'responses': 0, 'score_sum': 0.0,
+            'distribution': {bucket_label(bucket): 0 for bucket in range(BUCKETS)}
+        })
+        entry['responses'] += row.responses
+        entry['score_sum'] += row.score_sum
+        entry['distribution'][bucket_label(row.bucket)] = row.responses
+    for entry in summary.values():
+        entry['average_score'] = _ratio(entry.pop('score_sum'), entry['responses'])
+    return list(summary.values())
+
+
+def outcome_summary(period='day', since=None, until=None):
+    rows = InterviewOutcomeRollup.objects.all()
+    if since:
+        rows = rows.filter(day__gte=since)
+    if until:
+        rows = rows.filter(day__lte=until)
+    rows = (
+        rows.annotate(period=Trunc('day', period, output_field=DateField())).values('period')
+        .annotate(completed=Sum('completed'), passed=Sum('passed'), score_sum=Sum('score_sum'), question_count=Sum('question_count'))
+        .order_by('period')
+    )
+    return [
+        {
+            'period': row['period'],
+            'completed': row['completed'],
+            'passed': row['passed'],
+            'pass_rate': _ratio(row['passed'], row['completed'], 4),
+            'average_score': _ratio(row['score_sum'], row['completed']),
+            'average_questions': _ratio(row['question_count'], row['completed']),
+        }
+        for row in rows if row['completed']
+    ]
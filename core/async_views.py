@@ -0,0 +1,114 @@
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from . import llm
+from .authentication import CachedJWTAuthentication
+from .evaluation import aevaluate_answer
+from .generation import QuestionGenerationError, agenerate_interview_questions
+from .models import Interview, Question, Response as ResponseModel
+from .scoring import add_responses
+from .serializers import ResponseSerializer
+from .views import rate_limited_response
+
+logger = logging.getLogger(__name__)
+
+# Async twins of the InterviewViewSet actions that wait on the model. Under an
+# ASGI server the model call is awaited on the event loop, so an in-flight
+# evaluation costs a coroutine rather than a worker thread. DRF views are
+# sync-only, so these are plain Django views with JWT auth done by hand.
+
+
+async def _authenticate(request):
+    try:
+        authenticated = await sync_to_async(CachedJWTAuthentication().authenticate)(request)
+    except (AuthenticationFailed, InvalidToken):
+        return None
+    return authenticated[0] if authenticated else None
+
+
+def _visible_interviews(user):
+    # Same visibility rule as InterviewViewSet.get_queryset
+    return Interview.objects.all() if user.is_recruiter else Interview.objects.filter(candidate=user)
+
+
+def _error(message, status, **extra):
+    return JsonResponse({"error": message, **extra}, status=status)
+
+
+@csrf_exempt
+@require_POST
+async def generate_questions(request, pk):
+    user = await _authenticate(request)
+    if user is None:
+        return _error("Authentication credentials were not provided.", 401)
+
+    logger.info('Starting async question generation for interview %s', pk)
+    interview = await _visible_interviews(user).filter(pk=pk).afirst()
+    if not interview:
+        return _error("Not found.", 404)
+
+    try:
+        payload = await agenerate_interview_questions(interview)
+    except llm.LLMRateLimited as e:
+        return rate_limited_response("Question generation is rate limited, retry later", e, JsonResponse)
+    except QuestionGenerationError as e:
+        extra = {"failed_skills": e.failed_skills} if e.failed_skills else {}
+        return _error(str(e), e.status_code, **extra)
+    except Exception as e:
+        logger.exception("Critical error: %s", e)
+        return _error("Failed to generate questions", 500, details=str(e))
+    return JsonResponse(payload, status=201)
+
+
+@csrf_exempt
+@require_POST
+async def submit_response(request, pk):
+    user = await _authenticate(request)
+    if user is None:
+        return _error("Authentication credentials were not provided.", 401)
+
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return _error("Request body must be JSON", 400)
+    if not isinstance(data, dict):
+        return _error("Request body must be a JSON object", 400)
+    question_id = data.get('question_id')
+    response_content = data.get('content')
+    if not question_id or not response_content:
+        return _error("Missing question_id or content", 400)
+    try:
+        question_id = int(question_id)
+    except (TypeError, ValueError):
+        return _error("Invalid question_id", 400)
+
+    interview = await _visible_interviews(user).filter(pk=pk).afirst()
+    if not interview:
+        return _error("Not found.", 404)
+    question = await Question.objects.select_related('skill').filter(id=question_id, interview=interview).afirst()
+    if not question:
+        return _error("Question not found", 404)
+
+    try:
+        score, feedback = await aevaluate_answer(question.content, response_content)
+        response_obj, = await sync_to_async(add_responses)(interview, [ResponseModel(
+            question=question,
+            content=response_content,
+            score=score,
+            feedback=feedback
+        )])
+    except llm.LLMRateLimited as e:
+        return rate_limited_response("Evaluation is rate limited, retry later", e, JsonResponse)
+    except llm.LLMUnavailable as e:
+        return _error("Evaluation service unavailable", 503, details=str(e))
+    except Exception as e:
+        logger.exception("Failed to evaluate response: %s", e)
+        return _error("Failed to evaluate response", 500, details=str(e))
+    return JsonResponse(ResponseSerializer(response_obj).data, status=201)
@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .models import User
+
+
+def user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def _cache():
+    return caches[settings.AUTH_USER_CACHE]
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that resolves the token's user from Django's cache instead of querying on every request.
+
+    Entries expire after AUTH_USER_CACHE_TTL seconds and are dropped whenever the
+    user is saved or deleted, so role, password and is_active changes apply on the
+    next request. With a shared cache (REDIS_URL) that holds in every process; with
+    the per-process LocMemCache fallback other processes see the change once the
+    TTL runs out, which is why it then defaults to 5 seconds.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = self._cached_user(user_id)
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
+
+    def _cached_user(self, user_id):
+        ttl = settings.AUTH_USER_CACHE_TTL
+        key = user_cache_key(user_id)
+        user = _cache().get(key) if ttl else None
+        if user is None:
+            try:
+                user = self.user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            if ttl:
+                _cache().set(key, user, ttl)
+        return user
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def _invalidate_cached_user(sender, instance, **kwargs):
+    key = user_cache_key(getattr(instance, api_settings.USER_ID_FIELD))
+    _cache().delete(key)
+    # Deleted again after commit, in case a request re-cached the old row in between
+    transaction.on_commit(lambda: _cache().delete(key))
@@ -0,0 +1,165 @@
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.db import connection, connections
+from django.test import Client
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import Interview, ProgrammingSkill, User
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies, elapsed, errors=0):
+    """Throughput and latency percentiles (milliseconds) for a list of per-operation seconds."""
+    return {
+        'operations': len(latencies),
+        'errors': errors,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_per_s': round(len(latencies) / elapsed, 2) if elapsed else None,
+        'p50_ms': _ms(percentile(latencies, 50)),
+        'p95_ms': _ms(percentile(latencies, 95)),
+        'p99_ms': _ms(percentile(latencies, 99)),
+        'max_ms': _ms(max(latencies) if latencies else None),
+    }
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+@contextmanager
+def temporary_database():
+    """Create a throwaway copy of the configured database for a benchmark run.
+
+    SQLite runs use a temporary file rather than the in-memory test database
+    so journal settings (WAL, busy timeout) and cross-thread locking behave as
+    they do in production.
+    """
+    settings_dict = connection.settings_dict
+    tmpdir = None
+    if connection.vendor == 'sqlite':
+        tmpdir = tempfile.mkdtemp(prefix='interview-ai-bench-')
+        settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(tmpdir, 'bench.sqlite3')
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield connection.settings_dict['NAME']
+    finally:
+        connections.close_all()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        if tmpdir:
+            for name in os.listdir(tmpdir):
+                os.remove(os.path.join(tmpdir, name))
+            os.rmdir(tmpdir)
+
+
+API_OPERATIONS = ('register', 'login', 'generate_questions', 'submit_response', 'complete_interview')
+BENCH_SKILLS = [('Python', 3), ('Go', 6), ('Rust', 9)]
+
+
+def run_api_load(users, concurrency, answers=None, prefix='bench'):
+    """Walk `users` new candidates through the interview flow, `concurrency` at a time.
+
+    Each flow registers and logs in a candidate, seeds their skills and an
+    interview, then generates questions, submits up to `answers` responses and
+    completes the interview, all through the full request stack with JWT auth.
+    Returns throughput and latency per operation and overall; non-2xx
+    responses, including 500s from views that raised, count as errors of
+    their operation.
+    """
+    recruiter = User.objects.create_user(username=f'{prefix}-recruiter', email=f'{prefix}-recruiter@example.com',
+                                         password='bench-password', is_recruiter=True)
+    recruiter_auth = f'Bearer {RefreshToken.for_user(recruiter).access_token}'
+    latencies = {operation: [] for operation in API_OPERATIONS}
+    errors = {operation: 0 for operation in API_OPERATIONS}
+    aborted = []
+    lock = threading.Lock()
+
+    def timed(operation, call):
+        began = time.perf_counter()
+        response = call()
+        elapsed = time.perf_counter() - began
+        with lock:
+            if 200 <= response.status_code < 300:
+                latencies[operation].append(elapsed)
+                return response
+            errors[operation] += 1
+        return None
+
+    def flow(index):
+        # Server errors come back as 500 responses. Letting the client re-raise them is not
+        # thread-safe: got_request_exception is process-wide, so every client mid-request would re-raise
+        client = Client(raise_request_exception=False)
+        username = f'{prefix}-candidate-{index}'
+        credentials = {'username': username, 'password': 'bench-password'}
+        if not timed('register', lambda: client.post('/register/', dict(credentials, email=f'{username}@example.com'),
+                                                      content_type='application/json')):
+            return
+        response = timed('login', lambda: client.post('/login/', credentials, content_type='application/json'))
+        if not response:
+            return
+        candidate_auth = f"Bearer {response.json()['access']}"
+
+        candidate = User.objects.get(username=username)
+        ProgrammingSkill.objects.bulk_create([
+            ProgrammingSkill(user=candidate, language=language, proficiency=proficiency)
+            for language, proficiency in BENCH_SKILLS
+        ])
+        interview = Interview.objects.create(recruiter=recruiter, candidate=candidate)
+
+        response = timed('generate_questions', lambda: client.post(
+            f'/interviews/{interview.pk}/generate-questions/', HTTP_AUTHORIZATION=recruiter_auth
+        ))
+        if not response:
+            return
+        question_ids = [question['id'] for skill in response.json()['questions_by_skill'] for question in skill['questions']]
+        for question_id in question_ids[:answers]:
+            timed('submit_response', lambda: client.post(f'/interviews/{interview.pk}/submit-response/', {
+                'question_id': question_id, 'content': f'Answer {index}-{question_id}: it depends on the workload.'
+            }, content_type='application/json', HTTP_AUTHORIZATION=candidate_auth))
+        timed('complete_interview', lambda: client.post(
+            f'/interviews/{interview.pk}/complete-interview/', HTTP_AUTHORIZATION=recruiter_auth
+        ))
+
+    def guarded(index):
+        try:
+            flow(index)
+        except Exception as e:
+            # e.g. "database is locked" while seeding; the flow is reported as aborted
+            with lock:
+                aborted.append(f"{type(e).__name__}: {e}")
+
+    def in_thread(index):
+        try:
+            guarded(index)
+        finally:
+            connections.close_all()
+
+    began = time.perf_counter()
+    if concurrency <= 1:
+        for index in range(users):
+            guarded(index)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='bench') as executor:
+            list(executor.map(in_thread, range(users)))
+    elapsed = time.perf_counter() - began
+
+    return {
+        'users': users,
+        'concurrency': concurrency,
+        'overall': summarize([value for values in latencies.values() for value in values], elapsed,
+                             errors=sum(errors.values()) + len(aborted)),
+        'operations': {operation: summarize(latencies[operation], elapsed, errors[operation]) for operation in API_OPERATIONS},
+        'aborted_flows': len(aborted),
+        'abort_reasons': sorted(set(aborted))[:10],
+    }
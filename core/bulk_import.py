@@ -0,0 +1,201 @@
+import codecs
+import csv
+import json
+import logging
+import os
+from itertools import islice
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import Q
+
+from .models import GenerationJob, Interview, ProgrammingSkill, User
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson'}
+
+
+class ImportFormatError(Exception):
+    pass
+
+
+class RowError(ValueError):
+    pass
+
+
+def format_from_name(name):
+    return EXTENSIONS.get(os.path.splitext(name or '')[1].lower())
+
+
+def read_rows(stream, fmt):
+    """Yield (line, fields, error) for each row of a CSV or NDJSON byte stream.
+
+    The stream is decoded and parsed line by line, so an upload is never held in
+    memory whole. Rows that cannot be parsed come back with an error and no fields.
+    """
+    lines = codecs.iterdecode(stream, 'utf-8-sig')
+    try:
+        if fmt == 'csv':
+            reader = csv.DictReader(lines)
+            if 'candidate' not in (reader.fieldnames or []):
+                raise ImportFormatError("CSV header must include a 'candidate' column")
+            for fields in reader:
+                yield reader.line_num, fields, None
+        elif fmt == 'ndjson':
+            for line, text in enumerate(lines, 1):
+                if not text.strip():
+                    continue
+                try:
+                    fields = json.loads(text)
+                except ValueError:
+                    yield line, None, "Invalid JSON"
+                else:
+                    yield line, fields, None
+        else:
+            raise ImportFormatError("Send text/csv or application/x-ndjson, or upload a .csv/.ndjson file")
+    except UnicodeDecodeError:
+        raise ImportFormatError("File is not valid UTF-8")
+    except csv.Error as e:
+        raise ImportFormatError(f"Malformed CSV: {e}")
+
+
+def parse_skills(value):
+    # "Python:7;Go:5" in CSV; NDJSON may also send {"Python": 7} or [{"language": ..., "proficiency": ...}]
+    if value in (None, ''):
+        return {}
+    if isinstance(value, str):
+        pairs = []
+        for item in filter(None, (item.strip() for item in value.split(';'))):
+            language, separator, proficiency = item.rpartition(':')
+            if not separator:
+                raise RowError(f"Skill '{item}' must look like Language:proficiency")
+            pairs.append((language, proficiency))
+    elif isinstance(value, dict):
+        pairs = value.items()
+    elif isinstance(value, list):
+        pairs = [(item.get('language'), item.get('proficiency')) if isinstance(item, dict) else (None, None) for item in value]
+    else:
+        raise RowError("'skills' must be a string, an object or a list")
+
+    max_length = ProgrammingSkill._meta.get_field('language').max_length
+    skills = {}
+    for language, proficiency in pairs:
+        language = str(language or '').strip()
+        if not language or len(language) > max_length:
+            raise RowError(f"Each skill needs a language of at most {max_length} characters")
+        try:
+            proficiency = int(proficiency)
+        except (TypeError, ValueError):
+            raise RowError(f"Proficiency for {language} must be a whole number")
+        if not 1 <= proficiency <= 10:
+            raise RowError(f"Proficiency for {language} must be between 1 and 10")
+        skills[language] = proficiency
+    return skills
+
+
+def import_interviews(rows, recruiter, queue_generation=False, chunk_size=None):
+    """Create an interview per row, upserting the candidate's skills first; returns a per-row report.
+
+    Rows are validated and written a chunk at a time: candidates are resolved
+    with one query per chunk, and the chunk's skills, interviews and (optionally)
+    generation jobs are written with one bulk statement each in a single
+    transaction. Invalid rows are reported and skipped without affecting the rest.
+    """
+    chunk_size = chunk_size or settings.BULK_IMPORT_CHUNK_SIZE
+    report = {
+        'rows': 0, 'interviews_created': 0, 'skills_upserted': 0, 'generation_jobs_queued': 0,
+        'errors': [], 'errors_omitted': 0
+    }
+    rows = iter(rows)
+    while True:
+        try:
+            chunk = list(islice(rows, chunk_size))
+        except ImportFormatError as e:
+            # Chunks already written stay committed; the report says where reading stopped
+            _add_error(report, None, str(e))
+            break
+        if not chunk:
+            break
+        report['rows'] += len(chunk)
+        valid = _validate_chunk(chunk, report)
+        if valid:
+            _write_chunk(valid, recruiter, queue_generation, report)
+
+    # A read error has no line and goes last, after the rows that were processed
+    report['errors'].sort(key=lambda error: (error['line'] is None, error['line'] or 0))
+    logger.info('Imported %s interviews from %s rows for recruiter %s (%s errors)',
+                report['interviews_created'], report['rows'], recruiter.pk, len(report['errors']) + report['errors_omitted'])
+    return report
+
+
+def _add_error(report, line, error):
+    if len(report['errors']) < settings.BULK_IMPORT_MAX_ERRORS:
+        report['errors'].append({'line': line, 'error': error})
+    else:
+        report['errors_omitted'] += 1
+
+
+def _validate_chunk(chunk, report):
+    parsed = []
+    for line, fields, error in chunk:
+        if error is None:
+            try:
+                if not isinstance(fields, dict):
+                    raise RowError("Row must be an object")
+                candidate = str(fields.get('candidate') or '').strip()
+                if not candidate:
+                    raise RowError("Missing candidate")
+                parsed.append((line, candidate, parse_skills(fields.get('skills'))))
+            except RowError as e:
+                error = str(e)
+        if error:
+            _add_error(report, line, error)
+
+    # Candidates are named by username or email and resolved together
+    names = {candidate for _, candidate, _ in parsed}
+    users = {}
+    for user in User.objects.filter(Q(username__in=names) | Q(email__in=names)).only('id', 'username', 'email'):
+        users[user.username] = users[user.email] = user.pk
+
+    valid = []
+    for line, candidate, skills in parsed:
+        if candidate in users:
+            valid.append((line, users[candidate], skills))
+        else:
+            _add_error(report, line, f"Unknown candidate '{candidate}'")
+    return valid
+
+
+def _write_chunk(rows, recruiter, queue_generation, report):
+    # One upsert per (candidate, language); a later row in the chunk wins
+    skills = {}
+    for _, user_id, row_skills in rows:
+        for language, proficiency in row_skills.items():
+            skills[(user_id, language)] = proficiency
+
+    try:
+        with transaction.atomic():
+            if skills:
+                ProgrammingSkill.objects.bulk_create(
+                    [ProgrammingSkill(user_id=user_id, language=language, proficiency=proficiency)
+                     for (user_id, language), proficiency in skills.items()],
+                    update_conflicts=True, unique_fields=['user', 'language'], update_fields=['proficiency']
+                )
+            interviews = Interview.objects.bulk_create([
+                Interview(recruiter=recruiter, candidate_id=user_id) for _, user_id, _ in rows
+            ])
+            if queue_generation:
+                GenerationJob.objects.bulk_create([
+                    GenerationJob(interview=interview, requested_by=recruiter) for interview in interviews
+                ])
+    except DatabaseError as e:
+        logger.exception('Bulk import chunk failed: %s', e)
+        for line, _, _ in rows:
+            _add_error(report, line, "Not imported: the database rejected this chunk")
+        return
+
+    report['skills_upserted'] += len(skills)
+    report['interviews_created'] += len(interviews)
+    if queue_generation:
+        report['generation_jobs_queued'] += len(interviews)
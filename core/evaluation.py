@@ -0,0 +1,148 @@
+import re
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from . import evaluation_cache, llm
+
+# The figure after the separator of a "Score: NN" line. Markdown emphasis and an
+# echoed range such as "Score (0-100): 85" are skipped, so the range is never read as the score
+SCORE_PATTERN = re.compile(
+    r'\bscore\**\s*(?:\([^)\n]*\)\s*)?\**\s*(?::|=|\bis\b)\s*\**\s*(\d+(?:\.\d+)?)(?![\d.])',
+    re.IGNORECASE
+)
+
+
+def evaluation_prompt(question, answer):
+    return f"""
+            Question: {question}
+            Answer: {answer}
+            Evaluate this answer. Reply formatted exactly as:
+            Score: <0-100>
+            Feedback: <detailed feedback>
+            """
+
+
+def extract_score(evaluation):
+    # Takes the first "Score: NN" line from the model's reply; None when there is none or it is out of range
+    match = SCORE_PATTERN.search(evaluation or '')
+    if not match:
+        return None
+    score = float(match.group(1))
+    return score if 0 <= score <= 100 else None
+
+
+def _evaluate_uncached(question, answer):
+    evaluation = llm.get_client().generate(evaluation_prompt(question, answer)).text
+    return extract_score(evaluation), evaluation
+
+
+def evaluate_answer(question, answer):
+    cached = evaluation_cache.get(question, answer)
+    if cached is not None:
+        return cached
+    score, evaluation = _evaluate_uncached(question, answer)
+    evaluation_cache.put(question, answer, score, evaluation)
+    return score, evaluation
+
+
+async def aevaluate_answer(question, answer):
+    # Cache reads and writes go through the sync ORM; only the model call is awaited natively
+    cached = await sync_to_async(evaluation_cache.get)(question, answer)
+    if cached is not None:
+        return cached
+    evaluation = (await llm.get_client().agenerate(evaluation_prompt(question, answer))).text
+    score = extract_score(evaluation)
+    await sync_to_async(evaluation_cache.put)(question, answer, score, evaluation)
+    return score, evaluation
+
+
+def stream_evaluation(question, answer):
+    # Yields feedback text as the model produces it
+    yield from llm.get_client().stream(evaluation_prompt(question, answer))
+
+
+BATCH_SECTION_PATTERN = re.compile(r'^\W*answer\s+(\d+)\W*$', re.IGNORECASE | re.MULTILINE)
+FEEDBACK_PATTERN = re.compile(r'feedback\W*', re.IGNORECASE)
+
+
+def batch_evaluation_prompt(items):
+    answers = "\n\n".join(
+        f"### Answer {number}\nQuestion: {question}\nAnswer: {answer}"
+        for number, (question, answer) in enumerate(items, start=1)
+    )
+    return f"""
+            Evaluate each of the following answers to technical interview questions.
+            Reply with one section per answer, in the same order, formatted exactly as:
+            ### Answer <number>
+            Score: <0-100>
+            Feedback: <detailed feedback>
+
+            {answers}
+            """
+
+
+def group_by_token_budget(items, budget=None, max_items=None):
+    budget = budget or settings.EVALUATION_BATCH_TOKEN_BUDGET
+    max_items = max_items or settings.EVALUATION_BATCH_MAX_ITEMS
+    groups, current, used = [], [], 0
+    for item in items:
+        # Same estimate the rate limiter charges, so a group fits the quota it reserves
+        tokens = llm.estimate_tokens(item[0]) + llm.estimate_tokens(item[1])
+        if current and (used + tokens > budget or len(current) >= max_items):
+            groups.append(current)
+            current, used = [], 0
+        current.append(item)
+        used += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+
+def parse_batch_evaluation(evaluation, count):
+    # Maps answer number -> (score, feedback) for every section the model returned
+    matches = list(BATCH_SECTION_PATTERN.finditer(evaluation or ''))
+    results = {}
+    for index, match in enumerate(matches):
+        number = int(match.group(1))
+        end = matches[index + 1].start() if index + 1 < len(matches) else len(evaluation)
+        section = evaluation[match.end():end].strip()
+        if not 1 <= number <= count or not section:
+            continue
+        feedback = FEEDBACK_PATTERN.split(section, maxsplit=1)
+        results[number] = (extract_score(section), feedback[1].strip() if len(feedback) > 1 else section)
+    return results
+
+
+def evaluate_answers(items):
+    """Evaluate (question, answer) pairs with as few model calls as the token budget allows.
+
+    Returns (score, feedback) per item in input order. Cached evaluations are
+    reused, and answers the model left out of a grouped reply are evaluated on
+    their own.
+    """
+    results = evaluation_cache.get_many(items)
+    # Identical answers within one batch only need evaluating once
+    pending = {}
+    for index, item in enumerate(items):
+        if results[index] is None:
+            pending.setdefault(evaluation_cache.cache_key(*item), []).append(index)
+
+    keys = list(pending)
+    uncached = [items[pending[key][0]] for key in keys]
+    done = 0
+    for group in group_by_token_budget(uncached):
+        if len(group) == 1:
+            evaluated = [_evaluate_uncached(*group[0])]
+        else:
+            evaluation = llm.get_client().generate(batch_evaluation_prompt(group)).text
+            parsed = parse_batch_evaluation(evaluation, len(group))
+            evaluated = [parsed[number] if number in parsed else _evaluate_uncached(*item)
+                         for number, item in enumerate(group, start=1)]
+        # Cached as soon as the group is paid for, so a later group failing does not waste it
+        evaluation_cache.put_many([item + evaluation for item, evaluation in zip(group, evaluated)])
+        for key, evaluation in zip(keys[done:done + len(group)], evaluated):
+            for index in pending[key]:
+                results[index] = evaluation
+        done += len(group)
+    return results
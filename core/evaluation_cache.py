@@ -0,0 +1,159 @@
+import hashlib
+import logging
+import re
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .caching import LRUCache
+from .models import EvaluationCacheEntry
+
+logger = logging.getLogger(__name__)
+
+_entries = LRUCache(maxsize=settings.EVALUATION_CACHE_LRU_SIZE, ttl=settings.EVALUATION_CACHE_LRU_TTL)
+
+_counter_lock = threading.Lock()
+_counters = {'hits': 0, 'lru_hits': 0, 'db_hits': 0, 'misses': 0, 'stored': 0, 'pruned': 0}
+
+# Bumped when scores are extracted differently, so entries stored by the old parser are no longer hit
+KEY_VERSION = '2'
+
+WHITESPACE = re.compile(r'\s+')
+EDGE_PUNCTUATION = '.,;:!?"\'`'
+
+
+def _count(name, amount=1):
+    with _counter_lock:
+        _counters[name] += amount
+
+
+def normalize_answer(answer):
+    # "I don't know", " i DON'T know. " and "i don't  know!" share one entry
+    return WHITESPACE.sub(' ', answer or '').strip().strip(EDGE_PUNCTUATION).strip().casefold()
+
+
+def cache_key(question, answer):
+    raw = KEY_VERSION + '\x00' + WHITESPACE.sub(' ', question or '').strip() + '\x00' + normalize_answer(answer)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def get(question, answer):
+    """Return a cached (score, feedback) for this question and answer, or None."""
+    if not settings.EVALUATION_CACHE_ENABLED:
+        return None
+    key = cache_key(question, answer)
+    cached = _entries.get(key)
+    if cached is not None:
+        _count('hits')
+        _count('lru_hits')
+        return cached
+
+    cutoff = timezone.now() - timedelta(seconds=settings.EVALUATION_CACHE_TTL)
+    entry = EvaluationCacheEntry.objects.filter(key=key, created_at__gte=cutoff).values_list('score', 'feedback').first()
+    if entry is None:
+        _count('misses')
+        return None
+
+    EvaluationCacheEntry.objects.filter(key=key).update(hits=F('hits') + 1, last_used_at=timezone.now())
+    _entries.set(key, entry)
+    _count('hits')
+    _count('db_hits')
+    return entry
+
+
+def get_many(items):
+    """Look up (question, answer) pairs with at most one query; misses come back as None."""
+    if not settings.EVALUATION_CACHE_ENABLED:
+        return [None] * len(items)
+    keys = [cache_key(question, answer) for question, answer in items]
+    results = [_entries.get(key) for key in keys]
+    missing = {key for key, result in zip(keys, results) if result is None}
+    found = {}
+    if missing:
+        cutoff = timezone.now() - timedelta(seconds=settings.EVALUATION_CACHE_TTL)
+        found = {
+            key: (score, feedback)
+            for key, score, feedback in EvaluationCacheEntry.objects
+            .filter(key__in=missing, created_at__gte=cutoff).values_list('key', 'score', 'feedback')
+        }
+        if found:
+            EvaluationCacheEntry.objects.filter(key__in=found).update(hits=F('hits') + 1, last_used_at=timezone.now())
+
+    for index, key in enumerate(keys):
+        if results[index] is not None:
+            _count('hits')
+            _count('lru_hits')
+        elif key in found:
+            results[index] = found[key]
+            _entries.set(key, found[key])
+            _count('hits')
+            _count('db_hits')
+        else:
+            _count('misses')
+    return results
+
+
+def put(question, answer, score, feedback):
+    put_many([(question, answer, score, feedback)])
+
+
+def put_many(evaluations):
+    entries = {}
+    now = timezone.now()
+    for question, answer, score, feedback in evaluations:
+        # An unscored evaluation is not worth reusing: later identical answers should ask the model again
+        if score is None or not feedback:
+            continue
+        key = cache_key(question, answer)
+        entries[key] = EvaluationCacheEntry(key=key, score=score, feedback=feedback, created_at=now, last_used_at=now)
+    if not settings.EVALUATION_CACHE_ENABLED or not entries:
+        return
+    for key, entry in entries.items():
+        _entries.set(key, (entry.score, entry.feedback))
+    # Single upsert, so concurrent requests storing the same key do not collide
+    EvaluationCacheEntry.objects.bulk_create(
+        list(entries.values()),
+        update_conflicts=True, unique_fields=['key'], update_fields=['score', 'feedback', 'created_at', 'last_used_at']
+    )
+    _count('stored', len(entries))
+
+
+def prune():
+    """Drop expired rows and the least recently used rows past EVALUATION_CACHE_MAX_ENTRIES.
+
+    Run periodically (manage.py prune_evaluation_cache), not on the request path.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.EVALUATION_CACHE_TTL)
+    pruned, _ = EvaluationCacheEntry.objects.filter(created_at__lt=cutoff).delete()
+    # The last_used_at of the newest row past the limit, read from the index, bounds
+    # one range delete instead of loading every surplus id; rows tied with it go too
+    oldest_kept = (
+        EvaluationCacheEntry.objects.order_by('-last_used_at')
+        .values_list('last_used_at', flat=True)[settings.EVALUATION_CACHE_MAX_ENTRIES:settings.EVALUATION_CACHE_MAX_ENTRIES + 1]
+        .first()
+    )
+    if oldest_kept is not None:
+        pruned += EvaluationCacheEntry.objects.filter(last_used_at__lte=oldest_kept).delete()[0]
+    if pruned:
+        _count('pruned', pruned)
+        logger.debug("Pruned %d evaluation cache entries", pruned)
+    return pruned
+
+
+def stats():
+    with _counter_lock:
+        counters = dict(_counters)
+    lookups = counters['hits'] + counters['misses']
+    counters['hit_rate'] = round(counters['hits'] / lookups, 4) if lookups else 0.0
+    counters['lru'] = _entries.stats()
+    return counters
+
+
+def reset():
+    _entries.clear()
+    with _counter_lock:
+        for name in _counters:
+            _counters[name] = 0
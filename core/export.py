@@ -0,0 +1,133 @@
+import csv
+import json
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Prefetch
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import Question, Response
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+# One CSV row per response, or per question when it has none; interview columns repeat on every row
+CSV_COLUMNS = [
+    'interview_id', 'status', 'created_at', 'candidate_id', 'candidate_username', 'candidate_email',
+    'total_score', 'live_score', 'skill_scores', 'question_id', 'question_type', 'language', 'question',
+    'response_id', 'response', 'score', 'feedback', 'responded_at',
+]
+
+
+def prepare(queryset):
+    # Questions, their skills and responses arrive with two extra queries per chunk of interviews
+    return queryset.select_related('candidate').prefetch_related(
+        Prefetch('questions', queryset=Question.objects.select_related('skill').order_by('id').prefetch_related(
+            Prefetch('responses', queryset=Response.objects.order_by('id'))
+        ))
+    ).order_by('interview_id')
+
+
+def _interviews(queryset):
+    return prepare(queryset).iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+
+
+def skill_scores(interview):
+    scores = defaultdict(list)
+    for question in interview.questions.all():
+        if question.skill is None:
+            continue
+        scores[question.skill.language].extend(
+            response.score for response in question.responses.all() if response.score is not None
+        )
+    return {language: round(sum(values) / len(values), 2) for language, values in scores.items() if values}
+
+
+def interview_record(interview):
+    candidate = interview.candidate
+    return {
+        'interview_id': interview.pk,
+        'status': interview.status,
+        'created_at': interview.created_at,
+        'candidate': candidate and {'id': candidate.pk, 'username': candidate.username, 'email': candidate.email},
+        'total_score': interview.total_score,
+        'live_score': interview.live_score,
+        'skill_scores': skill_scores(interview),
+        'questions': [
+            {
+                'id': question.pk,
+                'type': question.type,
+                'language': question.skill.language if question.skill else None,
+                'content': question.content,
+                'responses': [
+                    {'id': response.pk, 'content': response.content, 'score': response.score,
+                     'feedback': response.feedback, 'created_at': response.created_at}
+                    for response in question.responses.all()
+                ],
+            }
+            for question in interview.questions.all()
+        ],
+    }
+
+
+def iter_ndjson(queryset):
+    for interview in _interviews(queryset):
+        yield json.dumps(interview_record(interview), cls=JSONEncoder) + '\n'
+
+
+# Spreadsheets run a cell starting with one of these as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _cell(value):
+    # Candidate-written text is quoted with a leading apostrophe so it stays text
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+class _Echo:
+    # csv.writer only needs write(); returning the line lets each row be yielded as it is formatted
+    def write(self, value):
+        return value
+
+
+class _SafeWriter:
+    def __init__(self):
+        self.writer = csv.writer(_Echo())
+
+    def writerow(self, row):
+        return self.writer.writerow([_cell(value) for value in row])
+
+
+def iter_csv(queryset):
+    writer = _SafeWriter()
+    # The header goes out before the first query, so the download starts at once
+    yield writer.writerow(CSV_COLUMNS)
+    for interview in _interviews(queryset):
+        record = interview_record(interview)
+        candidate = record['candidate'] or {}
+        head = [
+            record['interview_id'], record['status'], record['created_at'].isoformat(),
+            candidate.get('id'), candidate.get('username'), candidate.get('email'),
+            record['total_score'], record['live_score'],
+            ';'.join(f'{language}:{score}' for language, score in record['skill_scores'].items()),
+        ]
+        if not record['questions']:
+            yield writer.writerow(head + [None] * (len(CSV_COLUMNS) - len(head)))
+        for question in record['questions']:
+            question_columns = [question['id'], question['type'], question['language'], question['content']]
+            for response in question['responses'] or [None]:
+                if response is None:
+                    yield writer.writerow(head + question_columns + [None] * 5)
+                else:
+                    yield writer.writerow(head + question_columns + [
+                        response['id'], response['content'], response['score'], response['feedback'],
+                        response['created_at'].isoformat()
+                    ])
+
+
+def stream(queryset, fmt):
+    return iter_csv(queryset) if fmt == 'csv' else iter_ndjson(queryset)
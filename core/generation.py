@@ -0,0 +1,246 @@
+import asyncio
+import contextvars
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections, transaction
+
+from . import interview_cache, llm, question_bank
+from .models import ProgrammingSkill, Question
+
+logger = logging.getLogger(__name__)
+
+
+class QuestionGenerationError(Exception):
+    def __init__(self, message, status_code=500, failed_skills=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.failed_skills = failed_skills or []
+
+
+def proficiency_band(proficiency):
+    return 'beginner' if proficiency <= 4 else 'intermediate' if proficiency <= 7 else 'advanced'
+
+
+def question_level(skill):
+    return proficiency_band(skill.proficiency)
+
+
+def technical_questions_prompt(skill):
+    prompts = {
+        'beginner': f"Generate 3 basic technical interview questions for a beginner {skill.language} developer.",
+        'intermediate': f"Generate 3 intermediate technical interview questions for a {skill.language} developer.",
+        'advanced': f"Generate 3 advanced technical interview questions for an expert {skill.language} developer."
+    }
+    return prompts[question_level(skill)]
+
+
+def _split_questions(text):
+    return [q.strip() for q in text.split("\n") if q.strip()]
+
+
+def generate_technical_questions(skill, deadline=None):
+    # `deadline` (time.monotonic()) bounds the quota wait and retries along with the call itself
+    try:
+        result = llm.get_client().generate(
+            technical_questions_prompt(skill),
+            temperature=0.7,
+            max_output_tokens=500,
+            timeout=settings.QUESTION_GENERATION_TIMEOUT,
+            priority=llm.BULK,
+            deadline=deadline
+        )
+        return _split_questions(result.text)
+    except llm.LLMRateLimited:
+        # Out of quota is not a per-skill failure; the whole request should be retried later
+        raise
+    except Exception as e:
+        logger.error("LLM error generating %s questions: %s", skill.language, e)
+        return None
+
+
+async def agenerate_technical_questions(skill, deadline):
+    try:
+        result = await asyncio.wait_for(llm.get_client().agenerate(
+            technical_questions_prompt(skill),
+            temperature=0.7,
+            max_output_tokens=500,
+            timeout=settings.QUESTION_GENERATION_TIMEOUT,
+            priority=llm.BULK,
+            # Ends quota waits and retries early enough to surface as LLMRateLimited, not a timeout
+            deadline=deadline
+        ), timeout=max(0, deadline - time.monotonic()))
+        return _split_questions(result.text)
+    except llm.LLMRateLimited:
+        raise
+    except asyncio.TimeoutError:
+        logger.error("Timed out generating questions for %s", skill.language)
+        return None
+    except Exception as e:
+        logger.error("LLM error generating %s questions: %s", skill.language, e)
+        return None
+
+
+def _draw_from_bank(skills):
+    # Pooled questions are looked up first so only bank misses reach the model
+    results = [question_bank.draw(skill.language, question_level(skill)) for skill in skills]
+    return results, [index for index, questions in enumerate(results) if questions is None]
+
+
+def _store_in_bank(skill, questions):
+    if questions:
+        question_bank.store(skill.language, question_level(skill), [q for q in questions if len(q) > 10])
+
+
+def generate_questions_for_skills(skills, on_progress=None):
+    # Returns one entry per skill, in skill order; None marks a failed skill
+    results, pending = _draw_from_bank(skills)
+    done = len(skills) - len(pending)
+    if on_progress:
+        on_progress(done, len(skills))
+
+    for position, questions in enumerate(_call_model_for_skills([skills[index] for index in pending])):
+        index = pending[position]
+        results[index] = questions
+        _store_in_bank(skills[index], questions)
+        done += 1
+        if on_progress:
+            on_progress(done, len(skills))
+    return results
+
+
+def _concurrency_and_deadline(skills):
+    concurrency = max(1, min(settings.QUESTION_GENERATION_CONCURRENCY, len(skills)))
+    # Later skills only start once a call finishes, so allow one timeout per round.
+    # Every call gets the same deadline, so quota waits and retries end with the request
+    rounds = -(-len(skills) // concurrency)
+    return concurrency, time.monotonic() + settings.QUESTION_GENERATION_TIMEOUT * rounds
+
+
+def _call_model_for_skills(skills):
+    # Yields results in skill order as they become available
+    max_workers, deadline = _concurrency_and_deadline(skills)
+    if max_workers == 1:
+        for skill in skills:
+            yield generate_technical_questions(skill, deadline)
+        return
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='question-gen')
+    try:
+        # Each thread runs in a copy of the caller's context so its log records keep the correlation id
+        futures = [executor.submit(contextvars.copy_context().run, _generate_in_thread, skill, deadline) for skill in skills]
+        for skill, future in zip(skills, futures):
+            try:
+                yield future.result(timeout=max(0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                logger.error("Timed out generating questions for %s", skill.language)
+                yield None
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _generate_in_thread(skill, deadline):
+    try:
+        return generate_technical_questions(skill, deadline)
+    finally:
+        # The rate limiter queries the database from pool threads; don't leave their connections open
+        connections.close_all()
+
+
+async def agenerate_questions_for_skills(skills):
+    # Async counterpart of generate_questions_for_skills: model calls run
+    # concurrently on the event loop instead of in a thread pool, with the same
+    # concurrency limit and overall deadline
+    results, pending = await sync_to_async(_draw_from_bank)(skills)
+    concurrency, deadline = _concurrency_and_deadline([skills[index] for index in pending])
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def generate(skill):
+        async with semaphore:
+            return await agenerate_technical_questions(skill, deadline)
+
+    generated = await asyncio.gather(*(generate(skills[index]) for index in pending))
+    for index, questions in zip(pending, generated):
+        results[index] = questions
+        await sync_to_async(_store_in_bank)(skills[index], questions)
+    return results
+
+
+def generate_interview_questions(interview, on_progress=None, before_commit=None):
+    """Generate and store questions for every skill of the interview's candidate.
+
+    `before_commit` runs inside the write transaction with the response payload;
+    raising from it rolls the questions back.
+    """
+    skills = list(ProgrammingSkill.objects.filter(user=interview.candidate))
+    logger.debug("Found skills for candidate %s: %s", interview.candidate, skills)
+    if not skills:
+        raise QuestionGenerationError("No programming skills found", status_code=400)
+    return _save_generated(interview, skills, generate_questions_for_skills(skills, on_progress), before_commit)
+
+
+async def agenerate_interview_questions(interview):
+    skills = [skill async for skill in ProgrammingSkill.objects.filter(user_id=interview.candidate_id)]
+    if not skills:
+        raise QuestionGenerationError("No programming skills found", status_code=400)
+    results = await agenerate_questions_for_skills(skills)
+    return await sync_to_async(_save_generated)(interview, skills, results)
+
+
+def _save_generated(interview, skills, results, before_commit=None):
+    questions_by_skill = []
+    failed_skills = []
+
+    for skill, questions in zip(skills, results):
+        if not questions:
+            failed_skills.append({
+                "language": skill.language,
+                "error": f"Failed to generate questions for {skill.language}"
+            })
+            continue
+
+        skill_questions = [
+            Question(interview=interview, type='technical', content=question, skill=skill)
+            for question in questions if len(question) > 10
+        ]
+        if skill_questions:
+            questions_by_skill.append((skill, skill_questions))
+
+    all_questions = [question for _, skill_questions in questions_by_skill for question in skill_questions]
+    if not all_questions:
+        raise QuestionGenerationError("No valid questions generated", failed_skills=failed_skills)
+
+    payload = {}
+
+    def on_saved():
+        payload.update({
+            "status": "Questions generated successfully",
+            "total_questions": len(all_questions),
+            "questions_by_skill": [{
+                "language": skill.language,
+                "proficiency": skill.proficiency,
+                "questions": [
+                    {"id": question.id, "content": question.content, "type": question.type}
+                    for question in skill_questions
+                ]
+            } for skill, skill_questions in questions_by_skill],
+            "failed_skills": failed_skills
+        })
+        if before_commit:
+            before_commit(payload)
+
+    save_questions(interview, all_questions, on_saved)
+    return payload
+
+
+def save_questions(interview, questions, before_commit=None):
+    # One insert for every question plus the status change, committed together
+    with transaction.atomic():
+        Question.objects.bulk_create(questions)
+        interview_cache.bump(interview.pk, status='in_progress')
+        interview.status = 'in_progress'
+        if before_commit:
+            before_commit()
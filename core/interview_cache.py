@@ -0,0 +1,65 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import F
+from django.utils.http import parse_etags
+
+from .models import Interview
+
+# Interview detail is served from two cache entries: the interview's current
+# version (with its candidate, for the access check), kept briefly, and the
+# serialized payload keyed by version. Writes bump the version through bump(),
+# which also drops the version entry, so stale payloads are never looked up.
+
+
+def _cache():
+    return caches[settings.INTERVIEW_DETAIL_CACHE]
+
+
+def _version_key(interview_id):
+    return f'interview:{interview_id}:version'
+
+
+def _payload_key(interview_id, version):
+    return f'interview:{interview_id}:v{version}'
+
+
+def etag(interview_id, version):
+    return f'"interview-{interview_id}-v{version}"'
+
+
+def etag_matches(request, value):
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    # Weak comparison, as If-None-Match requires
+    return any(tag == '*' or tag.removeprefix('W/') == value for tag in parse_etags(header))
+
+
+def bump(interview_id, **fields):
+    """Update the interview row with `fields`, bump its version and drop its cached version."""
+    updated = Interview.objects.filter(pk=interview_id).update(version=F('version') + 1, **fields)
+    invalidate(interview_id)
+    return updated
+
+
+def invalidate(*interview_ids):
+    keys = [_version_key(interview_id) for interview_id in interview_ids]
+    _cache().delete_many(keys)
+    # Dropped again after commit, in case a read re-cached the old version in between
+    transaction.on_commit(lambda: _cache().delete_many(keys))
+
+
+def cached_version(interview_id):
+    # (version, candidate_id), or None when unknown
+    return _cache().get(_version_key(interview_id))
+
+
+def cached_payload(interview_id, version):
+    return _cache().get(_payload_key(interview_id, version))
+
+
+def store(payload):
+    interview_id, version = payload['interview_id'], payload['version']
+    _cache().set(_payload_key(interview_id, version), payload, settings.INTERVIEW_PAYLOAD_CACHE_TTL)
+    _cache().set(_version_key(interview_id), (version, payload['candidate']), settings.INTERVIEW_VERSION_CACHE_TTL)
@@ -0,0 +1,185 @@
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, connection, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import llm
+from .log import correlation
+from .generation import QuestionGenerationError, generate_interview_questions
+from .models import GenerationJob
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+class LeaseLost(Exception):
+    pass
+
+
+def enqueue_generation(interview, user=None):
+    # Reuse a job that is still waiting or running for the same interview. Two
+    # requests racing past the lookup are settled by the core_genjob_one_active
+    # constraint: the loser gets the winner's job.
+    while True:
+        job = GenerationJob.objects.filter(interview=interview, status__in=ACTIVE_STATUSES).first()
+        if job:
+            return job, False
+        try:
+            with transaction.atomic():
+                return GenerationJob.objects.create(interview=interview, requested_by=user), True
+        except IntegrityError:
+            continue
+
+
+def _claimable(now):
+    # Queued jobs, plus running jobs whose worker stopped renewing its lease
+    return GenerationJob.objects.filter(
+        Q(status='queued') | Q(status='running', lease_expires_at__lt=now),
+        attempts__lt=settings.GENERATION_JOB_MAX_ATTEMPTS
+    )
+
+
+def fail_exhausted_jobs():
+    now = timezone.now()
+    return GenerationJob.objects.filter(
+        status='running', lease_expires_at__lt=now,
+        attempts__gte=settings.GENERATION_JOB_MAX_ATTEMPTS
+    ).update(
+        status='failed', error='Lease expired after the maximum number of attempts',
+        lease_owner=None, lease_expires_at=None, finished_at=now, updated_at=now
+    )
+
+
+def claim_next_job(worker_id):
+    """Lease the oldest claimable job for `worker_id`, or return None.
+
+    Claims are a conditional UPDATE so concurrent workers never take the same
+    job; on backends with SKIP LOCKED the candidate row is locked first so
+    workers do not contend on the same row.
+    """
+    now = timezone.now()
+    lease = {
+        'status': 'running',
+        'lease_owner': worker_id,
+        'lease_expires_at': now + timedelta(seconds=settings.GENERATION_JOB_LEASE_SECONDS),
+        'attempts': F('attempts') + 1,
+        'updated_at': now,
+    }
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job = _claimable(now).order_by('created_at').select_for_update(skip_locked=True).first()
+            if job is None:
+                return None
+            GenerationJob.objects.filter(pk=job.pk).update(**lease)
+        job.refresh_from_db()
+        return job
+
+    for job_id in _claimable(now).order_by('created_at').values_list('id', flat=True)[:10]:
+        if _claimable(now).filter(pk=job_id).update(**lease):
+            return GenerationJob.objects.get(pk=job_id)
+    return None
+
+
+def _renew(job, worker_id, **fields):
+    now = timezone.now()
+    renewed = GenerationJob.objects.filter(pk=job.pk, status='running', lease_owner=worker_id).update(
+        lease_expires_at=now + timedelta(seconds=settings.GENERATION_JOB_LEASE_SECONDS),
+        updated_at=now,
+        **fields
+    )
+    if not renewed:
+        raise LeaseLost(f"Worker {worker_id} lost the lease on job {job.pk}")
+
+
+class LeaseHeartbeat(threading.Thread):
+    """Renews a job's lease every `interval` seconds until stopped.
+
+    Progress renews the lease only between skills, and a single skill may wait
+    on quota and retries for longer than the lease lasts. Without the
+    heartbeat another worker would take the job over mid-call and generate the
+    same interview's questions a second time.
+    """
+
+    def __init__(self, job, worker_id, interval):
+        super().__init__(name=f"lease-heartbeat-{job.pk}", daemon=True)
+        self.job = job
+        self.worker_id = worker_id
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self._stopped.wait(self.interval):
+                try:
+                    _renew(self.job, self.worker_id)
+                except LeaseLost as e:
+                    # The job's own writes check the lease too, so it cannot commit after this
+                    logger.warning(str(e))
+                    return
+                except DatabaseError as e:
+                    logger.warning("Could not renew the lease on job %s: %s", self.job.pk, e)
+        finally:
+            connections.close_all()
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+def run_job(job, worker_id):
+    # Everything logged while the job runs shares one correlation id
+    with correlation(f"generation-job-{job.pk}"):
+        heartbeat = LeaseHeartbeat(job, worker_id, settings.GENERATION_JOB_HEARTBEAT_SECONDS)
+        heartbeat.start()
+        try:
+            _run_job(job, worker_id)
+        finally:
+            heartbeat.stop()
+
+
+def _run_job(job, worker_id):
+    def on_progress(done, total):
+        _renew(job, worker_id, skills_done=done, skills_total=total)
+
+    def before_commit(payload):
+        # Recording success in the same transaction as the questions means a
+        # job whose lease was taken over cannot store its questions twice
+        _renew(job, worker_id, status='succeeded', result=payload, lease_owner=None, finished_at=timezone.now())
+
+    try:
+        generate_interview_questions(job.interview, on_progress=on_progress, before_commit=before_commit)
+        logger.info("Generation job %s succeeded", job.pk)
+    except LeaseLost as e:
+        logger.warning(str(e))
+    except llm.LLMRateLimited as e:
+        _requeue(job, worker_id, str(e))
+    except QuestionGenerationError as e:
+        _finish_failed(job, worker_id, str(e), {"failed_skills": e.failed_skills})
+    except Exception as e:
+        logger.exception("Generation job %s crashed: %s", job.pk, e)
+        _finish_failed(job, worker_id, str(e))
+
+
+def _requeue(job, worker_id, reason):
+    # Running out of quota is not the job's fault, so the attempt is handed back
+    now = timezone.now()
+    GenerationJob.objects.filter(pk=job.pk, lease_owner=worker_id).update(
+        status='queued', attempts=F('attempts') - 1, lease_owner=None,
+        lease_expires_at=None, updated_at=now
+    )
+    logger.warning("Generation job %s requeued: %s", job.pk, reason)
+
+
+def _finish_failed(job, worker_id, error, result=None):
+    now = timezone.now()
+    GenerationJob.objects.filter(pk=job.pk, lease_owner=worker_id).update(
+        status='failed', error=error, result=result, lease_owner=None,
+        lease_expires_at=None, finished_at=now, updated_at=now
+    )
+    logger.error("Generation job %s failed: %s", job.pk, error)
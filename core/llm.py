@@ -0,0 +1,446 @@
+import asyncio
+import hashlib
+import logging
+import random
+import re
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from . import metrics, rate_limit
+from .rate_limit import BULK, INTERACTIVE
+
+logger = logging.getLogger(__name__)
+
+
+class LLMError(Exception):
+    pass
+
+
+class LLMUnavailable(LLMError):
+    """Raised without calling the provider while the circuit breaker is open."""
+
+
+class LLMRateLimited(LLMError):
+    """Raised when the shared quota or the provider itself turns a call away."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMResult:
+    def __init__(self, text, prompt_tokens=None, output_tokens=None):
+        self.text = text
+        self.prompt_tokens = prompt_tokens
+        self.output_tokens = output_tokens
+
+
+class BaseBackend:
+    def generate(self, prompt, temperature=None, max_output_tokens=None, timeout=None):
+        raise NotImplementedError
+
+    async def agenerate(self, prompt, temperature=None, max_output_tokens=None, timeout=None):
+        # Backends without a native async client run the blocking call in a worker thread
+        return await asyncio.to_thread(self.generate, prompt, temperature, max_output_tokens, timeout)
+
+    def stream(self, prompt, timeout=None):
+        # Yields text chunks; backends without streaming send the whole reply at once
+        yield self.generate(prompt, timeout=timeout).text
+
+    def is_retryable(self, exc):
+        return isinstance(exc, (TimeoutError, ConnectionError))
+
+    def is_rate_limited(self, exc):
+        return False
+
+
+class GeminiBackend(BaseBackend):
+    RETRYABLE_ERRORS = ('DeadlineExceeded', 'ServiceUnavailable', 'InternalServerError')
+    RATE_LIMIT_ERRORS = ('ResourceExhausted', 'TooManyRequests')
+
+    def __init__(self, model_name=None, api_key=None):
+        # Imported here rather than at module level: the SDK pulls in gRPC and
+        # protobuf, which every manage.py command and worker boot would pay for
+        # even when it never calls the model. get_client() builds the backend on
+        # first use, so the cost lands on the first LLM call instead.
+        import google.generativeai as genai
+
+        # genai keeps one gRPC channel per process, shared by every call made through this model
+        genai.configure(api_key=api_key or settings.GOOGLE_GEMINI_API_KEY)
+        self.model = genai.GenerativeModel(model_name or settings.LLM_MODEL)
+
+    def _config(self, temperature, max_output_tokens):
+        config = {}
+        if temperature is not None:
+            config['temperature'] = temperature
+        if max_output_tokens is not None:
+            config['max_output_tokens'] = max_output_tokens
+        return config or None
+
+    def generate(self, prompt, temperature=None, max_output_tokens=None, timeout=None):
+        response = self.model.generate_content(
+            prompt,
+            generation_config=self._config(temperature, max_output_tokens),
+            request_options={'timeout': timeout} if timeout else None
+        )
+        return _result(response)
+
+    async def agenerate(self, prompt, temperature=None, max_output_tokens=None, timeout=None):
+        # grpc.aio under the hood, so no thread is held while Gemini works
+        response = await self.model.generate_content_async(
+            prompt,
+            generation_config=self._config(temperature, max_output_tokens),
+            request_options={'timeout': timeout} if timeout else None
+        )
+        return _result(response)
+
+    def stream(self, prompt, timeout=None):
+        response = self.model.generate_content(
+            prompt, stream=True, request_options={'timeout': timeout} if timeout else None
+        )
+        for chunk in response:
+            text = _response_text(chunk)
+            if text:
+                yield text
+
+    def is_retryable(self, exc):
+        return super().is_retryable(exc) or type(exc).__name__ in self.RETRYABLE_ERRORS
+
+    def is_rate_limited(self, exc):
+        return type(exc).__name__ in self.RATE_LIMIT_ERRORS
+
+
+def estimate_tokens(text):
+    # About four characters per token; charges quota before the provider reports usage and sizes evaluation batches
+    return len(text) // 4 + 1
+
+
+def _result(response):
+    usage = getattr(response, 'usage_metadata', None)
+    return LLMResult(
+        _response_text(response),
+        prompt_tokens=getattr(usage, 'prompt_token_count', None),
+        output_tokens=getattr(usage, 'candidates_token_count', None)
+    )
+
+
+def _response_text(response):
+    if not response.candidates:
+        return ''
+    return ''.join(part.text for part in response.candidates[0].content.parts)
+
+
+class FakeBackend(BaseBackend):
+    """Deterministic offline backend for tests and benchmarks.
+
+    Question prompts get numbered questions derived from the prompt, evaluation
+    prompts get LLM_FAKE_SCORE with fixed feedback, and every call sleeps for
+    LLM_FAKE_LATENCY seconds to stand in for provider latency.
+    """
+
+    QUESTION_PROMPT = re.compile(r'^Generate (\d+) .*?(\w+) developer', re.IGNORECASE)
+
+    def __init__(self, latency=None, score=None):
+        self.latency = settings.LLM_FAKE_LATENCY if latency is None else latency
+        self.score = settings.LLM_FAKE_SCORE if score is None else score
+
+    def generate(self, prompt, temperature=None, max_output_tokens=None, timeout=None):
+        if self.latency:
+            time.sleep(self.latency)
+        return LLMResult(self._reply(prompt), prompt_tokens=estimate_tokens(prompt), output_tokens=None)
+
+    async def agenerate(self, prompt, temperature=None, max_output_tokens=None, timeout=None):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return LLMResult(self._reply(prompt), prompt_tokens=estimate_tokens(prompt), output_tokens=None)
+
+    def _reply(self, prompt):
+        match = self.QUESTION_PROMPT.search(prompt.strip())
+        if match:
+            digest = hashlib.sha1(prompt.encode('utf-8')).hexdigest()[:6]
+            return "\n".join(
+                f"{i}. Explain {match.group(2)} concept {digest}-{i} and when you would use it?"
+                for i in range(1, int(match.group(1)) + 1)
+            )
+        answers = prompt.count('### Answer ') - 1
+        if answers > 0:
+            return "\n\n".join(
+                f"### Answer {number}\nScore: {self.score}\nFeedback: Fake evaluation of answer {number}."
+                for number in range(1, answers + 1)
+            )
+        return f"Score: {self.score}\nFeedback: Fake evaluation."
+
+    def stream(self, prompt, timeout=None):
+        text = self.generate(prompt, timeout=timeout).text
+        for line in text.splitlines(keepends=True):
+            yield line
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures and fails fast for `reset_timeout` seconds.
+
+    After that a single trial call is let through (half-open); its outcome
+    closes the circuit again or re-opens it.
+    """
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.warning("LLM circuit opened after %d consecutive failures", self.failures)
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+
+
+class LLMClient:
+    """Backend wrapper adding timeouts, retries with jittered exponential backoff, a circuit breaker
+    and, when configured, the shared rate limiter.
+
+    Calls default to INTERACTIVE priority; bulk work such as question generation
+    passes priority=BULK so candidate-facing evaluations get quota first.
+    """
+
+    def __init__(self, backend, timeout, max_retries, backoff_base, backoff_max, breaker, limiter=None):
+        self.backend = backend
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker
+        self.limiter = limiter
+
+    def _backoff(self, attempt):
+        # Full jitter: sleep anywhere up to the exponential cap
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _acquire(self, tokens, priority, max_wait=None):
+        if self.limiter is None:
+            return
+        try:
+            self.limiter.acquire(tokens, priority, max_wait)
+        except rate_limit.RateLimitExceeded as e:
+            raise LLMRateLimited(str(e), e.retry_after) from e
+
+    async def _aacquire(self, tokens, priority, max_wait=None):
+        if self.limiter is None:
+            return
+        try:
+            await self.limiter.aacquire(tokens, priority, max_wait)
+        except rate_limit.RateLimitExceeded as e:
+            raise LLMRateLimited(str(e), e.retry_after) from e
+
+    def _retry_delay(self, exc, attempt, priority, deadline=None):
+        # Re-raises when the failure should not be retried, otherwise returns the backoff delay
+        delay = self._backoff(attempt)
+        # A retry that could not start before the caller's deadline is not attempted
+        last = attempt >= self.max_retries or (deadline is not None and time.monotonic() + delay >= deadline)
+        if self.backend.is_rate_limited(exc):
+            # A quota rejection means the provider answered, so it does not count against the breaker
+            self.breaker.record_success()
+            rate_limit.record_provider_rejection(priority)
+            if last:
+                raise LLMRateLimited(f"LLM provider quota exceeded: {exc}", self.backoff_max) from exc
+        elif not self.backend.is_retryable(exc):
+            # The provider answered (e.g. rejected the request), so it is not degraded
+            self.breaker.record_success()
+            raise exc
+        else:
+            self.breaker.record_failure()
+            if last:
+                raise exc
+        logger.warning("LLM call failed (%s); retry %d/%d in %.2fs", exc, attempt + 1, self.max_retries, delay)
+        return delay
+
+    def _call(self, operation, timeout, tokens=0, priority=INTERACTIVE, deadline=None):
+        # `operation` gets the timeout for one attempt; with a `deadline` (a
+        # time.monotonic() value) quota waits, attempts and retries all end by then
+        attempt = 0
+        while True:
+            remaining = _remaining(deadline)
+            # Quota is taken before the breaker so a rejected call never holds the half-open trial
+            self._acquire(tokens, priority, remaining)
+            if not self.breaker.allow():
+                raise LLMUnavailable("LLM provider is unavailable (circuit open)")
+            try:
+                result = operation(_attempt_timeout(timeout, deadline))
+            except Exception as e:
+                time.sleep(self._retry_delay(e, attempt, priority, deadline))
+                attempt += 1
+                continue
+            self.breaker.record_success()
+            return result
+
+    async def _acall(self, operation, timeout, tokens=0, priority=INTERACTIVE, deadline=None):
+        attempt = 0
+        while True:
+            await self._aacquire(tokens, priority, _remaining(deadline))
+            if not self.breaker.allow():
+                raise LLMUnavailable("LLM provider is unavailable (circuit open)")
+            try:
+                result = await operation(_attempt_timeout(timeout, deadline))
+            except Exception as e:
+                await asyncio.sleep(self._retry_delay(e, attempt, priority, deadline))
+                attempt += 1
+                continue
+            self.breaker.record_success()
+            return result
+
+    def _charge(self, prompt, max_output_tokens):
+        return estimate_tokens(prompt) + (max_output_tokens or settings.LLM_RATE_LIMIT_OUTPUT_TOKENS)
+
+    def generate(self, prompt, temperature=None, max_output_tokens=None, timeout=None, priority=INTERACTIVE, deadline=None):
+        charged = self._charge(prompt, max_output_tokens)
+        began = time.perf_counter()
+        try:
+            result = self._call(lambda attempt_timeout: self.backend.generate(
+                prompt, temperature=temperature, max_output_tokens=max_output_tokens, timeout=attempt_timeout
+            ), timeout or self.timeout, tokens=charged, priority=priority, deadline=deadline)
+        except Exception as e:
+            metrics.observe_llm_call('generate', priority, _outcome(e), time.perf_counter() - began)
+            raise
+        metrics.observe_llm_call('generate', priority, 'ok', time.perf_counter() - began,
+                                 result.prompt_tokens, result.output_tokens)
+        if self.limiter and result.prompt_tokens is not None and result.output_tokens is not None:
+            self.limiter.settle(charged, result.prompt_tokens + result.output_tokens)
+        return result
+
+    async def agenerate(self, prompt, temperature=None, max_output_tokens=None, timeout=None, priority=INTERACTIVE, deadline=None):
+        charged = self._charge(prompt, max_output_tokens)
+        began = time.perf_counter()
+        try:
+            result = await self._acall(lambda attempt_timeout: self.backend.agenerate(
+                prompt, temperature=temperature, max_output_tokens=max_output_tokens, timeout=attempt_timeout
+            ), timeout or self.timeout, tokens=charged, priority=priority, deadline=deadline)
+        except Exception as e:
+            metrics.observe_llm_call('agenerate', priority, _outcome(e), time.perf_counter() - began)
+            raise
+        metrics.observe_llm_call('agenerate', priority, 'ok', time.perf_counter() - began,
+                                 result.prompt_tokens, result.output_tokens)
+        if self.limiter and result.prompt_tokens is not None and result.output_tokens is not None:
+            await sync_to_async(self.limiter.settle)(charged, result.prompt_tokens + result.output_tokens)
+        return result
+
+    def stream(self, prompt, timeout=None, priority=INTERACTIVE):
+        # Retries only cover opening the stream; a stream that breaks midway is not replayed
+        began = time.perf_counter()
+        outcome = 'ok'
+        try:
+            chunks = self._call(
+                lambda attempt_timeout: _first_and_rest(self.backend.stream(prompt, timeout=attempt_timeout)),
+                timeout or self.timeout, tokens=self._charge(prompt, None), priority=priority
+            )
+            for chunk in chunks:
+                yield chunk
+        except Exception as e:
+            outcome = _outcome(e)
+            raise
+        finally:
+            metrics.observe_llm_call('stream', priority, outcome, time.perf_counter() - began)
+
+
+def _remaining(deadline):
+    if deadline is None:
+        return None
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError("LLM call deadline exceeded")
+    return remaining
+
+
+def _attempt_timeout(timeout, deadline):
+    remaining = _remaining(deadline)
+    return timeout if remaining is None else min(timeout, remaining)
+
+
+def _outcome(exc):
+    if isinstance(exc, LLMRateLimited):
+        return 'rate_limited'
+    if isinstance(exc, LLMUnavailable):
+        return 'unavailable'
+    return 'error'
+
+
+def _first_and_rest(iterator):
+    # Pulls the first chunk eagerly so connection errors surface inside the retry loop
+    iterator = iter(iterator)
+    try:
+        first = next(iterator)
+    except StopIteration:
+        return iter(())
+
+    def rest():
+        yield first
+        yield from iterator
+    return rest()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = LLMClient(
+                    backend=import_string(settings.LLM_BACKEND)(),
+                    timeout=settings.LLM_TIMEOUT,
+                    max_retries=settings.LLM_MAX_RETRIES,
+                    backoff_base=settings.LLM_BACKOFF_BASE,
+                    backoff_max=settings.LLM_BACKOFF_MAX,
+                    breaker=CircuitBreaker(settings.LLM_CIRCUIT_FAILURE_THRESHOLD, settings.LLM_CIRCUIT_RESET_SECONDS),
+                    limiter=rate_limit.from_settings()
+                )
+    return _client
+
+
+def reset_client():
+    global _client
+    with _client_lock:
+        _client = None
+
+
+@receiver(setting_changed)
+def _reset_on_setting_change(setting, **kwargs):
+    if setting.startswith('LLM_'):
+        reset_client()
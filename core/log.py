@@ -0,0 +1,157 @@
+import contextvars
+import copy
+import json
+import logging
+import os
+import queue
+import re
+import sys
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+# Inbound ids are reused only when they look like ids, so headers cannot inject into the log
+VALID_REQUEST_ID = re.compile(r'^[A-Za-z0-9._:-]{1,64}$')
+
+_correlation_id = contextvars.ContextVar('correlation_id', default=None)
+
+# Attributes every LogRecord has; anything else came in through `extra=`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'correlation_id'}
+
+
+def get_correlation_id():
+    return _correlation_id.get()
+
+
+@contextmanager
+def correlation(value=None):
+    """Tag every record logged inside the block (e.g. one worker job) with `value`."""
+    token = _correlation_id.set(value or uuid.uuid4().hex)
+    try:
+        yield _correlation_id.get()
+    finally:
+        _correlation_id.reset(token)
+
+
+class CorrelationIdMiddleware:
+    """Gives each request a correlation id (the caller's X-Request-ID when valid) and echoes it back."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def _request_id(self, request):
+        request_id = request.headers.get(REQUEST_ID_HEADER, '')
+        if not VALID_REQUEST_ID.match(request_id):
+            request_id = uuid.uuid4().hex
+        request.correlation_id = request_id
+        return request_id
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        request_id = self._request_id(request)
+        with correlation(request_id):
+            response = self.get_response(request)
+        response[REQUEST_ID_HEADER] = request_id
+        return response
+
+    async def __acall__(self, request):
+        request_id = self._request_id(request)
+        with correlation(request_id):
+            response = await self.get_response(request)
+        response[REQUEST_ID_HEADER] = request_id
+        return response
+
+
+class CorrelationIdFilter(logging.Filter):
+    def filter(self, record):
+        record.correlation_id = _correlation_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; fields passed with `extra=` are included as-is."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'correlation_id': getattr(record, 'correlation_id', None),
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class BackgroundHandler(QueueHandler):
+    """Hands records to a listener thread that formats them as JSON and writes them.
+
+    The logging call only resolves the message and puts the record on a
+    bounded queue. Size-based file rotation, JSON encoding and the writes all
+    happen on the listener thread. When the queue is full, records are
+    dropped and counted rather than blocking the request.
+
+    The process id is added to `filename` (app.log -> app.<pid>.log):
+    RotatingFileHandler is not safe to share between processes, so each
+    worker rotates its own file.
+    """
+
+    def __init__(self, filename=None, max_bytes=10 * 1024 * 1024, backup_count=5, stream=False, queue_size=10000):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.dropped = 0
+        targets = []
+        self.filename = None
+        if filename:
+            root, extension = os.path.splitext(filename)
+            self.filename = f"{root}.{os.getpid()}{extension}"
+            os.makedirs(os.path.dirname(os.path.abspath(self.filename)), exist_ok=True)
+            targets.append(RotatingFileHandler(self.filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True))
+        if stream:
+            targets.append(logging.StreamHandler(sys.stderr))
+        for target in targets:
+            target.setFormatter(JsonFormatter())
+        self.targets = targets
+        self.listener = QueueListener(self.queue, *targets, respect_handler_level=True)
+        self.listener.start()
+
+    def prepare(self, record):
+        # Resolve %-args while they still hold their current values; the
+        # traceback stays on the record and is rendered on the listener thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        # Drains what is already queued before the files are closed
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+            for target in self.targets:
+                target.close()
+        super().close()
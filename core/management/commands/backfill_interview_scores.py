@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.scoring import backfill
+
+
+class Command(BaseCommand):
+    help = "Recompute Interview.score_sum/score_count from existing responses."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        updated = backfill(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Updated running scores on {updated} interviews"))
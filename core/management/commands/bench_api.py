@@ -0,0 +1,64 @@
+import json
+import subprocess
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from core import evaluation_cache, question_bank
+from core.bench import run_api_load, temporary_database
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the register/login/generate/submit/complete flow through the full request "
+        "stack on a throwaway database, with the fake LLM backend standing in for Gemini. "
+        "Write the result with --output and compare runs, e.g. before and after a change."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20, help="Candidates walked through the flow")
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--latency', type=float, default=0.2, help="Seconds the fake model takes per call")
+        parser.add_argument('--answers', type=int, help="Responses submitted per interview (default: every question)")
+        parser.add_argument('--question-bank', action='store_true', help="Serve repeat questions from the question bank")
+        parser.add_argument('--output', help="Write the result as JSON to this path")
+
+    def handle(self, *args, **options):
+        overrides = {
+            'LLM_BACKEND': 'core.llm.FakeBackend',
+            'LLM_FAKE_LATENCY': options['latency'],
+            # Quota would throttle the run itself rather than measure the code
+            'LLM_RATE_LIMIT_RPM': 0,
+            'LLM_RATE_LIMIT_TPM': 0,
+            'QUESTION_BANK_ENABLED': options['question_bank'],
+            'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver'],
+        }
+        started_at = timezone.now()
+        question_bank.reset()
+        evaluation_cache.reset()
+        with override_settings(**overrides), temporary_database() as name:
+            result = run_api_load(options['users'], options['concurrency'], answers=options['answers'])
+        result.update({
+            'started_at': started_at.isoformat(),
+            'revision': self._revision(),
+            'profile': settings.DB_PROFILE,
+            'vendor': connection.vendor,
+            'database': str(name),
+            'fake_latency_s': options['latency'],
+            'question_bank': options['question_bank'],
+        })
+
+        self.stdout.write(json.dumps(result, indent=2))
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(result, f, indent=2)
+
+    def _revision(self):
+        try:
+            return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                                  capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
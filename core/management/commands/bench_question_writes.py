@@ -0,0 +1,85 @@
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+
+from core.bench import summarize, temporary_database
+from core.generation import save_questions
+from core.models import Interview, ProgrammingSkill, Question, User
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure write throughput of the generate-questions persistence path on a throwaway "
+        "database. Compare profiles by running it under each DB_PROFILE, e.g. "
+        "`DB_PROFILE=sqlite-wal manage.py bench_question_writes`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--interviews', type=int, default=50, help="Interviews written per thread")
+        parser.add_argument('--questions', type=int, default=9, help="Questions per interview")
+        parser.add_argument('--output', help="Write the result as JSON to this path")
+
+    def handle(self, *args, **options):
+        with temporary_database() as name:
+            result = self._run(options)
+        result.update({'profile': settings.DB_PROFILE, 'vendor': connection.vendor, 'database': str(name)})
+
+        self.stdout.write(json.dumps(result, indent=2))
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(result, f, indent=2)
+
+    def _run(self, options):
+        recruiter = User.objects.create_user(username='bench-recruiter', email='bench-recruiter@example.com', password='x', is_recruiter=True)
+        candidate = User.objects.create_user(username='bench-candidate', email='bench-candidate@example.com', password='x')
+        skill = ProgrammingSkill.objects.create(user=candidate, language='Python', proficiency=5)
+        connection.close()
+
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+        start_barrier = threading.Barrier(options['threads'])
+
+        def worker():
+            local_latencies, local_errors = [], 0
+            start_barrier.wait()
+            try:
+                for _ in range(options['interviews']):
+                    began = time.perf_counter()
+                    try:
+                        interview = Interview.objects.create(recruiter=recruiter, candidate=candidate)
+                        save_questions(interview, [
+                            Question(interview=interview, type='technical', content=f"Benchmark question {i}?", skill=skill)
+                            for i in range(options['questions'])
+                        ])
+                    except OperationalError:
+                        # "database is locked" and friends count as failed writes
+                        local_errors += 1
+                        continue
+                    local_latencies.append(time.perf_counter() - began)
+            finally:
+                connection.close()
+                with lock:
+                    latencies.extend(local_latencies)
+                    errors.append(local_errors)
+
+        threads = [threading.Thread(target=worker) for _ in range(options['threads'])]
+        began = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - began
+
+        result = summarize(latencies, elapsed, errors=sum(errors))
+        result.update({
+            'threads': options['threads'],
+            'questions_per_interview': options['questions'],
+            'questions_per_s': round(len(latencies) * options['questions'] / elapsed, 2) if elapsed else None,
+        })
+        return result
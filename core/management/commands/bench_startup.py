@@ -0,0 +1,90 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.bench import temporary_database
+from core.models import User
+
+# Runs in a fresh interpreter so nothing is already imported or warmed up
+PROBE = r"""
+import json, os, sys, time
+began = time.perf_counter()
+import django
+django.setup()
+import interview_ai.urls
+imported = time.perf_counter()
+from django.conf import settings
+from django.db import connections
+from django.test import Client
+options = json.loads(sys.argv[1])
+# The parent prepared a migrated throwaway database and a user to authenticate as
+connections['default'].settings_dict['NAME'] = options['database']
+settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+response = Client().get('/interviews/', HTTP_AUTHORIZATION=f"Bearer {options['token']}")
+responded = time.perf_counter()
+print(json.dumps({
+    'import_s': imported - began,
+    'first_request_s': responded - imported,
+    'status': response.status_code,
+    'modules': {name: name in sys.modules for name in options['modules']},
+}))
+"""
+
+WATCHED_MODULES = ['google.generativeai', 'grpc', 'openai']
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure cold-start cost: the time to set up Django and import the URLconf, "
+        "then serve a first authenticated GET /interviews/ (DRF, JWT and the ORM), each in a fresh "
+        "interpreter against a throwaway database. "
+        "Also reports whether the AI SDKs were imported along the way."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--output', help="Write the result as JSON to this path")
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'interview_ai.settings'))
+        samples = []
+        with temporary_database() as database:
+            user = User.objects.create_user(username='bench-startup', email='bench-startup@example.com',
+                                            password='bench-password', is_recruiter=True)
+            probe_options = json.dumps({
+                'database': str(database),
+                'token': str(RefreshToken.for_user(user).access_token),
+                'modules': WATCHED_MODULES,
+            })
+            for _ in range(options['runs']):
+                completed = subprocess.run(
+                    [sys.executable, '-c', PROBE, probe_options],
+                    cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True
+                )
+                sample = json.loads(completed.stdout.strip().splitlines()[-1])
+                # A rejected request (e.g. DisallowedHost, 401) would time an error path, not the API stack
+                if sample['status'] != 200:
+                    raise CommandError(f"First request returned {sample['status']}, expected 200")
+                samples.append(sample)
+
+        result = {
+            'runs': len(samples),
+            'llm_backend': settings.LLM_BACKEND,
+            'import_ms': self._median_ms(samples, 'import_s'),
+            'first_request_ms': self._median_ms(samples, 'first_request_s'),
+            'modules_loaded': samples[-1]['modules'] if samples else {},
+        }
+
+        self.stdout.write(json.dumps(result, indent=2))
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(result, f, indent=2)
+
+    def _median_ms(self, samples, key):
+        return round(statistics.median(sample[key] for sample in samples) * 1000, 2) if samples else None
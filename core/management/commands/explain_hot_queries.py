@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.query_plans import backend_name, check_plans
+
+
+class Command(BaseCommand):
+    help = "Print the query plan of each API hot query and flag full table scans."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help="Print the full plan for every query")
+        parser.add_argument('--fail-on-scan', action='store_true', help="Exit non-zero if any hot query scans a whole table")
+
+    def handle(self, *args, **options):
+        report = check_plans()
+        flagged = []
+        self.stdout.write(f"Query plans on {backend_name()}:")
+        for name, result in report.items():
+            if result['full_scans']:
+                flagged.append(name)
+                self.stdout.write(self.style.ERROR(f"  FULL SCAN  {name}: {', '.join(result['full_scans'])}"))
+            elif result['temp_sort']:
+                self.stdout.write(self.style.WARNING(f"  TEMP SORT  {name}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"  ok         {name}"))
+            if options['verbose_plans'] or result['full_scans']:
+                for line in result['plan']:
+                    self.stdout.write(f"      {line}")
+
+        if flagged and options['fail_on_scan']:
+            raise CommandError(f"Full table scans in: {', '.join(flagged)}")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.evaluation_cache import prune
+
+
+class Command(BaseCommand):
+    help = "Drop expired evaluation cache rows and the least recently used ones past EVALUATION_CACHE_MAX_ENTRIES."
+
+    def handle(self, *args, **options):
+        pruned = prune()
+        self.stdout.write(self.style.SUCCESS(f"Pruned {pruned} evaluation cache entries"))
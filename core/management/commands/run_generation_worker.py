@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.jobs import claim_next_job, fail_exhausted_jobs, run_job
+from core.management.worker import add_worker_id_argument, resolve_worker_id
+
+
+class Command(BaseCommand):
+    help = "Process queued question generation jobs. Run as many workers as needed."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Exit once the queue is empty")
+        parser.add_argument('--poll-interval', type=float, default=2.0, help="Seconds to sleep when the queue is empty")
+        add_worker_id_argument(parser)
+
+    def handle(self, *args, **options):
+        worker_id = resolve_worker_id(options)
+        self.stdout.write(f"Generation worker {worker_id} started")
+
+        try:
+            while True:
+                close_old_connections()
+                fail_exhausted_jobs()
+                job = claim_next_job(worker_id)
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                self.stdout.write(f"Running generation job {job.pk} for interview {job.interview_id} (attempt {job.attempts})")
+                run_job(job, worker_id)
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(f"Generation worker {worker_id} stopped")
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.management.worker import add_worker_id_argument, resolve_worker_id
+from core.outbox import drain
+
+
+class Command(BaseCommand):
+    help = "Send queued emails from the outbox in batches over a reused mail connection."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Exit once nothing is due")
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--poll-interval', type=float, default=5.0)
+        add_worker_id_argument(parser)
+
+    def handle(self, *args, **options):
+        worker_id = resolve_worker_id(options)
+        try:
+            while True:
+                close_old_connections()
+                sent, failed = drain(worker_id, options['batch_size'])
+                if sent or failed:
+                    self.stdout.write(f"Sent {sent} emails, {failed} failed")
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,12 @@
+import os
+import socket
+import uuid
+
+
+def add_worker_id_argument(parser):
+    parser.add_argument('--worker-id', default=None, help="Lease owner name (defaults to host:pid:random)")
+
+
+def resolve_worker_id(options):
+    # Unique per process, so leases held by a restarted worker are not mistaken for its own
+    return options['worker_id'] or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
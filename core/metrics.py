@@ -0,0 +1,359 @@
+import atexit
+import contextvars
+import glob
+import hmac
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden, HttpResponseNotFound
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _label_text(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def render(self, values=None):
+        # `values` replaces this process's own when rendering totals merged across processes
+        if values is None:
+            values = self.snapshot()
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self._samples(sorted(values.items())))
+        return lines
+
+    def snapshot(self):
+        with self._lock:
+            return {key: self._copy(value) for key, value in self._values.items()}
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        _maybe_flush()
+
+    def _copy(self, value):
+        return value
+
+    def _decode(self, value):
+        return value
+
+    def _merge(self, left, right):
+        return left + right
+
+    def _samples(self, items):
+        return [f"{self.name}{_label_text(self.labelnames, key)} {_number(value)}" for key, value in items]
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            self._values[key] = (counts, total + value)
+        _maybe_flush()
+
+    def _copy(self, value):
+        counts, total = value
+        return list(counts), total
+
+    def _decode(self, value):
+        counts, total = value
+        return list(counts), total
+
+    def _merge(self, left, right):
+        return [a + b for a, b in zip(left[0], right[0])], left[1] + right[1]
+
+    def _samples(self, items):
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_label_text(self.labelnames, key, [('le', _number(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_label_text(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+REGISTRY = []
+
+http_requests = Counter('http_requests_total', "Requests served, by endpoint and status.", ['method', 'endpoint', 'status'])
+http_latency = Histogram('http_request_duration_seconds', "Request latency, by endpoint.", ['method', 'endpoint'])
+http_db_queries = Histogram('http_request_db_queries', "Database queries per request, by endpoint.", ['endpoint'], QUERY_COUNT_BUCKETS)
+db_queries = Counter('db_queries_total', "Database queries run while serving requests, by endpoint.", ['endpoint'])
+db_seconds = Counter('db_query_seconds_total', "Time spent in database queries while serving requests, by endpoint.", ['endpoint'])
+llm_request_seconds = Counter('http_request_llm_seconds_total', "Time spent waiting on the LLM while serving requests, by endpoint.", ['endpoint'])
+llm_latency = Histogram('llm_call_duration_seconds', "LLM call latency including retries, by operation, priority and outcome.",
+                        ['operation', 'priority', 'outcome'], LLM_BUCKETS)
+llm_tokens = Counter('llm_tokens_total', "Tokens reported by the LLM provider, by kind (prompt/output) and priority.", ['kind', 'priority'])
+rate_limit_wait = Histogram('llm_rate_limit_wait_seconds', "Time calls waited for shared LLM quota, by priority.", ['priority'], LLM_BUCKETS)
+rate_limit_rejections = Counter('llm_rate_limit_rejections_total', "Calls turned away for lack of quota, by source (limiter/provider) and priority.",
+                                ['source', 'priority'])
+
+# Totals for the request being served; copied into worker threads along with the context
+_request_totals = contextvars.ContextVar('request_totals', default=None)
+_totals_lock = threading.Lock()
+
+
+def add_llm_time(seconds):
+    totals = _request_totals.get()
+    if totals is not None:
+        with _totals_lock:
+            totals['llm_seconds'] += seconds
+
+
+def observe_llm_call(operation, priority, outcome, seconds, prompt_tokens=None, output_tokens=None):
+    llm_latency.observe(seconds, operation=operation, priority=priority, outcome=outcome)
+    if prompt_tokens:
+        llm_tokens.inc(prompt_tokens, kind='prompt', priority=priority)
+    if output_tokens:
+        llm_tokens.inc(output_tokens, kind='output', priority=priority)
+    add_llm_time(seconds)
+
+
+def _endpoint(request):
+    match = getattr(request, 'resolver_match', None)
+    # The URL name keeps label cardinality bounded, unlike the raw path
+    return match.view_name if match and match.view_name else 'unmatched'
+
+
+class MetricsMiddleware:
+    """Records latency, status, DB query count/time and LLM wait for every request."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if request.path_info == settings.METRICS_PATH:
+            return self.get_response(request)
+        with self._measuring() as totals:
+            response = self.get_response(request)
+        self._record(request, response, totals)
+        return response
+
+    async def __acall__(self, request):
+        if request.path_info == settings.METRICS_PATH:
+            return await self.get_response(request)
+        with self._measuring() as totals:
+            response = await self.get_response(request)
+        self._record(request, response, totals)
+        return response
+
+    @contextmanager
+    def _measuring(self):
+        totals = {'db_queries': 0, 'db_seconds': 0.0, 'llm_seconds': 0.0}
+
+        def count_query(execute, sql, params, many, context):
+            began = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                with _totals_lock:
+                    totals['db_queries'] += 1
+                    totals['db_seconds'] += time.perf_counter() - began
+
+        token = _request_totals.set(totals)
+        began = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(count_query))
+                yield totals
+        finally:
+            _request_totals.reset(token)
+            totals['elapsed'] = time.perf_counter() - began
+
+    def _record(self, request, response, totals):
+        endpoint = _endpoint(request)
+        http_requests.inc(method=request.method, endpoint=endpoint, status=response.status_code)
+        http_latency.observe(totals['elapsed'], method=request.method, endpoint=endpoint)
+        http_db_queries.observe(totals['db_queries'], endpoint=endpoint)
+        db_queries.inc(totals['db_queries'], endpoint=endpoint)
+        db_seconds.inc(totals['db_seconds'], endpoint=endpoint)
+        if totals['llm_seconds']:
+            llm_request_seconds.inc(totals['llm_seconds'], endpoint=endpoint)
+
+
+def _stats_gauges():
+    # Cache counters are kept by their own modules; they are read at scrape time
+    # and describe only the process answering the scrape, even in multiprocess mode
+    from . import evaluation_cache, question_bank
+
+    lines = []
+    for prefix, stats in (('question_bank', question_bank.stats()), ('evaluation_cache', evaluation_cache.stats())):
+        for name, value in _flatten(prefix, stats):
+            lines += [f"# TYPE {name} gauge", f"{name} {_number(value)}"]
+    return lines
+
+
+def _flatten(prefix, stats):
+    for key, value in stats.items():
+        if isinstance(value, dict):
+            yield from _flatten(f"{prefix}_{key}", value)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield f"{prefix}_{key}", value
+
+
+# Multiprocess mode (METRICS_MULTIPROCESS_DIR): every process writes a snapshot
+# of its metrics to the shared directory at most every METRICS_FLUSH_INTERVAL
+# seconds and at exit, and a scrape of any process sums the snapshots of all of
+# them. Snapshots of exited processes are kept so counters never go backwards;
+# clear the directory when the whole deployment restarts.
+_flush_lock = threading.Lock()
+_last_flush = 0.0
+_snapshot_file = (None, None)
+
+
+def _snapshot_path(directory):
+    global _snapshot_file
+    pid = os.getpid()
+    if _snapshot_file[0] != pid:
+        # Named per process start, so a restarted worker that reuses a pid keeps the old totals apart
+        _snapshot_file = (pid, os.path.join(directory, f"{pid}-{uuid.uuid4().hex[:8]}.json"))
+    return _snapshot_file[1]
+
+
+def _write_snapshot(directory):
+    global _last_flush
+    path = _snapshot_path(directory)
+    data = {metric.name: [[list(key), value] for key, value in metric.snapshot().items()] for metric in REGISTRY}
+    with open(path + '.tmp', 'w') as f:
+        json.dump(data, f)
+    os.replace(path + '.tmp', path)
+    _last_flush = time.monotonic()
+
+
+def flush():
+    """Write this process's snapshot now; a no-op unless METRICS_MULTIPROCESS_DIR is set."""
+    directory = settings.METRICS_MULTIPROCESS_DIR
+    if directory:
+        with _flush_lock:
+            _write_snapshot(directory)
+
+
+def _maybe_flush():
+    directory = settings.METRICS_MULTIPROCESS_DIR
+    if not directory or time.monotonic() - _last_flush < settings.METRICS_FLUSH_INTERVAL:
+        return
+    # Another thread already writing the snapshot covers this update too
+    if _flush_lock.acquire(blocking=False):
+        try:
+            _write_snapshot(directory)
+        finally:
+            _flush_lock.release()
+
+
+atexit.register(flush)
+
+
+def _merged_values(directory):
+    flush()
+    metrics_by_name = {metric.name: metric for metric in REGISTRY}
+    merged = {name: {} for name in metrics_by_name}
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for name, entries in data.items():
+            metric = metrics_by_name.get(name)
+            if metric is None:
+                continue
+            values = merged[name]
+            for key, value in entries:
+                key, value = tuple(key), metric._decode(value)
+                values[key] = metric._merge(values[key], value) if key in values else value
+    return merged
+
+
+def render():
+    directory = settings.METRICS_MULTIPROCESS_DIR
+    merged = _merged_values(directory) if directory else {}
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render(merged.get(metric.name)))
+    lines.extend(_stats_gauges())
+    return '\n'.join(lines) + '\n'
+
+
+def reset():
+    for metric in REGISTRY:
+        metric.clear()
+
+
+def metrics_view(request):
+    # Scrapers authenticate with a static bearer token; without one the endpoint
+    # is hidden unless METRICS_PUBLIC opts in (e.g. behind a private network)
+    if settings.METRICS_TOKEN:
+        supplied = request.headers.get('Authorization', '').encode()
+        if not hmac.compare_digest(supplied, f"Bearer {settings.METRICS_TOKEN}".encode()):
+            return HttpResponseForbidden()
+    elif not settings.METRICS_PUBLIC:
+        return HttpResponseNotFound()
+    return HttpResponse(render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_evaluation_cache'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='interview',
+            index=models.Index(fields=['created_at', 'interview_id'], name='core_interview_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='interview',
+            index=models.Index(fields=['status', 'created_at', 'interview_id'], name='core_interview_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='interview',
+            index=models.Index(fields=['candidate', 'created_at', 'interview_id'], name='core_interview_cand_idx'),
+        ),
+    ]
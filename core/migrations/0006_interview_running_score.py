@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_interview_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='interview',
+            name='score_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='interview',
+            name='score_sum',
+            field=models.FloatField(default=0),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_interview_running_score'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='generationjob',
+            index=models.Index(fields=['interview', 'status', 'created_at'], name='core_genjob_interview_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='interview',
+            index=models.Index(fields=['candidate', 'status'], name='core_interview_cand_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='interview',
+            index=models.Index(fields=['recruiter', 'created_at', 'interview_id'], name='core_interview_recruiter_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='response',
+            index=models.Index(fields=['question', 'score'], name='core_response_qscore_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_email_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateLimitBucket',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('requests', models.FloatField()),
+                ('tokens', models.FloatField()),
+                ('refilled_at', models.FloatField()),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_rate_limit_bucket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='interview',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
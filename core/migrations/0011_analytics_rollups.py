@@ -0,0 +1,43 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_interview_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InterviewOutcomeRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('completed', models.IntegerField(default=0)),
+                ('passed', models.IntegerField(default=0)),
+                ('score_sum', models.FloatField(default=0)),
+                ('question_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='interview',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='SkillScoreRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('language', models.CharField(max_length=50)),
+                ('band', models.CharField(max_length=20)),
+                ('bucket', models.PositiveSmallIntegerField()),
+                ('responses', models.IntegerField(default=0)),
+                ('score_sum', models.FloatField(default=0)),
+            ],
+            options={
+                'unique_together': {('language', 'band', 'bucket')},
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.6 on 2026-10-18 20:01
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fail_duplicate_active_jobs(apps, schema_editor):
+    # Jobs enqueued by racing requests before the constraint existed; the oldest one is kept
+    GenerationJob = apps.get_model('core', 'GenerationJob')
+    seen = set()
+    duplicates = []
+    active = GenerationJob.objects.filter(status__in=['queued', 'running']).order_by('interview_id', 'created_at', 'id')
+    for job_id, interview_id in active.values_list('id', 'interview_id'):
+        if interview_id in seen:
+            duplicates.append(job_id)
+        seen.add(interview_id)
+    now = timezone.now()
+    GenerationJob.objects.filter(id__in=duplicates).update(
+        status='failed', error='Duplicate of another active job for the same interview',
+        lease_owner=None, lease_expires_at=None, finished_at=now, updated_at=now
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_analytics_rollups'),
+    ]
+
+    operations = [
+        migrations.RunPython(fail_duplicate_active_jobs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='generationjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['queued', 'running'])), fields=('interview',), name='core_genjob_one_active'),
+        ),
+    ]
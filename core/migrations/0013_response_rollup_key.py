@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-18 20:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_generation_job_one_active'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='response',
+            name='rollup_band',
+            field=models.CharField(blank=True, max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='response',
+            name='rollup_language',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator,MaxValueValidator
+from django.utils import timezone
 
 # Create your models here.
 class User(AbstractUser):
@@ -43,10 +44,30 @@ class Interview(models.Model):
     )
     candidate = models.ForeignKey(User, on_delete=models.CASCADE, blank=True, null=True, related_name='candidate')
     total_score = models.FloatField(null=True, blank=True)
+    # Running totals of scored responses, maintained by core.scoring
+    score_sum = models.FloatField(default=0)
+    score_count = models.IntegerField(default=0)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    # Bumped by every write that changes the detail payload; see core.interview_cache
+    version = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            # Back the keyset pagination order and the list filters
+            models.Index(fields=['created_at', 'interview_id'], name='core_interview_created_idx'),
+            models.Index(fields=['status', 'created_at', 'interview_id'], name='core_interview_status_idx'),
+            models.Index(fields=['candidate', 'created_at', 'interview_id'], name='core_interview_cand_idx'),
+            models.Index(fields=['candidate', 'status'], name='core_interview_cand_status_idx'),
+            models.Index(fields=['recruiter', 'created_at', 'interview_id'], name='core_interview_recruiter_idx'),
+        ]
 
     def __str__(self):
         return f"Interview {self.interview_id} for {self.candidate}"
 
+    @property
+    def live_score(self):
+        return self.score_sum / self.score_count if self.score_count else None
+
 class Question(models.Model):
     interview = models.ForeignKey(Interview, on_delete=models.CASCADE, related_name='questions')
     type = models.CharField(
@@ -68,10 +89,159 @@ class Response(models.Model):
     score = models.FloatField(null=True, blank=True)
     feedback = models.TextField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # The skill rollup row this score was counted under, so a rescore takes it
+    # back out of the same row even if the skill's proficiency has changed since
+    rollup_language = models.CharField(max_length=50, null=True, blank=True)
+    rollup_band = models.CharField(max_length=20, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Covers score reads per question without touching the table
+            models.Index(fields=['question', 'score'], name='core_response_qscore_idx'),
+        ]
 
     def __str__(self):
         return f"Response to {self.question}"
 
-    
-                             
+class QuestionBankEntry(models.Model):
+    language = models.CharField(max_length=50)
+    level = models.CharField(
+        max_length=20,
+        choices=[
+            ('beginner', 'Beginner'),
+            ('intermediate', 'Intermediate'),
+            ('advanced', 'Advanced')
+        ]
+    )
+    content = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['language', 'level', 'created_at'], name='core_qbank_key_created_idx'),
+        ]
 
+    def __str__(self):
+        return f"{self.language}/{self.level}: {self.content[:50]}"
+
+class GenerationJob(models.Model):
+    interview = models.ForeignKey(Interview, on_delete=models.CASCADE, related_name='generation_jobs')
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='generation_jobs')
+    status = models.CharField(
+        max_length=20,
+        choices=[
+            ('queued', 'Queued'),
+            ('running', 'Running'),
+            ('succeeded', 'Succeeded'),
+            ('failed', 'Failed')
+        ],
+        default='queued'
+    )
+    skills_total = models.IntegerField(default=0)
+    skills_done = models.IntegerField(default=0)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+    attempts = models.IntegerField(default=0)
+    lease_owner = models.CharField(max_length=100, null=True, blank=True)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='core_genjob_status_created_idx'),
+            models.Index(fields=['status', 'lease_expires_at'], name='core_genjob_status_lease_idx'),
+            models.Index(fields=['interview', 'status', 'created_at'], name='core_genjob_interview_idx'),
+        ]
+        constraints = [
+            # At most one queued or running job per interview; see core.jobs.enqueue_generation
+            models.UniqueConstraint(fields=['interview'], condition=models.Q(status__in=['queued', 'running']),
+                                    name='core_genjob_one_active'),
+        ]
+
+    def __str__(self):
+        return f"Generation job {self.id} for interview {self.interview_id} ({self.status})"
+
+class EvaluationCacheEntry(models.Model):
+    key = models.CharField(max_length=64, unique=True)
+    score = models.FloatField(null=True, blank=True)
+    feedback = models.TextField()
+    hits = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['last_used_at'], name='core_evalcache_last_used_idx'),
+        ]
+
+    def __str__(self):
+        return f"Evaluation {self.key[:12]} ({self.score})"
+
+class EmailOutbox(models.Model):
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    recipients = models.JSONField()
+    status = models.CharField(
+        max_length=20,
+        choices=[
+            ('pending', 'Pending'),
+            ('sending', 'Sending'),
+            ('sent', 'Sent'),
+            ('failed', 'Failed')
+        ],
+        default='pending'
+    )
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(null=True, blank=True)
+    lease_owner = models.CharField(max_length=100, null=True, blank=True)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='core_outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {', '.join(self.recipients)} ({self.status})"
+
+class RateLimitBucket(models.Model):
+    name = models.CharField(max_length=100, primary_key=True)
+    requests = models.FloatField()
+    tokens = models.FloatField()
+    # Unix timestamp so every process computes the refill from the same clock
+    refilled_at = models.FloatField()
+    version = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.requests:.1f} requests, {self.tokens:.0f} tokens"
+
+class SkillScoreRollup(models.Model):
+    # Scored responses per language, proficiency band and 10-point score bucket; maintained by core.analytics
+    language = models.CharField(max_length=50)
+    band = models.CharField(max_length=20)
+    bucket = models.PositiveSmallIntegerField()
+    responses = models.IntegerField(default=0)
+    score_sum = models.FloatField(default=0)
+
+    class Meta:
+        unique_together = ['language', 'band', 'bucket']
+
+    def __str__(self):
+        return f"{self.language}/{self.band} bucket {self.bucket}: {self.responses} responses"
+
+class InterviewOutcomeRollup(models.Model):
+    # Completed interviews per completion day; maintained by core.analytics
+    day = models.DateField(unique=True)
+    completed = models.IntegerField(default=0)
+    passed = models.IntegerField(default=0)
+    score_sum = models.FloatField(default=0)
+    question_count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.day}: {self.passed}/{self.completed} passed"
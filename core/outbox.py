@@ -0,0 +1,114 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_email(subject, body, recipients, from_email=None):
+    # Call inside the transaction that produced the email so both commit together
+    return EmailOutbox.objects.create(
+        subject=subject,
+        body=body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipients=list(recipients)
+    )
+
+
+def _due(now):
+    # Pending mail that is due, plus mail whose sender died mid-batch
+    return EmailOutbox.objects.filter(
+        Q(status='pending', next_attempt_at__lte=now) | Q(status='sending', lease_expires_at__lt=now)
+    )
+
+
+def claim_batch(worker_id, size=None):
+    now = timezone.now()
+    size = size or settings.EMAIL_OUTBOX_BATCH_SIZE
+    # A sender that died holding mail used up an attempt; mail that keeps taking
+    # its sender down is given up on instead of being claimed forever
+    EmailOutbox.objects.filter(
+        status='sending', lease_expires_at__lt=now, attempts__gte=settings.EMAIL_OUTBOX_MAX_ATTEMPTS
+    ).update(status='failed', last_error="Sender stopped before finishing", lease_owner=None, lease_expires_at=None)
+    ids = list(_due(now).order_by('next_attempt_at').values_list('id', flat=True)[:size])
+    if not ids:
+        return []
+    # The conditional UPDATE re-checks each row, so rows taken by another sender are
+    # skipped; the attempt is counted here so it survives the sender dying mid-batch
+    _due(now).filter(id__in=ids).update(
+        status='sending',
+        attempts=F('attempts') + 1,
+        lease_owner=worker_id,
+        lease_expires_at=now + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE_SECONDS)
+    )
+    return list(EmailOutbox.objects.filter(id__in=ids, status='sending', lease_owner=worker_id).order_by('id'))
+
+
+def _mark_failed(entry, worker_id, error):
+    # entry.attempts already counts this attempt, from claim_batch
+    attempts = entry.attempts
+    exhausted = attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS
+    delay = settings.EMAIL_OUTBOX_RETRY_BASE * 2 ** (attempts - 1)
+    EmailOutbox.objects.filter(pk=entry.pk, lease_owner=worker_id).update(
+        status='failed' if exhausted else 'pending',
+        last_error=error,
+        next_attempt_at=timezone.now() + timedelta(seconds=delay),
+        lease_owner=None,
+        lease_expires_at=None
+    )
+    logger.warning("Email %s attempt %d failed%s: %s", entry.pk, attempts, ' permanently' if exhausted else '', error)
+
+
+def _mark_sent(entry, worker_id):
+    EmailOutbox.objects.filter(pk=entry.pk, lease_owner=worker_id).update(
+        status='sent', sent_at=timezone.now(),
+        last_error=None, lease_owner=None, lease_expires_at=None
+    )
+
+
+def send_batch(entries, worker_id):
+    """Send claimed entries over one SMTP connection; returns (sent, failed)."""
+    if not entries:
+        return 0, 0
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        for entry in entries:
+            _mark_failed(entry, worker_id, f"Could not connect: {e}")
+        return 0, len(entries)
+
+    sent = failed = 0
+    try:
+        for entry in entries:
+            message = EmailMessage(entry.subject, entry.body, entry.from_email, entry.recipients, connection=connection)
+            try:
+                message.send()
+            except Exception as e:
+                _mark_failed(entry, worker_id, str(e))
+                failed += 1
+                continue
+            # Recorded straight away, so a sender that dies later in the batch does not send this one again
+            _mark_sent(entry, worker_id)
+            sent += 1
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def drain(worker_id, batch_size=None):
+    """Send everything that is currently due; returns (sent, failed)."""
+    total_sent = total_failed = 0
+    while True:
+        entries = claim_batch(worker_id, batch_size)
+        if not entries:
+            return total_sent, total_failed
+        sent, failed = send_batch(entries, worker_id)
+        total_sent += sent
+        total_failed += failed
@@ -0,0 +1,12 @@
+from rest_framework.pagination import CursorPagination
+
+
+class InterviewCursorPagination(CursorPagination):
+    # Each page seeks past the last created_at seen, so deep pages cost about the
+    # same as the first. DRF keys the cursor on the first ordering field only:
+    # rows sharing the boundary timestamp are stepped over with an offset kept in
+    # the cursor, and interview_id just makes the order among them stable
+    ordering = ('-created_at', '-interview_id')
+    page_size = 25
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -0,0 +1,20 @@
+from rest_framework.parsers import BaseParser
+
+
+class UploadStreamParser(BaseParser):
+    """Hands the request body to the view unread, so large uploads can be consumed row by row."""
+
+    format = None
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return {'format': self.format, 'stream': stream}
+
+
+class CSVStreamParser(UploadStreamParser):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class NDJSONStreamParser(UploadStreamParser):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
@@ -0,0 +1,63 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import (
+    EvaluationCacheEntry, GenerationJob, Interview, ProgrammingSkill, Question,
+    QuestionBankEntry, Response,
+)
+
+# Plan lines that mean every row of a table is read
+FULL_SCAN_PATTERNS = [
+    re.compile(r'^\W*SCAN (?P<table>\w+)(?!.*\bUSING\b)'),  # SQLite
+    re.compile(r'Seq Scan on (?P<table>\w+)'),              # PostgreSQL
+]
+TEMP_SORT_PATTERN = re.compile(r'USE TEMP B-TREE FOR ORDER BY')
+
+
+def hot_queries():
+    """The query shapes issued by the API hot paths, with representative parameters."""
+    now = timezone.now()
+    return {
+        'interview_list': Interview.objects.order_by('-created_at', '-interview_id')[:26],
+        'interview_list_by_status': Interview.objects.filter(status='in_progress').order_by('-created_at', '-interview_id')[:26],
+        'interview_list_by_candidate': Interview.objects.filter(candidate_id=1).order_by('-created_at', '-interview_id')[:26],
+        'interview_by_candidate_status': Interview.objects.filter(candidate_id=1, status='in_progress'),
+        'interview_list_by_recruiter': Interview.objects.filter(recruiter_id=1).order_by('-created_at', '-interview_id')[:26],
+        'questions_for_interviews': Question.objects.filter(interview_id__in=[1, 2, 3]),
+        'question_in_interview': Question.objects.filter(id=1, interview_id=1),
+        'skills_for_candidate': ProgrammingSkill.objects.filter(user_id=1),
+        'response_scores_for_interview': Response.objects.filter(question__interview_id=1).values_list('score'),
+        'generation_job_claim': GenerationJob.objects.filter(
+            Q(status='queued') | Q(status='running', lease_expires_at__lt=now), attempts__lt=3
+        ).order_by('created_at')[:10],
+        'generation_job_active': GenerationJob.objects.filter(interview_id=1, status__in=['queued', 'running']).order_by('-created_at')[:1],
+        'question_bank_pool': QuestionBankEntry.objects.filter(language='python', level='beginner', created_at__gte=now)
+        .order_by('-created_at').values_list('content')[:60],
+        'evaluation_cache_lookup': EvaluationCacheEntry.objects.filter(key='0' * 64, created_at__gte=now),
+    }
+
+
+def check_plans(queries=None):
+    """Run EXPLAIN for each hot query. Returns {name: {'plan': [...], 'full_scans': [...], 'temp_sort': bool}}."""
+    report = {}
+    for name, queryset in (queries or hot_queries()).items():
+        plan = queryset.explain().splitlines()
+        full_scans = []
+        for line in plan:
+            for pattern in FULL_SCAN_PATTERNS:
+                match = pattern.search(line)
+                if match:
+                    full_scans.append(match.group('table'))
+        report[name] = {
+            'plan': plan,
+            'full_scans': full_scans,
+            'temp_sort': any(TEMP_SORT_PATTERN.search(line) for line in plan),
+        }
+    return report
+
+
+def backend_name():
+    return connection.vendor
@@ -0,0 +1,105 @@
+import logging
+import random
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .caching import LRUCache
+from .models import QuestionBankEntry
+
+logger = logging.getLogger(__name__)
+
+# Pools per (language, level) kept in front of the database
+_pools = LRUCache(maxsize=settings.QUESTION_BANK_LRU_SIZE, ttl=settings.QUESTION_BANK_LRU_TTL)
+
+_counter_lock = threading.Lock()
+_counters = {'hits': 0, 'misses': 0, 'refreshes': 0, 'stored': 0, 'evicted': 0}
+
+
+def _count(name, amount=1):
+    with _counter_lock:
+        _counters[name] += amount
+
+
+def _key(language, level):
+    return (language.strip().lower(), level)
+
+
+def _load_pool(language, level):
+    key = _key(language, level)
+    pool = _pools.get(key)
+    if pool is None:
+        cutoff = timezone.now() - timedelta(seconds=settings.QUESTION_BANK_TTL)
+        pool = list(
+            QuestionBankEntry.objects
+            .filter(language=key[0], level=level, created_at__gte=cutoff)
+            .order_by('-created_at')
+            .values_list('content', flat=True)[:settings.QUESTION_BANK_MAX_PER_KEY]
+        )
+        _pools.set(key, pool)
+    return pool
+
+
+def draw(language, level, count=None):
+    """Return `count` pooled questions, or None when the model should be called instead.
+
+    The pool is used once it holds QUESTION_BANK_MIN_POOL live entries. A small
+    fraction of calls (QUESTION_BANK_REFRESH_RATE) still go to the model so the
+    pool keeps picking up fresh questions.
+    """
+    if not settings.QUESTION_BANK_ENABLED:
+        return None
+    count = count or settings.QUESTIONS_PER_SKILL
+    pool = _load_pool(language, level)
+    if len(pool) < max(settings.QUESTION_BANK_MIN_POOL, count):
+        _count('misses')
+        return None
+    if random.random() < settings.QUESTION_BANK_REFRESH_RATE:
+        _count('refreshes')
+        return None
+    _count('hits')
+    return random.sample(pool, count)
+
+
+def store(language, level, questions):
+    if not settings.QUESTION_BANK_ENABLED or not questions:
+        return
+    key = _key(language, level)
+    QuestionBankEntry.objects.bulk_create([
+        QuestionBankEntry(language=key[0], level=level, content=question)
+        for question in questions
+    ])
+    _count('stored', len(questions))
+
+    # Drop expired entries, then trim the oldest ones past the size limit
+    entries = QuestionBankEntry.objects.filter(language=key[0], level=level)
+    cutoff = timezone.now() - timedelta(seconds=settings.QUESTION_BANK_TTL)
+    evicted, _ = entries.filter(created_at__lt=cutoff).delete()
+    overflow = list(
+        entries.order_by('-created_at', '-id')
+        .values_list('id', flat=True)[settings.QUESTION_BANK_MAX_PER_KEY:]
+    )
+    if overflow:
+        evicted += QuestionBankEntry.objects.filter(id__in=overflow).delete()[0]
+    if evicted:
+        _count('evicted', evicted)
+        logger.debug("Evicted %d question bank entries for %s", evicted, key)
+    _pools.delete(key)
+
+
+def stats():
+    with _counter_lock:
+        counters = dict(_counters)
+    lookups = counters['hits'] + counters['misses'] + counters['refreshes']
+    counters['hit_rate'] = round(counters['hits'] / lookups, 4) if lookups else 0.0
+    counters['lru'] = _pools.stats()
+    return counters
+
+
+def reset():
+    _pools.clear()
+    with _counter_lock:
+        for name in _counters:
+            _counters[name] = 0
@@ -0,0 +1,225 @@
+import asyncio
+import logging
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import F
+
+from . import metrics
+from .models import RateLimitBucket
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 'interactive'
+BULK = 'bulk'
+PRIORITIES = (INTERACTIVE, BULK)
+
+# Upper bound on one sleep, so waiters notice quota freed by a settle or a changed limit
+MAX_SLEEP = 1.0
+# Sleep between polls while a bulk caller steps aside for interactive waiters
+YIELD_SLEEP = 0.05
+CAS_ATTEMPTS = 5
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _empty_stats():
+    return {
+        'provider_rejections': 0,
+        **{priority: {'acquired': 0, 'rejected': 0, 'waiting': 0, 'wait_seconds_total': 0.0, 'wait_seconds_max': 0.0}
+           for priority in PRIORITIES}
+    }
+
+
+_stats_lock = threading.Lock()
+_stats = _empty_stats()
+
+
+def _record(priority, waited=None, rejected=False):
+    with _stats_lock:
+        counters = _stats[priority]
+        if rejected:
+            counters['rejected'] += 1
+        else:
+            counters['acquired'] += 1
+            counters['wait_seconds_total'] += waited
+            counters['wait_seconds_max'] = max(counters['wait_seconds_max'], waited)
+    if rejected:
+        metrics.rate_limit_rejections.inc(source='limiter', priority=priority)
+    else:
+        metrics.rate_limit_wait.observe(waited, priority=priority)
+
+
+def _waiting(priority, delta):
+    with _stats_lock:
+        _stats[priority]['waiting'] += delta
+
+
+def _interactive_waiting():
+    with _stats_lock:
+        return _stats[INTERACTIVE]['waiting'] > 0
+
+
+def record_provider_rejection(priority):
+    with _stats_lock:
+        _stats['provider_rejections'] += 1
+    metrics.rate_limit_rejections.inc(source='provider', priority=priority)
+
+
+def _refill(level, limit, elapsed):
+    return min(limit, level + elapsed * limit / 60)
+
+
+def _seconds_short(level, amount, floor, limit):
+    # Seconds of refill needed before `amount` can be taken without dipping below `floor`
+    missing = amount + floor - level
+    return missing * 60 / limit if missing > 0 else 0
+
+
+class TokenBucketLimiter:
+    """Requests-per-minute and tokens-per-minute quota shared by every process through one database row.
+
+    Both buckets refill continuously up to one minute's worth. Taking from them
+    is a compare-and-swap on the row's version, like job leases, so processes
+    never hold a lock while they wait. Bulk callers may not draw the buckets
+    into the interactive reserve, and within a process they also step aside
+    while an interactive call is waiting.
+    """
+
+    def __init__(self, name, rpm, tpm, reserve=0.0, max_wait=None):
+        self.name = name
+        self.rpm = rpm
+        self.tpm = tpm
+        self.reserve = reserve
+        self.max_wait = max_wait or {}
+
+    def _max_wait(self, priority, max_wait):
+        # The priority's configured wait, shortened when the caller has less time left
+        configured = self.max_wait.get(priority, 0)
+        return configured if max_wait is None else max(0, min(configured, max_wait))
+
+    def acquire(self, tokens=0, priority=INTERACTIVE, max_wait=None):
+        """Block until the call may go ahead and return the seconds waited.
+
+        Raises RateLimitExceeded as soon as the quota cannot be available within
+        the priority's maximum wait, or within `max_wait` seconds when that is shorter.
+        """
+        began = time.monotonic()
+        max_wait = self._max_wait(priority, max_wait)
+        _waiting(priority, 1)
+        try:
+            while True:
+                sleep = self._poll(tokens, priority, began, max_wait)
+                if sleep is None:
+                    return time.monotonic() - began
+                time.sleep(sleep)
+        finally:
+            _waiting(priority, -1)
+
+    async def aacquire(self, tokens=0, priority=INTERACTIVE, max_wait=None):
+        # Same as acquire(), but waits on the event loop instead of blocking a thread
+        began = time.monotonic()
+        max_wait = self._max_wait(priority, max_wait)
+        _waiting(priority, 1)
+        try:
+            while True:
+                sleep = await sync_to_async(self._poll)(tokens, priority, began, max_wait)
+                if sleep is None:
+                    return time.monotonic() - began
+                await asyncio.sleep(sleep)
+        finally:
+            _waiting(priority, -1)
+
+    def _poll(self, tokens, priority, began, max_wait):
+        # One attempt: None once the quota is taken, otherwise how long to sleep before the next
+        if priority != INTERACTIVE and _interactive_waiting():
+            wait = YIELD_SLEEP
+        else:
+            wait = self._take(tokens, priority)
+            if not wait:
+                _record(priority, time.monotonic() - began)
+                return None
+        if time.monotonic() + wait > began + max_wait:
+            _record(priority, rejected=True)
+            raise RateLimitExceeded(
+                f"Rate limit '{self.name}' has no quota for a {priority} call; retry in {wait:.1f}s",
+                retry_after=wait
+            )
+        return min(wait, MAX_SLEEP)
+
+    def _take(self, tokens, priority):
+        # Returns 0 once the quota is taken, otherwise the seconds until it could be
+        floor = self.reserve if priority != INTERACTIVE else 0
+        for _ in range(CAS_ATTEMPTS):
+            bucket, _ = RateLimitBucket.objects.get_or_create(name=self.name, defaults={
+                'requests': self.rpm, 'tokens': self.tpm, 'refilled_at': time.time()
+            })
+            now = time.time()
+            elapsed = max(0.0, now - bucket.refilled_at)
+            levels = {}
+            wait = 0
+            for field, limit, amount in (('requests', self.rpm, 1), ('tokens', self.tpm, tokens)):
+                if not limit:
+                    continue
+                level = _refill(getattr(bucket, field), limit, elapsed)
+                # A call bigger than the usable bucket would never fit, so it waits for a full one
+                amount = min(amount, limit * (1 - floor))
+                wait = max(wait, _seconds_short(level, amount, limit * floor, limit))
+                levels[field] = level - amount
+            if wait:
+                return wait
+            taken = RateLimitBucket.objects.filter(name=self.name, version=bucket.version).update(
+                refilled_at=now, version=F('version') + 1, **levels
+            )
+            if taken:
+                return 0
+        return YIELD_SLEEP
+
+    def settle(self, estimated, actual):
+        # Charges (or refunds) the difference once the provider reports what a call really used
+        if not self.tpm or actual is None or actual == estimated:
+            return
+        RateLimitBucket.objects.filter(name=self.name).update(
+            tokens=F('tokens') - (actual - estimated), version=F('version') + 1
+        )
+
+
+def from_settings():
+    if not settings.LLM_RATE_LIMIT_RPM and not settings.LLM_RATE_LIMIT_TPM:
+        return None
+    return TokenBucketLimiter(
+        'llm',
+        rpm=settings.LLM_RATE_LIMIT_RPM,
+        tpm=settings.LLM_RATE_LIMIT_TPM,
+        reserve=settings.LLM_RATE_LIMIT_INTERACTIVE_RESERVE,
+        max_wait=settings.LLM_RATE_LIMIT_MAX_WAIT
+    )
+
+
+def stats():
+    with _stats_lock:
+        snapshot = {'provider_rejections': _stats['provider_rejections']}
+        for priority in PRIORITIES:
+            counters = dict(_stats[priority])
+            counters['wait_seconds_avg'] = (
+                round(counters['wait_seconds_total'] / counters['acquired'], 4) if counters['acquired'] else None
+            )
+            snapshot[priority] = counters
+    snapshot.update(rpm=settings.LLM_RATE_LIMIT_RPM, tpm=settings.LLM_RATE_LIMIT_TPM)
+    return snapshot
+
+
+def reset():
+    with _stats_lock:
+        fresh = _empty_stats()
+        # Callers still blocked in acquire() will decrement their own count
+        for priority in PRIORITIES:
+            fresh[priority]['waiting'] = _stats[priority]['waiting']
+        _stats.clear()
+        _stats.update(fresh)
@@ -0,0 +1,75 @@
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from . import analytics, interview_cache
+from .models import Interview, Response
+
+
+def _apply(interview_id, score_delta, count_delta):
+    # Always bumps the version: even an unscored response is a new write to the interview
+    interview_cache.bump(
+        interview_id,
+        score_sum=F('score_sum') + score_delta,
+        score_count=F('score_count') + count_delta
+    )
+
+
+def add_responses(interview, responses):
+    """Insert Response rows and add their scores to the interview's running totals atomically."""
+    scores = [response.score for response in responses if response.score is not None]
+    analytics.stamp(responses)
+    with transaction.atomic():
+        created = Response.objects.bulk_create(responses)
+        _apply(interview.pk, sum(scores), len(scores))
+        analytics.record_responses(created)
+    return created
+
+
+def rescore_response(response, score):
+    with transaction.atomic():
+        # Lock the row so two rescoring requests cannot both apply the same old score
+        current = Response.objects.select_for_update().select_related('question__skill').get(pk=response.pk)
+        old = current.score
+        language, band = analytics.rollup_key(current.question.skill)
+        Response.objects.filter(pk=response.pk).update(score=score, rollup_language=language, rollup_band=band)
+        _apply(
+            current.question.interview_id,
+            (score or 0) - (old or 0),
+            (score is not None) - (old is not None)
+        )
+        # The old score comes out of the row it was counted under, which rows scored before the key was kept lack
+        old_language, old_band = (current.rollup_language, current.rollup_band) if current.rollup_language else (language, band)
+        analytics.record_scores([(old_language, old_band, old, -1), (language, band, score, 1)])
+    response.score, response.rollup_language, response.rollup_band = score, language, band
+    return response
+
+
+def backfill(batch_size=500):
+    """Recompute running totals for every interview from its responses; returns rows updated."""
+    updated = 0
+    last_id = 0
+    while True:
+        interviews = list(
+            Interview.objects.filter(pk__gt=last_id).order_by('pk')
+            .only('interview_id', 'score_sum', 'score_count')[:batch_size]
+        )
+        if not interviews:
+            return updated
+        last_id = interviews[-1].pk
+
+        totals = {
+            row['question__interview']: (row['score_sum'], row['score_count'])
+            for row in Response.objects.filter(score__isnull=False, question__interview__in=interviews)
+            .values('question__interview')
+            .annotate(score_sum=Sum('score'), score_count=Count('id'))
+        }
+        changed = []
+        for interview in interviews:
+            score_sum, score_count = totals.get(interview.pk, (0, 0))
+            if (interview.score_sum, interview.score_count) != (score_sum, score_count):
+                interview.score_sum, interview.score_count = score_sum, score_count
+                interview.version = F('version') + 1
+                changed.append(interview)
+        if changed:
+            updated += Interview.objects.bulk_update(changed, ['score_sum', 'score_count', 'version'])
+            interview_cache.invalidate(*(interview.pk for interview in changed))
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import User,ProgrammingSkill,Question,Response,Interview
+from .models import User,ProgrammingSkill,Question,Response,Interview,GenerationJob
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -33,7 +33,22 @@ class ResponseSerializer(serializers.ModelSerializer):
 
 class InterviewSerializer(serializers.ModelSerializer):
     questions = QuestionsSerializer(many=True, read_only=True)
+    live_score = serializers.FloatField(read_only=True)
 
     class Meta:
         model = Interview
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+        read_only_fields = ('score_sum', 'score_count', 'version', 'completed_at')
+
+class GenerationJobSerializer(serializers.ModelSerializer):
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = GenerationJob
+        fields = ('id', 'interview', 'status', 'skills_total', 'skills_done', 'progress',
+                  'attempts', 'result', 'error', 'created_at', 'updated_at', 'finished_at')
+
+    def get_progress(self, obj):
+        if obj.status == 'succeeded':
+            return 1.0
+        return round(obj.skills_done / obj.skills_total, 2) if obj.skills_total else 0.0
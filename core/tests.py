@@ -1,3 +1,1221 @@
-from django.test import TestCase
+import asyncio
+import csv
+import importlib
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core import mail
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import clear_url_caches
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import evaluation_cache, jobs, llm, metrics, outbox, question_bank, rate_limit
+from .log import BackgroundHandler, CorrelationIdFilter, correlation
+from .models import (
+    EmailOutbox, EvaluationCacheEntry, GenerationJob, Interview, InterviewOutcomeRollup, ProgrammingSkill, Question, Response, SkillScoreRollup, User
+)
+from .bench import run_api_load
+from .evaluation import evaluate_answer, evaluate_answers, extract_score, group_by_token_budget, parse_batch_evaluation
+from .generation import agenerate_questions_for_skills
+from .query_plans import check_plans
+from .scoring import add_responses, rescore_response
+from .views import InterviewViewSet
+
+
+@override_settings(QUESTION_BANK_REFRESH_RATE=0, LLM_BACKEND='core.llm.FakeBackend',
+                   LLM_RATE_LIMIT_RPM=0, LLM_RATE_LIMIT_TPM=0)
+class QueryCountTests(TestCase):
+    """Pins the number of queries per endpoint so N+1 regressions fail the build."""
+
+    def setUp(self):
+        question_bank.reset()
+        evaluation_cache.reset()
+        # Interview ids are reused between tests, so versions cached by an earlier one would match
+        caches[settings.INTERVIEW_DETAIL_CACHE].clear()
+
+        self.recruiter = User.objects.create_user(username='recruiter', email='recruiter@example.com', password='pw', is_recruiter=True)
+        self.candidate = User.objects.create_user(username='candidate', email='candidate@example.com', password='pw')
+        self.skills = [
+            ProgrammingSkill.objects.create(user=self.candidate, language=language, proficiency=proficiency)
+            for language, proficiency in [('Python', 3), ('Go', 6), ('Rust', 9)]
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.recruiter)
+
+    def _create_interviews(self, count, questions=3):
+        interviews = []
+        for _ in range(count):
+            interview = Interview.objects.create(recruiter=self.recruiter, candidate=self.candidate)
+            Question.objects.bulk_create([
+                Question(interview=interview, type='technical', content=f'Question {i}?', skill=self.skills[0])
+                for i in range(questions)
+            ])
+            interviews.append(interview)
+        return interviews
+
+    def test_list_is_constant_in_number_of_interviews(self):
+        self._create_interviews(1)
+        with self.assertNumQueries(2):
+            response = self.client.get('/interviews/')
+        self.assertEqual(response.status_code, 200)
+
+        self._create_interviews(10)
+        with self.assertNumQueries(2):
+            response = self.client.get('/interviews/')
+        self.assertEqual(len(response.json()['results']), 11)
+
+    def test_list_pages_with_cursor(self):
+        self._create_interviews(5)
+        response = self.client.get('/interviews/', {'page_size': 2})
+        ids = [item['interview_id'] for item in response.json()['results']]
+        with self.assertNumQueries(2):
+            response = self.client.get(response.json()['next'])
+        ids += [item['interview_id'] for item in response.json()['results']]
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        self.assertEqual(len(set(ids)), 4)
+
+    def test_list_filters(self):
+        interviews = self._create_interviews(3)
+        Interview.objects.filter(pk=interviews[0].pk).update(status='completed')
+        response = self.client.get('/interviews/', {'status': 'completed', 'candidate': self.candidate.pk, 'created_after': '2000-01-01'})
+        self.assertEqual([item['interview_id'] for item in response.json()['results']], [interviews[0].pk])
+        self.assertEqual(self.client.get('/interviews/', {'created_before': 'yesterday'}).status_code, 400)
+
+    def test_candidate_list(self):
+        self._create_interviews(5)
+        self.client.force_authenticate(self.candidate)
+        with self.assertNumQueries(2):
+            response = self.client.get('/interviews/')
+        self.assertEqual(len(response.json()['results']), 5)
+
+    def test_detail(self):
+        interview = self._create_interviews(1, questions=8)[0]
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/interviews/{interview.pk}/')
+        self.assertEqual(len(response.json()['questions']), 8)
+
+    @override_settings(EXPORT_CHUNK_SIZE=5)
+    def test_export_streams_in_chunks(self):
+        interviews = self._create_interviews(12)
+        question = interviews[0].questions.first()
+        add_responses(interviews[0], [Response(question=question, content='A', score=6), Response(question=question, content='B', score=8)])
+
+        response = self.client.get('/interviews/export/', {'output': 'ndjson'})
+        self.assertTrue(response.streaming)
+        # One cursor over the interviews, then questions and responses for each chunk of five
+        with self.assertNumQueries(7):
+            records = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([record['interview_id'] for record in records], [interview.pk for interview in interviews])
+        self.assertEqual(records[0]['skill_scores'], {'Python': 7.0})
+        self.assertEqual(len(records[0]['questions'][0]['responses']), 2)
+
+        response = self.client.get('/interviews/export/', {'status': 'pending', 'candidate': self.candidate.pk})
+        rows = list(csv.DictReader(StringIO(b''.join(response.streaming_content).decode())))
+        # Two responses to the first question, then one row per unanswered question
+        self.assertEqual(len(rows), 12 * 3 + 1)
+        self.assertEqual((rows[0]['response'], rows[1]['response'], rows[0]['skill_scores']), ('A', 'B', 'Python:7.0'))
+        self.assertEqual(self.client.get('/interviews/export/', {'output': 'xml'}).status_code, 400)
+
+    def test_csv_export_neutralises_formulas(self):
+        interview = self._create_interviews(1, questions=1)[0]
+        add_responses(interview, [
+            Response(question=interview.questions.get(), content=content, score=50, feedback=feedback)
+            for content, feedback in (('=HYPERLINK("http://example.com")', '+1 for effort'), ('-x', '@SUM(A1)'), ('a = b', None))
+        ])
+        response = self.client.get('/interviews/export/')
+        rows = list(csv.DictReader(StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([(row['response'], row['feedback']) for row in rows], [
+            ('\'=HYPERLINK("http://example.com")', "'+1 for effort"), ("'-x", "'@SUM(A1)"), ('a = b', ''),
+        ])
+        self.assertEqual(rows[0]['score'], '50.0')
+
+    def test_detail_conditional_get(self):
+        interview = self._create_interviews(1)[0]
+        url = f'/interviews/{interview.pk}/'
+        etag = self.client.get(url)['ETag']
+
+        # Revalidation and repeat reads are answered from the cache
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.json()['questions'][0]['content'], 'Question 0?')
+
+        # A scored response bumps the version, so the old ETag no longer matches
+        add_responses(interview, [Response(question=interview.questions.first(), content='A', score=8)])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['live_score'], 8)
+
+        # Candidates only see their own interviews, cached or not
+        other = User.objects.create_user(username='other', email='other@example.com', password='pw')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 404)
+
+    def test_update_writes_only_submitted_fields(self):
+        interview = self._create_interviews(1)[0]
+        # Loaded before a response is scored concurrently
+        stale = Interview.objects.get(pk=interview.pk)
+        add_responses(interview, [Response(question=interview.questions.first(), content='A', score=8)])
+        version = Interview.objects.get(pk=interview.pk).version
+
+        with mock.patch.object(InterviewViewSet, 'get_object', return_value=stale):
+            response = self.client.patch(f'/interviews/{interview.pk}/', {'status': 'completed'}, format='json')
+        self.assertEqual((response.json()['status'], response.json()['version']), ('completed', version + 1))
+        interview.refresh_from_db()
+        self.assertEqual((interview.status, interview.score_sum, interview.score_count), ('completed', 8, 1))
+        self.assertEqual(interview.version, version + 1)
+
+    @override_settings(QUESTION_BANK_ENABLED=False)
+    def test_generate_questions(self):
+        interview = Interview.objects.create(recruiter=self.recruiter, candidate=self.candidate)
+        # interview + skills, then one bulk insert and the status update in a transaction
+        with self.assertNumQueries(6):
+            response = self.client.post(f'/interviews/{interview.pk}/generate-questions/')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['total_questions'], 9)
+
+    def test_generate_questions_from_question_bank(self):
+        for _ in range(3):
+            interview = Interview.objects.create(recruiter=self.recruiter, candidate=self.candidate)
+            self.client.post(f'/interviews/{interview.pk}/generate-questions/')
+
+        interview = Interview.objects.create(recruiter=self.recruiter, candidate=self.candidate)
+        # One pool read per skill (the LRU entry is dropped when a pool grows), no model calls
+        with self.assertNumQueries(9):
+            response = self.client.post(f'/interviews/{interview.pk}/generate-questions/')
+        self.assertEqual(response.json()['total_questions'], 9)
+
+    def test_submit_response(self):
+        interview = self._create_interviews(1)[0]
+        question = interview.questions.first()
+        self.client.force_authenticate(self.candidate)
+        # interview, question, evaluation cache lookup + upsert, then the
+        # response insert, running-score update and rollup upsert in one transaction
+        with self.assertNumQueries(9):
+            response = self.client.post(f'/interviews/{interview.pk}/submit-response/', {
+                'question_id': question.pk, 'content': 'An answer'
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['score'], 75)
+
+    def test_submit_responses_is_constant_in_batch_size(self):
+        interview = self._create_interviews(1, questions=6)[0]
+        questions = list(interview.questions.all())
+        self.client.force_authenticate(self.candidate)
+        payload = {'responses': [{'question_id': question.pk, 'content': f'Answer {question.pk}'} for question in questions]}
+        # interview, questions, one cache read + one upsert per model group, then one bulk insert,
+        # the running-score update and one rollup upsert in a transaction
+        with self.assertNumQueries(9):
+            response = self.client.post(f'/interviews/{interview.pk}/submit-responses/', payload, format='json')
+        self.assertEqual([item['score'] for item in response.json()['responses']], [75] * 6)
+
+    def test_list_bodies_are_rejected(self):
+        interview = self._create_interviews(1)[0]
+        for action in ('generate-questions', 'submit-response', 'submit-responses', 'submit-response-stream'):
+            with self.subTest(action=action):
+                response = self.client.post(f'/interviews/{interview.pk}/{action}/', [1, 2], format='json')
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {'error': 'Request body must be a JSON object'})
+
+    @override_settings(SUBMIT_RESPONSES_MAX_ITEMS=2)
+    def test_submit_responses_caps_the_batch(self):
+        interview = self._create_interviews(1)[0]
+        self.client.force_authenticate(self.candidate)
+        payload = {'responses': [{'question_id': question.pk, 'content': 'An answer'} for question in interview.questions.all()]}
+        response = self.client.post(f'/interviews/{interview.pk}/submit-responses/', payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Response.objects.exists())
+
+    def test_complete_interview(self):
+        interview = self._create_interviews(1)[0]
+        add_responses(interview, [
+            Response(question=question, content='answer', score=score)
+            for question, score in zip(interview.questions.all(), [60, 80, 100])
+        ])
+        # Locks the row by bumping its version, reads the running totals, saves
+        # them, updates the outcome rollup and queues the result email in one
+        # transaction; no aggregate, no SMTP
+        with self.assertNumQueries(8):
+            response = self.client.post(f'/interviews/{interview.pk}/complete-interview/')
+        self.assertEqual(response.json()['total_score'], 80)
+        self.assertEqual(len(mail.outbox), 0)
+
+        call_command('send_outbox_emails', '--once', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['candidate@example.com'])
+        self.assertEqual(EmailOutbox.objects.get().status, 'sent')
+
+    def test_complete_interview_with_unscored_responses(self):
+        interview = self._create_interviews(1)[0]
+        self.assertEqual(self.client.post(f'/interviews/{interview.pk}/complete-interview/').status_code, 400)
+
+        # Responses the model could not score still complete the interview, without a total
+        add_responses(interview, [Response(question=interview.questions.first(), content='answer', score=None)])
+        response = self.client.post(f'/interviews/{interview.pk}/complete-interview/')
+        self.assertEqual((response.status_code, response.json()['total_score']), (200, None))
+        interview.refresh_from_db()
+        self.assertEqual((interview.status, interview.total_score), ('completed', None))
+
+    @override_settings(ANALYTICS_PASS_SCORE=70)
+    def test_analytics_reads_rollups(self):
+        passed, failed = self._create_interviews(2)
+        for interview, scores in ((passed, [60, 80, 100]), (failed, [30, 55, None])):
+            add_responses(interview, [
+                Response(question=question, content='answer', score=score)
+                for question, score in zip(interview.questions.all(), scores)
+            ])
+            self.client.post(f'/interviews/{interview.pk}/complete-interview/')
+        # Completing again moves the interview rather than counting it twice
+        self.client.post(f'/interviews/{failed.pk}/complete-interview/')
+
+        with self.assertNumQueries(2):
+            response = self.client.get('/analytics/', {'period': 'month'})
+        body = response.json()
+        skill, = body['skills']
+        self.assertEqual((skill['language'], skill['band'], skill['responses']), ('Python', 'beginner', 5))
+        self.assertEqual(skill['average_score'], 65)
+        self.assertEqual((skill['distribution']['30-40'], skill['distribution']['90-100']), (1, 1))
+        outcome, = body['outcomes']
+        self.assertEqual((outcome['completed'], outcome['passed'], outcome['pass_rate'], outcome['average_questions']), (2, 1, 0.5, 3))
+
+        # A rebuild from the source tables arrives at the same figures
+        call_command('rebuild_analytics', stdout=StringIO())
+        self.assertEqual(self.client.get('/analytics/', {'period': 'month'}).json(), body)
+        self.assertEqual(self.client.get('/analytics/', {'period': 'year'}).status_code, 400)
+
+    def test_concurrent_completion_counts_once(self):
+        interview = self._create_interviews(1)[0]
+        add_responses(interview, [
+            Response(question=question, content='answer', score=score)
+            for question, score in zip(interview.questions.all(), [60, 80, 100])
+        ])
+        # Read before a concurrent request completes it: the view must use the locked row, not this copy
+        stale_interview = Interview.objects.annotate(question_count=Count('questions')).get(pk=interview.pk)
+        self.client.post(f'/interviews/{interview.pk}/complete-interview/')
+        with mock.patch.object(InterviewViewSet, 'get_object', return_value=stale_interview):
+            self.assertEqual(self.client.post(f'/interviews/{interview.pk}/complete-interview/').status_code, 200)
+        outcome = InterviewOutcomeRollup.objects.get()
+        self.assertEqual((outcome.completed, outcome.passed, outcome.question_count), (1, 1, 3))
+
+    def test_concurrent_completions_on_default_sqlite_profile(self):
+        # The in-memory test database does not lock like a database file, so the
+        # completions run in a subprocess against a temporary file on the default profile.
+        # Each holds its transaction open long enough for all of them to overlap
+        probe = (
+            "import json, threading, time, django; django.setup()\n"
+            "from unittest import mock\n"
+            "from django.db import connections\n"
+            "from django.test import Client\n"
+            "from django.test.utils import setup_test_environment\n"
+            "from rest_framework_simplejwt.tokens import RefreshToken\n"
+            "from core import analytics\n"
+            "from core.bench import temporary_database\n"
+            "from core.models import Interview, InterviewOutcomeRollup, Question, Response, User\n"
+            "from core.scoring import add_responses\n"
+            "setup_test_environment()\n"
+            "with temporary_database():\n"
+            "    recruiter = User.objects.create_user(username='recruiter', email='recruiter@example.com', password='pw', is_recruiter=True)\n"
+            "    auth = f'Bearer {RefreshToken.for_user(recruiter).access_token}'\n"
+            "    ids = []\n"
+            "    for n in range(4):\n"
+            "        candidate = User.objects.create_user(username=f'candidate-{n}', email=f'candidate-{n}@example.com', password='pw')\n"
+            "        interview = Interview.objects.create(recruiter=recruiter, candidate=candidate)\n"
+            "        question = Question.objects.create(interview=interview, type='technical', content='Question?')\n"
+            "        add_responses(interview, [Response(question=question, content='answer', score=70)])\n"
+            "        ids.append(interview.pk)\n"
+            "    connections.close_all()\n"
+            "    record, barrier, statuses = analytics.record_completion, threading.Barrier(len(ids)), []\n"
+            "    def slow(*args):\n"
+            "        time.sleep(0.2)\n"
+            "        return record(*args)\n"
+            "    def complete(pk):\n"
+            "        try:\n"
+            "            barrier.wait()\n"
+            "            statuses.append(Client(raise_request_exception=False).post(\n"
+            "                f'/interviews/{pk}/complete-interview/', HTTP_AUTHORIZATION=auth).status_code)\n"
+            "        finally:\n"
+            "            connections.close_all()\n"
+            "    with mock.patch.object(analytics, 'record_completion', slow):\n"
+            "        threads = [threading.Thread(target=complete, args=(pk,)) for pk in ids]\n"
+            "        [thread.start() for thread in threads]\n"
+            "        [thread.join() for thread in threads]\n"
+            "    print(json.dumps([sorted(statuses), InterviewOutcomeRollup.objects.get().completed]))\n"
+        )
+        env = dict(os.environ, DB_PROFILE='sqlite', DJANGO_SETTINGS_MODULE='interview_ai.settings')
+        completed = subprocess.run([sys.executable, '-c', probe], cwd=settings.BASE_DIR, env=env,
+                                   capture_output=True, text=True, check=True)
+        self.assertEqual(json.loads(completed.stdout.strip().splitlines()[-1]), [[200] * 4, 4])
+
+    def test_rescore_takes_score_out_of_its_original_band(self):
+        interview = self._create_interviews(1, questions=1)[0]
+        created, = add_responses(interview, [Response(question=interview.questions.get(), content='answer', score=30)])
+        self.assertEqual((created.rollup_language, created.rollup_band), ('Python', 'beginner'))
+        # The candidate's proficiency moves up a band before the response is rescored
+        ProgrammingSkill.objects.filter(pk=self.skills[0].pk).update(proficiency=9)
+        rescore_response(created, 90)
+
+        rows = {(row.band, row.bucket): row.responses for row in SkillScoreRollup.objects.filter(responses__gt=0)}
+        self.assertEqual(rows, {('advanced', 9): 1})
+        self.assertFalse(SkillScoreRollup.objects.filter(responses__lt=0).exists())
+        call_command('rebuild_analytics', stdout=StringIO())
+        self.assertEqual({(row.band, row.bucket): row.responses for row in SkillScoreRollup.objects.all()}, rows)
+
+    def test_live_score(self):
+        interview = self._create_interviews(1)[0]
+        created = add_responses(interview, [
+            Response(question=question, content='answer', score=score)
+            for question, score in zip(interview.questions.all(), [50, None, 90])
+        ])
+        rescore_response(created[1], 40)
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/interviews/{interview.pk}/score/')
+        self.assertEqual(response.json()['live_score'], 60)
+
+        Interview.objects.filter(pk=interview.pk).update(score_sum=0, score_count=0)
+        call_command('backfill_interview_scores', stdout=StringIO())
+        interview.refresh_from_db()
+        self.assertEqual((interview.score_sum, interview.score_count), (180, 3))
+
+
+@override_settings(LLM_BACKEND='core.llm.FakeBackend', LLM_RATE_LIMIT_RPM=0, LLM_RATE_LIMIT_TPM=0, LLM_MAX_RETRIES=0,
+                   QUESTION_BANK_ENABLED=False, QUESTION_GENERATION_CONCURRENCY=4, QUESTION_GENERATION_TIMEOUT=0.5)
+class ConcurrentGenerationTests(TestCase):
+    def setUp(self):
+        self.recruiter = User.objects.create_user(username='recruiter', email='recruiter@example.com', password='pw', is_recruiter=True)
+        self.candidate = User.objects.create_user(username='candidate', email='candidate@example.com', password='pw')
+        for language in ('Python', 'Go', 'Rust', 'Java'):
+            ProgrammingSkill.objects.create(user=self.candidate, language=language, proficiency=5)
+        self.interview = Interview.objects.create(recruiter=self.recruiter, candidate=self.candidate)
+        self.client = APIClient()
+        self.client.force_authenticate(self.recruiter)
+
+    def test_skills_run_concurrently_and_failures_are_reported(self):
+        generate = llm.FakeBackend.generate
+        lock = threading.Lock()
+        calls = {'running': 0, 'peak': 0}
+
+        def fake(backend, prompt, **kwargs):
+            with lock:
+                calls['running'] += 1
+                calls['peak'] = max(calls['peak'], calls['running'])
+            try:
+                language = prompt.split()[-2]
+                # Python finishes after Java, so the response order has to come from the skills
+                time.sleep({'Python': 0.2, 'Rust': 1}.get(language, 0.05))
+                if language == 'Go':
+                    raise ValueError('bad request')
+                return generate(backend, prompt, **kwargs)
+            finally:
+                with lock:
+                    calls['running'] -= 1
+
+        began = time.monotonic()
+        with mock.patch.object(llm.FakeBackend, 'generate', autospec=True, side_effect=fake):
+            response = self.client.post(f'/interviews/{self.interview.pk}/generate-questions/')
+        # Rust is cut off at the deadline instead of holding up the request
+        self.assertLess(time.monotonic() - began, 1)
+        self.assertGreater(calls['peak'], 1)
+
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual([group['language'] for group in body['questions_by_skill']], ['Python', 'Java'])
+        self.assertEqual([failed['language'] for failed in body['failed_skills']], ['Go', 'Rust'])
+        saved = Question.objects.filter(interview=self.interview)
+        self.assertEqual(sorted(set(saved.values_list('skill__language', flat=True))), ['Java', 'Python'])
+        self.assertEqual(saved.count(), body['total_questions'])
+
+    @override_settings(QUESTION_GENERATION_CONCURRENCY=2, QUESTION_GENERATION_TIMEOUT=0.3)
+    async def test_async_path_bounds_concurrency_and_time(self):
+        agenerate = llm.FakeBackend.agenerate
+        calls = {'running': 0, 'peak': 0}
+
+        async def fake(backend, prompt, **kwargs):
+            calls['running'] += 1
+            calls['peak'] = max(calls['peak'], calls['running'])
+            try:
+                await asyncio.sleep(2 if prompt.split()[-2] == 'Rust' else 0.05)
+                return await agenerate(backend, prompt, **kwargs)
+            finally:
+                calls['running'] -= 1
+
+        skills = [skill async for skill in ProgrammingSkill.objects.filter(user=self.candidate).order_by('pk')]
+        began = time.monotonic()
+        with mock.patch.object(llm.FakeBackend, 'agenerate', fake):
+            results = await agenerate_questions_for_skills(skills)
+        # Two rounds of two calls share one deadline of two timeouts
+        self.assertLess(time.monotonic() - began, 1)
+        self.assertEqual(calls['peak'], 2)
+        self.assertEqual([bool(questions) for questions in results], [True, True, False, True])
+
+
+@override_settings(LLM_BACKEND='core.llm.FakeBackend', LLM_RATE_LIMIT_RPM=0, LLM_RATE_LIMIT_TPM=0,
+                   QUESTION_BANK_ENABLED=False, QUESTION_GENERATION_CONCURRENCY=1)
+class GenerationJobTests(TestCase):
+    def setUp(self):
+        self.recruiter = User.objects.create_user(username='recruiter', email='recruiter@example.com', password='pw', is_recruiter=True)
+        self.candidate = User.objects.create_user(username='candidate', email='candidate@example.com', password='pw')
+        ProgrammingSkill.objects.create(user=self.candidate, language='Python', proficiency=5)
+        self.interview = Interview.objects.create(recruiter=self.recruiter, candidate=self.candidate)
+
+    def _expire(self, job):
+        GenerationJob.objects.filter(pk=job.pk).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+
+    def test_claim_with_conditional_update(self):
+        job, _ = jobs.enqueue_generation(self.interview, self.recruiter)
+        with mock.patch.object(connection.features, 'has_select_for_update_skip_locked', False):
+            claimed = jobs.claim_next_job('worker-1')
+            self.assertEqual((claimed.pk, claimed.status, claimed.lease_owner, claimed.attempts), (job.pk, 'running', 'worker-1', 1))
+            # Leased, so nobody else can claim it
+            self.assertIsNone(jobs.claim_next_job('worker-2'))
+
+    def test_claim_with_skip_locked(self):
+        job, _ = jobs.enqueue_generation(self.interview, self.recruiter)
+        with mock.patch.object(connection.features, 'has_select_for_update_skip_locked', True):
+            claimed = jobs.claim_next_job('worker-1')
+            self.assertEqual((claimed.pk, claimed.lease_owner, claimed.attempts), (job.pk, 'worker-1', 1))
+            self.assertIsNone(jobs.claim_next_job('worker-2'))
+
+    def test_expired_lease_is_taken_over(self):
+        job, _ = jobs.enqueue_generation(self.interview, self.recruiter)
+        jobs.claim_next_job('worker-1')
+        self._expire(job)
+        claimed = jobs.claim_next_job('worker-2')
+        self.assertEqual((claimed.pk, claimed.lease_owner, claimed.attempts), (job.pk, 'worker-2', 2))
+        # The first worker finds out the next time it touches the job
+        with self.assertRaises(jobs.LeaseLost):
+            jobs._renew(job, 'worker-1')
+
+    def test_run_job_succeeds(self):
+        jobs.enqueue_generation(self.interview, self.recruiter)
+        job = jobs.claim_next_job('worker-1')
+        jobs.run_job(job, 'worker-1')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.lease_owner, job.skills_done, job.skills_total), ('succeeded', None, 1, 1))
+        self.assertEqual(job.result['total_questions'], self.interview.questions.count())
+
+    def test_lost_lease_rolls_back_questions(self):
+        jobs.enqueue_generation(self.interview, self.recruiter)
+        job = jobs.claim_next_job('worker-1')
+        renew = jobs._renew
+
+        def taken_over_before_commit(job, worker_id, **fields):
+            if fields.get('status') == 'succeeded':
+                GenerationJob.objects.filter(pk=job.pk).update(lease_owner='worker-2')
+            return renew(job, worker_id, **fields)
+
+        with mock.patch.object(jobs, '_renew', side_effect=taken_over_before_commit):
+            jobs.run_job(job, 'worker-1')
+        # The failed success write takes the questions and the status change down with it
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result), ('running', None))
+        self.interview.refresh_from_db()
+        self.assertEqual((self.interview.questions.count(), self.interview.status), (0, 'pending'))
+
+    def test_rate_limited_job_is_requeued(self):
+        jobs.enqueue_generation(self.interview, self.recruiter)
+        job = jobs.claim_next_job('worker-1')
+        with mock.patch.object(jobs, 'generate_interview_questions', side_effect=llm.LLMRateLimited('no quota', 30)):
+            jobs.run_job(job, 'worker-1')
+        job.refresh_from_db()
+        # The attempt is handed back, so running out of quota never exhausts a job
+        self.assertEqual((job.status, job.attempts, job.lease_owner, job.lease_expires_at), ('queued', 0, None, None))
+
+    @override_settings(GENERATION_JOB_MAX_ATTEMPTS=2)
+    def test_fail_exhausted_jobs(self):
+        other = Interview.objects.create(recruiter=self.recruiter, candidate=self.candidate)
+        exhausted = GenerationJob.objects.create(interview=self.interview, status='running', attempts=2, lease_owner='gone')
+        retryable = GenerationJob.objects.create(interview=other, status='running', attempts=1, lease_owner='gone')
+        for job in (exhausted, retryable):
+            self._expire(job)
+        self.assertEqual(jobs.fail_exhausted_jobs(), 1)
+        exhausted.refresh_from_db()
+        self.assertEqual((exhausted.status, exhausted.lease_owner), ('failed', None))
+        # The other one is still claimable
+        self.assertEqual(jobs.claim_next_job('worker-1').pk, retryable.pk)
+
+    def test_async_generate_questions_and_job_visibility(self):
+        client = APIClient()
+        client.force_authenticate(self.recruiter)
+        response = client.post(f'/interviews/{self.interview.pk}/generate-questions/?async=1')
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['job_id']
+        response = client.post(f'/interviews/{self.interview.pk}/generate-questions/?async=1')
+        self.assertEqual((response.status_code, response.json()['job_id']), (202, job_id))
+
+        outsider = User.objects.create_user(username='outsider', email='outsider@example.com', password='pw')
+        other = Interview.objects.create(recruiter=self.recruiter, candidate=outsider)
+        other_job, _ = jobs.enqueue_generation(other, self.recruiter)
+
+        def visible(user):
+            client.force_authenticate(user)
+            return sorted(job['id'] for job in client.get('/generation-jobs/').json())
+
+        self.assertEqual(visible(self.recruiter), sorted([job_id, other_job.pk]))
+        self.assertEqual(visible(self.candidate), [job_id])
+        self.assertEqual(client.get(f'/generation-jobs/{other_job.pk}/').status_code, 404)
+
+    def test_one_active_job_per_interview(self):
+        job, created = jobs.enqueue_generation(self.interview, self.recruiter)
+        self.assertTrue(created)
+        self.assertEqual(jobs.enqueue_generation(self.interview, self.recruiter), (job, False))
+        # A request that raced past the lookup is stopped by the constraint
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            GenerationJob.objects.create(interview=self.interview)
+
+        GenerationJob.objects.filter(pk=job.pk).update(status='succeeded')
+        self.assertTrue(jobs.enqueue_generation(self.interview, self.recruiter)[1])
+
+    def test_heartbeat_renews_lease_until_stopped(self):
+        job = GenerationJob.objects.create(interview=self.interview)
+        with mock.patch.object(jobs, '_renew') as renew:
+            heartbeat = jobs.LeaseHeartbeat(job, 'worker-1', interval=0.01)
+            heartbeat.start()
+            time.sleep(0.1)
+            heartbeat.stop()
+            beats = renew.call_count
+            time.sleep(0.05)
+        self.assertGreater(beats, 1)
+        self.assertEqual(renew.call_count, beats)
+        renew.assert_called_with(job, 'worker-1')
+
+        # A lost lease ends the heartbeat
+        with mock.patch.object(jobs, '_renew', side_effect=jobs.LeaseLost('lost')) as renew:
+            heartbeat = jobs.LeaseHeartbeat(job, 'worker-1', interval=0.01)
+            heartbeat.start()
+            heartbeat.join(1)
+        self.assertFalse(heartbeat.is_alive())
+        self.assertEqual(renew.call_count, 1)
+
+
+class RateLimitTests(TestCase):
+    def setUp(self):
+        rate_limit.reset()
+
+    def test_bulk_calls_leave_the_interactive_reserve(self):
+        limiter = rate_limit.TokenBucketLimiter('test', rpm=4, tpm=0, reserve=0.5, max_wait={})
+        for _ in range(2):
+            limiter.acquire(priority=rate_limit.BULK)
+        with self.assertRaises(rate_limit.RateLimitExceeded):
+            limiter.acquire(priority=rate_limit.BULK)
+        for _ in range(2):
+            limiter.acquire(priority=rate_limit.INTERACTIVE)
+        with self.assertRaises(rate_limit.RateLimitExceeded) as raised:
+            limiter.acquire(priority=rate_limit.INTERACTIVE)
+        self.assertGreater(raised.exception.retry_after, 10)
+
+        stats = rate_limit.stats()
+        self.assertEqual((stats['bulk']['acquired'], stats['bulk']['rejected']), (2, 1))
+        self.assertEqual((stats['interactive']['acquired'], stats['interactive']['rejected']), (2, 1))
+
+    def test_tokens_per_minute(self):
+        limiter = rate_limit.TokenBucketLimiter('test', rpm=0, tpm=1000, max_wait={})
+        limiter.acquire(tokens=600)
+        with self.assertRaises(rate_limit.RateLimitExceeded):
+            limiter.acquire(tokens=600)
+        # The provider reported less than was charged, so the difference comes back
+        limiter.settle(600, 200)
+        limiter.acquire(tokens=600)
+
+    @override_settings(LLM_BACKEND='core.llm.FakeBackend', LLM_RATE_LIMIT_RPM=1, LLM_RATE_LIMIT_TPM=0,
+                       LLM_RATE_LIMIT_MAX_WAIT={}, EVALUATION_CACHE_ENABLED=False)
+    def test_exhausted_quota_returns_429(self):
+        recruiter = User.objects.create_user(username='recruiter', email='recruiter@example.com', password='pw', is_recruiter=True)
+        candidate = User.objects.create_user(username='candidate', email='candidate@example.com', password='pw')
+        interview = Interview.objects.create(recruiter=recruiter, candidate=candidate)
+        question = Question.objects.create(interview=interview, type='technical', content='Question?')
+        client = APIClient()
+        client.force_authenticate(candidate)
+
+        payload = {'question_id': question.pk, 'content': 'An answer'}
+        self.assertEqual(client.post(f'/interviews/{interview.pk}/submit-response/', payload, format='json').status_code, 201)
+        response = client.post(f'/interviews/{interview.pk}/submit-response/', payload, format='json')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+
+
+    @override_settings(LLM_BACKEND='core.llm.FakeBackend', LLM_RATE_LIMIT_RPM=1, LLM_RATE_LIMIT_TPM=0,
+                       LLM_RATE_LIMIT_MAX_WAIT={'interactive': 5, 'bulk': 60}, QUESTION_GENERATION_TIMEOUT=1,
+                       QUESTION_BANK_ENABLED=False, QUESTION_GENERATION_CONCURRENCY=1)
+    def test_generation_out_of_quota_returns_429_within_deadline(self):
+        recruiter = User.objects.create_user(username='recruiter', email='recruiter@example.com', password='pw', is_recruiter=True)
+        candidate = User.objects.create_user(username='candidate', email='candidate@example.com', password='pw')
+        for language in ('Python', 'Go', 'Rust'):
+            ProgrammingSkill.objects.create(user=candidate, language=language, proficiency=5)
+        interview = Interview.objects.create(recruiter=recruiter, candidate=candidate)
+        client = APIClient()
+        client.force_authenticate(recruiter)
+
+        began = time.monotonic()
+        # Sequential generation (test threads cannot share the test transaction), which had no deadline before
+        response = client.post(f'/interviews/{interview.pk}/generate-questions/')
+        # The bulk wait allowance (60s) is longer than the request's deadline, so the
+        # missing quota is reported as a 429 instead of skills that timed out
+        self.assertEqual(response.status_code, 429)
+        self.assertLess(time.monotonic() - began, 1)
+
+
+class LoggingTests(TestCase):
+    def test_request_id_is_echoed_or_generated(self):
+        client = APIClient()
+        self.assertEqual(client.get('/interviews/', HTTP_X_REQUEST_ID='abc-123')['X-Request-ID'], 'abc-123')
+        self.assertEqual(len(client.get('/interviews/', HTTP_X_REQUEST_ID='bad id\n')['X-Request-ID']), 32)
+
+    def test_background_handler_writes_json_lines(self):
+        with tempfile.TemporaryDirectory() as directory:
+            handler = BackgroundHandler(filename=os.path.join(directory, 'app.log'), max_bytes=200, backup_count=2)
+            # Each process rotates a file of its own
+            path = handler.filename
+            self.assertEqual(path, os.path.join(directory, f'app.{os.getpid()}.log'))
+            handler.addFilter(CorrelationIdFilter())
+            logger = logging.getLogger('core.tests.background')
+            logger.addHandler(handler)
+            logger.propagate = False
+            try:
+                with correlation('req-1'):
+                    for number in range(5):
+                        logger.warning("Message %d of %s", number, 'test', extra={'interview_id': number})
+            finally:
+                logger.removeHandler(handler)
+                handler.close()
+
+            entry = json.loads(open(path).read().splitlines()[-1])
+            self.assertEqual((entry['message'], entry['correlation_id'], entry['interview_id']), ('Message 4 of test', 'req-1', 4))
+            self.assertTrue(os.path.exists(path + '.1'))
+
+
+@override_settings(LLM_BACKEND='core.llm.FakeBackend', LLM_RATE_LIMIT_RPM=0, LLM_RATE_LIMIT_TPM=0, METRICS_TOKEN='', METRICS_PUBLIC=True)
+class MetricsTests(TestCase):
+    def test_requests_queries_and_llm_calls_are_exported(self):
+        metrics.reset()
+        evaluation_cache.reset()
+        user = User.objects.create_user(username='candidate', email='candidate@example.com', password='pw')
+        interview = Interview.objects.create(recruiter=user, candidate=user)
+        question = Question.objects.create(interview=interview, type='technical', content='Question?')
+        client = APIClient()
+        client.force_authenticate(user)
+        client.post(f'/interviews/{interview.pk}/submit-response/', {'question_id': question.pk, 'content': 'An answer'}, format='json')
+
+        body = client.get('/metrics').content.decode()
+        self.assertIn('http_requests_total{method="POST",endpoint="interview-submit-response",status="201"} 1', body)
+        self.assertIn('http_request_db_queries_count{endpoint="interview-submit-response"} 1', body)
+        self.assertIn('llm_call_duration_seconds_count{operation="generate",priority="interactive",outcome="ok"} 1', body)
+        self.assertIn('llm_tokens_total{kind="prompt",priority="interactive"}', body)
+        self.assertIn('evaluation_cache_misses 1', body)
+        self.assertRegex(body, r'db_queries_total\{endpoint="interview-submit-response"\} [1-9]')
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token_is_required_when_configured(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret').status_code, 200)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secrets').status_code, 403)
+
+    def test_multiprocess_scrapes_sum_every_process(self):
+        metrics.reset()
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_MULTIPROCESS_DIR=directory):
+            # Another worker's snapshot, as it would have written it
+            with open(os.path.join(directory, '1-other.json'), 'w') as f:
+                json.dump({
+                    'http_requests_total': [[['GET', 'interview-list', '200'], 3]],
+                    'llm_call_duration_seconds': [[['generate', 'bulk', 'ok'], [[1] + [0] * 10, 0.5]]],
+                }, f)
+            metrics.http_requests.inc(2, method='GET', endpoint='interview-list', status='200')
+            metrics.llm_latency.observe(3, operation='generate', priority='bulk', outcome='ok')
+
+            body = self.client.get('/metrics').content.decode()
+            self.assertEqual(len(os.listdir(directory)), 2)
+        self.assertIn('http_requests_total{method="GET",endpoint="interview-list",status="200"} 5', body)
+        self.assertIn('llm_call_duration_seconds_bucket{operation="generate",priority="bulk",outcome="ok",le="0.1"} 1', body)
+        self.assertIn('llm_call_duration_seconds_count{operation="generate",priority="bulk",outcome="ok"} 2', body)
+        self.assertIn('llm_call_duration_seconds_sum{operation="generate",priority="bulk",outcome="ok"} 3.5', body)
+
+    def test_route_follows_metrics_path(self):
+        def reload_urls():
+            importlib.reload(importlib.import_module(settings.ROOT_URLCONF))
+            clear_url_caches()
+
+        try:
+            with override_settings(METRICS_PATH='/internal/metrics'):
+                reload_urls()
+                self.assertEqual(self.client.get('/internal/metrics').status_code, 200)
+                self.assertEqual(self.client.get('/metrics').status_code, 404)
+        finally:
+            reload_urls()
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    @override_settings(METRICS_PUBLIC=False)
+    def test_anonymous_scrape_is_rejected_by_default(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn(b'http_requests_total', response.content)
+
+
+@override_settings(LLM_BACKEND='core.llm.FakeBackend', LLM_RATE_LIMIT_RPM=0, LLM_RATE_LIMIT_TPM=0, QUESTION_BANK_ENABLED=False)
+class BenchTests(TestCase):
+    def test_api_load_walks_the_whole_flow(self):
+        result = run_api_load(users=2, concurrency=1, answers=2)
+        self.assertEqual(result['overall']['errors'], 0)
+        self.assertEqual({operation: summary['operations'] for operation, summary in result['operations'].items()}, {
+            'register': 2, 'login': 2, 'generate_questions': 2, 'submit_response': 4, 'complete_interview': 2
+        })
+        self.assertIsNotNone(result['overall']['p99_ms'])
+
+    def test_server_errors_count_against_their_operation(self):
+        with mock.patch.object(InterviewViewSet, 'complete_interview', side_effect=RuntimeError('boom')):
+            result = run_api_load(users=2, concurrency=1, answers=1)
+        self.assertEqual(result['aborted_flows'], 0)
+        self.assertEqual(result['operations']['complete_interview']['errors'], 2)
+        self.assertEqual(result['overall']['errors'], 2)
+
+
+class BulkImportTests(TestCase):
+    def setUp(self):
+        self.recruiter = User.objects.create_user(username='recruiter', email='recruiter@example.com', password='pw', is_recruiter=True)
+        self.candidates = [
+            User.objects.create_user(username=f'candidate{i}', email=f'candidate{i}@example.com', password='pw')
+            for i in range(3)
+        ]
+        ProgrammingSkill.objects.create(user=self.candidates[0], language='Python', proficiency=3)
+        self.client = APIClient()
+        self.client.force_authenticate(self.recruiter)
+
+    @override_settings(BULK_IMPORT_CHUNK_SIZE=2)
+    def test_csv_import_upserts_skills_and_reports_bad_rows(self):
+        body = (
+            'candidate,skills\n'
+            'candidate0,Python:8;Go:5\n'
+            'candidate1@example.com,C++:7\n'
+            'nobody,Python:5\n'
+            'candidate2,Rust:11\n'
+            'candidate2,\n'
+        )
+        response = self.client.post('/interviews/import/?generate_questions=1', body, content_type='text/csv')
+        self.assertEqual(response.status_code, 201)
+        report = response.json()
+        self.assertEqual((report['rows'], report['interviews_created'], report['generation_jobs_queued']), (5, 3, 3))
+        self.assertEqual([error['line'] for error in report['errors']], [4, 5])
+        # The existing Python skill is updated in place rather than failing on the unique constraint
+        self.assertEqual(
+            dict(self.candidates[0].skills.values_list('language', 'proficiency')), {'Python': 8, 'Go': 5}
+        )
+        self.assertEqual(Interview.objects.filter(recruiter=self.recruiter).count(), 3)
+
+    def test_ndjson_upload(self):
+        upload = SimpleUploadedFile('batch.ndjson', b'\n'.join([
+            json.dumps({'candidate': 'candidate1', 'skills': [{'language': 'Go', 'proficiency': 4}]}).encode(),
+            b'{not json',
+            json.dumps({'candidate': 'candidate2', 'skills': {'Java': 6}}).encode(),
+        ]))
+        response = self.client.post('/interviews/import/', {'file': upload}, format='multipart')
+        self.assertEqual(response.json()['interviews_created'], 2)
+        self.assertEqual(response.json()['errors'], [{'line': 2, 'error': 'Invalid JSON'}])
+        self.assertEqual(self.candidates[2].skills.get().language, 'Java')
+
+    def test_rejects_candidates_and_bad_headers(self):
+        response = self.client.post('/interviews/import/', 'name\nx\n', content_type='text/csv')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("'candidate' column", response.json()['errors'][0]['error'])
+
+        self.client.force_authenticate(self.candidates[0])
+        response = self.client.post('/interviews/import/', 'candidate\ncandidate0\n', content_type='text/csv')
+        self.assertEqual(response.status_code, 403)
+
+
+@override_settings(LLM_BACKEND='core.llm.FakeBackend', LLM_RATE_LIMIT_RPM=0, LLM_RATE_LIMIT_TPM=0, QUESTION_BANK_ENABLED=False)
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        self.recruiter = User.objects.create_user(username='recruiter', email='recruiter@example.com', password='pw', is_recruiter=True)
+        self.candidate = User.objects.create_user(username='candidate', email='candidate@example.com', password='pw')
+        ProgrammingSkill.objects.create(user=self.candidate, language='Python', proficiency=5)
+        self.interview = Interview.objects.create(recruiter=self.recruiter, candidate=self.candidate)
+
+    def _auth(self, user):
+        return {'Authorization': f'Bearer {RefreshToken.for_user(user).access_token}'}
+
+    async def test_generate_then_submit(self):
+        response = await self.async_client.post(f'/async/interviews/{self.interview.pk}/generate-questions/',
+                                                headers=self._auth(self.recruiter))
+        self.assertEqual(response.status_code, 201)
+        question_id = response.json()['questions_by_skill'][0]['questions'][0]['id']
+
+        response = await self.async_client.post(f'/async/interviews/{self.interview.pk}/submit-response/',
+                                                {'question_id': question_id, 'content': 'An answer'},
+                                                content_type='application/json', headers=self._auth(self.candidate))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['score'], 75)
+        interview = await Interview.objects.aget(pk=self.interview.pk)
+        self.assertEqual((interview.status, interview.score_count), ('in_progress', 1))
+
+    async def test_generate_is_limited_to_visible_interviews(self):
+        other = await User.objects.acreate(username='other', email='other@example.com')
+        response = await self.async_client.post(f'/async/interviews/{self.interview.pk}/generate-questions/',
+                                                headers=self._auth(other))
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(await Question.objects.filter(interview=self.interview).aexists())
+
+    async def test_list_body_and_rate_limit(self):
+        question = await Question.objects.acreate(interview=self.interview, type='technical', content='Question?')
+        url = f'/async/interviews/{self.interview.pk}/submit-response/'
+        response = await self.async_client.post(url, [question.pk], content_type='application/json', headers=self._auth(self.candidate))
+        self.assertEqual(response.status_code, 400)
+
+        with mock.patch('core.async_views.aevaluate_answer', side_effect=llm.LLMRateLimited('no quota', 2.5)):
+            response = await self.async_client.post(url, {'question_id': question.pk, 'content': 'An answer'},
+                                                    content_type='application/json', headers=self._auth(self.candidate))
+        self.assertEqual((response.status_code, response['Retry-After']), (429, '3'))
+        self.assertEqual(response.json(), {'error': 'Evaluation is rate limited, retry later', 'retry_after': 3})
+
+    async def test_requires_authentication(self):
+        response = await self.async_client.post(f'/async/interviews/{self.interview.pk}/submit-response/')
+        self.assertEqual(response.status_code, 401)
+
+
+class CachedAuthenticationTests(TestCase):
+    def test_user_is_cached_until_saved(self):
+        user = User.objects.create_user(username='candidate', email='candidate@example.com', password='pw')
+        Interview.objects.create(recruiter=user, candidate=user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+        self.assertEqual(client.get('/stats/').status_code, 403)
+
+        # Interviews and their questions only; the user comes from the cache
+        with self.assertNumQueries(2):
+            client.get('/interviews/')
+
+        user.is_recruiter = True
+        user.save()
+        self.assertEqual(client.get('/stats/').status_code, 200)
+
+        user.is_active = False
+        user.save()
+        self.assertEqual(client.get('/interviews/').status_code, 401)
+
+
+class QueryPlanTests(TestCase):
+    def test_hot_queries_do_not_scan_whole_tables(self):
+        scans = {name: result['full_scans'] for name, result in check_plans().items() if result['full_scans']}
+        self.assertEqual(scans, {})
+
+
+class LLMClientTests(TestCase):
+    def _client(self, backend, max_retries=2, threshold=3):
+        return llm.LLMClient(backend, timeout=1, max_retries=max_retries, backoff_base=0, backoff_max=0,
+                             breaker=llm.CircuitBreaker(threshold, reset_timeout=60))
+
+    def test_retries_transient_errors(self):
+        backend = llm.FakeBackend(latency=0, score=75)
+        backend.generate = mock.Mock(side_effect=[TimeoutError(), ConnectionError(), llm.LLMResult('Score: 75')])
+        self.assertEqual(self._client(backend).generate('prompt').text, 'Score: 75')
+        self.assertEqual(backend.generate.call_count, 3)
+
+    def test_circuit_opens_and_fails_fast(self):
+        backend = llm.FakeBackend(latency=0)
+        backend.generate = mock.Mock(side_effect=TimeoutError())
+        client = self._client(backend, max_retries=0, threshold=2)
+        for _ in range(2):
+            with self.assertRaises(TimeoutError):
+                client.generate('prompt')
+        with self.assertRaises(llm.LLMUnavailable):
+            client.generate('prompt')
+        self.assertEqual(backend.generate.call_count, 2)
+
+    def test_deadline_caps_quota_wait(self):
+        limiter = rate_limit.TokenBucketLimiter('test', rpm=1, tpm=0, max_wait={rate_limit.BULK: 60})
+        client = llm.LLMClient(llm.FakeBackend(latency=0), timeout=1, max_retries=2, backoff_base=0, backoff_max=0,
+                               breaker=llm.CircuitBreaker(3, reset_timeout=60), limiter=limiter)
+        client.generate('prompt', priority=rate_limit.BULK)
+        began = time.monotonic()
+        # The next request's quota is a minute away, well past the caller's deadline, so it is refused at once
+        with self.assertRaises(llm.LLMRateLimited):
+            client.generate('prompt', priority=rate_limit.BULK, deadline=began + 2)
+        self.assertLess(time.monotonic() - began, 1)
+
+    def test_deadline_stops_retries(self):
+        timeouts = []
+
+        def fail(prompt, temperature=None, max_output_tokens=None, timeout=None):
+            timeouts.append(timeout)
+            time.sleep(0.05)
+            raise TimeoutError()
+
+        backend = llm.FakeBackend(latency=0)
+        backend.generate = fail
+        with self.assertRaises(TimeoutError):
+            self._client(backend, max_retries=10).generate('prompt', deadline=time.monotonic() + 0.08)
+        self.assertEqual(len(timeouts), 2)
+        # Each attempt's timeout is cut to the time left before the deadline
+        self.assertLessEqual(timeouts[1], 0.08)
+
+    def test_sdk_is_not_imported_at_startup(self):
+        # The Gemini SDK (and gRPC under it) should only load when a backend is built
+        probe = (
+            "import sys, django; django.setup(); import interview_ai.urls; "
+            "print(any(name in sys.modules for name in ('google.generativeai', 'grpc', 'openai')))"
+        )
+        completed = subprocess.run([sys.executable, '-c', probe], cwd=settings.BASE_DIR,
+                                   capture_output=True, text=True, check=True)
+        self.assertEqual(completed.stdout.strip(), 'False')
+
+
+class EvaluationParsingTests(SimpleTestCase):
+    def test_extract_score(self):
+        cases = [
+            ("Score: 85\nFeedback: Good.", 85),
+            # The model echoing the prompt heading must not turn the range into the score
+            ("1. Score (0-100): 85\n2. Detailed feedback: ...", 85),
+            ("**Score:** 92.5", 92.5),
+            ("The score is 70 out of 100.", 70),
+            ("Score: 80/100", 80),
+            ("Your score reflects the depth of the answer.\nScore: 60", 60),
+            ("Score: 105", None),
+            ("Score: -5", None),
+            ("Good answer, but no figure given.", None),
+            ("", None),
+            (None, None),
+        ]
+        for text, expected in cases:
+            with self.subTest(text=text):
+                self.assertEqual(extract_score(text), expected)
+
+    def test_parse_batch_evaluation(self):
+        evaluation = (
+            "### Answer 1\n1. Score (0-100): 72.5\nFeedback: Solid.\n\n"
+            "### Answer 2\nScore: 140\nFeedback: Out of range.\n\n"
+            "### Answer 3\nFeedback: Forgot the score.\n\n"
+            "### Answer 9\nScore: 50\nFeedback: Not one of ours."
+        )
+        self.assertEqual(parse_batch_evaluation(evaluation, 3), {
+            1: (72.5, 'Solid.'),
+            2: (None, 'Out of range.'),
+            3: (None, 'Forgot the score.'),
+        })
+        self.assertEqual(parse_batch_evaluation('', 2), {})
+
+    def test_parse_batch_evaluation_out_of_order_with_a_missing_section(self):
+        evaluation = "### Answer 3\nScore: 40\nFeedback: Third.\n\n### Answer 1\nScore: 90\nFeedback: First."
+        self.assertEqual(parse_batch_evaluation(evaluation, 3), {1: (90, 'First.'), 3: (40, 'Third.')})
+
+    def test_group_by_token_budget(self):
+        # Each item is estimated at 3 + 3 tokens
+        items = [('q' * 10, 'a' * 10)] * 5
+        self.assertEqual([len(group) for group in group_by_token_budget(items, budget=12, max_items=10)], [2, 2, 1])
+        self.assertEqual([len(group) for group in group_by_token_budget(items, budget=1000, max_items=3)], [3, 2])
+        # An item over budget on its own still gets a group
+        self.assertEqual(group_by_token_budget([('q' * 100, 'a')], budget=5, max_items=3), [[('q' * 100, 'a')]])
+
+
+@override_settings(EVALUATION_CACHE_ENABLED=True)
+class EvaluationCacheTests(TestCase):
+    def setUp(self):
+        evaluation_cache.reset()
+
+    def test_normalized_variants_share_a_key(self):
+        key = evaluation_cache.cache_key('Question?', "I don't know")
+        for variant in (" i DON'T know. ", "i don't  know!", "I don't\nknow?"):
+            with self.subTest(variant=variant):
+                self.assertEqual(evaluation_cache.cache_key('Question?', variant), key)
+        self.assertNotEqual(evaluation_cache.cache_key('Question?', 'I do know'), key)
+
+    def test_database_hit_skips_the_model(self):
+        evaluation_cache.put('Question?', "I don't know", 10, 'Score: 10\nFeedback: Guess.')
+        # A fresh process has an empty LRU, so the entry has to come from the table
+        evaluation_cache.reset()
+        with mock.patch('core.evaluation.llm.get_client') as get_client:
+            self.assertEqual(evaluate_answer('Question?', " i don't know! "), (10, 'Score: 10\nFeedback: Guess.'))
+        get_client.assert_not_called()
+        self.assertEqual(evaluation_cache.stats()['db_hits'], 1)
+
+    @override_settings(EVALUATION_CACHE_MAX_ENTRIES=2)
+    def test_prune_keeps_the_most_recently_used_entries(self):
+        now = timezone.now()
+        for age in range(4):
+            entry = EvaluationCacheEntry.objects.create(key=f'key-{age}', score=50, feedback='Feedback.')
+            EvaluationCacheEntry.objects.filter(pk=entry.pk).update(last_used_at=now - timedelta(minutes=age))
+        EvaluationCacheEntry.objects.filter(key='key-3').update(created_at=now - timedelta(days=365))
+        out = StringIO()
+        call_command('prune_evaluation_cache', stdout=out)
+        self.assertIn('Pruned 2 evaluation cache entries', out.getvalue())
+        self.assertEqual(sorted(EvaluationCacheEntry.objects.values_list('key', flat=True)), ['key-0', 'key-1'])
+
+    @override_settings(EVALUATION_BATCH_MAX_ITEMS=2)
+    def test_groups_are_cached_before_a_later_group_fails(self):
+        items = [(f'Question {n}?', f'answer-{n}') for n in range(1, 5)]
+        client = mock.Mock()
+        client.generate.side_effect = [
+            llm.LLMResult("### Answer 1\nScore: 10\nFeedback: A.\n\n### Answer 2\nScore: 20\nFeedback: B."),
+            llm.LLMRateLimited('no quota', 5),
+        ]
+        with mock.patch('core.evaluation.llm.get_client', return_value=client):
+            with self.assertRaises(llm.LLMRateLimited):
+                evaluate_answers(items)
+        self.assertEqual(evaluation_cache.get_many(items), [(10, 'A.'), (20, 'B.'), None, None])
+
+    def test_unscored_evaluations_are_not_cached(self):
+        evaluation_cache.put('Question?', "I don't know", None, 'Feedback: no figure given.')
+        self.assertFalse(EvaluationCacheEntry.objects.exists())
+        self.assertIsNone(evaluation_cache.get('Question?', "I don't know"))
+
+
+@override_settings(EVALUATION_CACHE_ENABLED=False, EVALUATION_BATCH_TOKEN_BUDGET=3000, EVALUATION_BATCH_MAX_ITEMS=3)
+class EvaluateAnswersTests(SimpleTestCase):
+    def test_one_call_per_group_and_only_missing_answers_are_retried(self):
+        def reply(prompt):
+            if '### Answer 1' in prompt:
+                # The model skips the second answer of the first group
+                return llm.LLMResult("### Answer 1\nScore: 10\nFeedback: A.\n\n### Answer 3\nScore: 30\nFeedback: C.")
+            return llm.LLMResult(f"Score: 50\nFeedback: Alone: {prompt.split('Answer: ')[1].split()[0]}")
+
+        client = mock.Mock()
+        client.generate.side_effect = reply
+        items = [(f'Question {n}?', f'answer-{n}') for n in range(1, 5)]
+        with mock.patch('core.evaluation.llm.get_client', return_value=client):
+            results = evaluate_answers(items)
+
+        self.assertEqual(results, [
+            (10, 'A.'), (50, 'Score: 50\nFeedback: Alone: answer-2'), (30, 'C.'), (50, 'Score: 50\nFeedback: Alone: answer-4'),
+        ])
+        # One call for the group of three, one for the fourth answer, one for the answer the group left out
+        prompts = [call.args[0] for call in client.generate.call_args_list]
+        self.assertEqual(len(prompts), 3)
+        self.assertEqual(sum('### Answer 1' in prompt for prompt in prompts), 1)
+        self.assertEqual(sorted(prompt.split('Answer: ')[1].split()[0] for prompt in prompts[1:]), ['answer-2', 'answer-4'])
+
+
+@override_settings(LLM_BACKEND='core.llm.FakeBackend', LLM_RATE_LIMIT_RPM=0, LLM_RATE_LIMIT_TPM=0)
+class SubmitResponseStreamTests(TestCase):
+    def setUp(self):
+        evaluation_cache.reset()
+        recruiter = User.objects.create_user(username='recruiter', email='recruiter@example.com', password='pw', is_recruiter=True)
+        candidate = User.objects.create_user(username='candidate', email='candidate@example.com', password='pw')
+        self.interview = Interview.objects.create(recruiter=recruiter, candidate=candidate)
+        self.question = Question.objects.create(interview=self.interview, type='technical', content='Question?')
+        self.url = f'/interviews/{self.interview.pk}/submit-response-stream/'
+        self.client = APIClient()
+        self.client.force_authenticate(candidate)
+
+    def _post(self, content='An answer'):
+        return self.client.post(self.url, {'question_id': self.question.pk, 'content': content},
+                                format='json', HTTP_ACCEPT='text/event-stream')
+
+    def _events(self, response):
+        body = b''.join(response.streaming_content).decode()
+        self.assertTrue(body.endswith('\n\n'))
+        events = []
+        for block in body[:-2].split('\n\n'):
+            event, data = block.split('\n')
+            self.assertTrue(event.startswith('event: ') and data.startswith('data: '))
+            events.append((event[len('event: '):], json.loads(data[len('data: '):])))
+        return events
+
+    def test_streams_feedback_then_done(self):
+        response = self._post()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+
+        events = self._events(response)
+        names = [name for name, _ in events]
+        self.assertEqual(names, ['feedback'] * (len(events) - 1) + ['done'])
+        self.assertEqual(''.join(data['text'] for _, data in events[:-1]), 'Score: 75\nFeedback: Fake evaluation.')
+        done = events[-1][1]
+        self.assertEqual((done['score'], done['content']), (75, 'An answer'))
+        self.assertEqual(Response.objects.get().pk, done['id'])
+
+    def test_cached_evaluation_is_sent_without_calling_the_model(self):
+        self._events(self._post())
+        with mock.patch('core.views.stream_evaluation') as stream:
+            events = self._events(self._post())
+        stream.assert_not_called()
+        self.assertEqual(events[0], ('feedback', {'text': 'Score: 75\nFeedback: Fake evaluation.'}))
+        self.assertEqual((events[1][0], events[1][1]['score']), ('done', 75))
+        self.assertEqual(Response.objects.count(), 2)
+
+    def test_failure_midway_sends_an_error_event(self):
+        def broken(question, answer):
+            yield 'Score: 40\n'
+            raise RuntimeError('connection reset')
+
+        with mock.patch('core.views.stream_evaluation', broken):
+            events = self._events(self._post())
+        self.assertEqual(events[0], ('feedback', {'text': 'Score: 40\n'}))
+        self.assertEqual(events[1], ('error', {'error': 'Failed to evaluate response', 'details': 'connection reset'}))
+        self.assertFalse(Response.objects.exists())
+
+    def test_errors_opening_the_stream_keep_their_status(self):
+        for error, expected in ((llm.LLMRateLimited('no quota', 2.5), 429), (llm.LLMUnavailable('circuit open'), 503)):
+            with self.subTest(status=expected):
+                with mock.patch('core.views.stream_evaluation', side_effect=error):
+                    response = self._post()
+                self.assertEqual(response.status_code, expected)
+                self.assertEqual(response['Content-Type'], 'text/event-stream; charset=utf-8')
+                self.assertTrue(response.content.startswith(b'event: error\n'))
+        self.assertFalse(Response.objects.exists())
+
+    def test_rate_limited_response_has_retry_after(self):
+        with mock.patch('core.views.stream_evaluation', side_effect=llm.LLMRateLimited('no quota', 2.5)):
+            response = self.client.post(self.url, {'question_id': self.question.pk, 'content': 'An answer'}, format='json')
+        self.assertEqual(response['Retry-After'], '3')
+        self.assertEqual(response.json(), {'error': 'Evaluation is rate limited, retry later', 'retry_after': 3})
+
+
+@override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=2, EMAIL_OUTBOX_RETRY_BASE=0)
+class OutboxTests(TestCase):
+    def test_attempts_are_counted_at_claim(self):
+        entry = outbox.enqueue_email('Subject', 'Body', ['candidate@example.com'])
+        claimed, = outbox.claim_batch('worker-1')
+        self.assertEqual(claimed.attempts, 1)
+        self.assertEqual(outbox.send_batch([claimed], 'worker-1'), (1, 0))
+        entry.refresh_from_db()
+        self.assertEqual((entry.status, entry.attempts), ('sent', 1))
+
+    def test_mail_that_keeps_killing_its_sender_fails(self):
+        entry = outbox.enqueue_email('Subject', 'Body', ['candidate@example.com'])
+        expired = timezone.now() - timedelta(seconds=1)
+        for worker_id in ('worker-1', 'worker-2'):
+            # The sender dies after claiming, so its lease runs out with the entry still 'sending'
+            claimed, = outbox.claim_batch(worker_id)
+            EmailOutbox.objects.filter(pk=entry.pk).update(lease_expires_at=expired)
+        self.assertEqual(EmailOutbox.objects.get(pk=entry.pk).attempts, 2)
+
+        self.assertEqual(outbox.claim_batch('worker-3'), [])
+        entry.refresh_from_db()
+        self.assertEqual((entry.status, entry.attempts, entry.lease_owner), ('failed', 2, None))
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_failed_send_is_retried_until_attempts_run_out(self):
+        outbox.enqueue_email('Subject', 'Body', ['candidate@example.com'])
+        with mock.patch('core.outbox.EmailMessage.send', side_effect=OSError('refused')):
+            self.assertEqual(outbox.drain('worker-1'), (0, 2))
+        entry = EmailOutbox.objects.get()
+        self.assertEqual((entry.status, entry.attempts, entry.last_error), ('failed', 2, 'refused'))
+
+    def test_sent_mail_is_recorded_before_the_rest_of_the_batch(self):
+        first = outbox.enqueue_email('First', 'Body', ['one@example.com'])
+        second = outbox.enqueue_email('Second', 'Body', ['two@example.com'])
+        entries = outbox.claim_batch('worker-1')
+        # The sender is killed while sending the second message
+        with mock.patch('core.outbox.EmailMessage.send', side_effect=[1, KeyboardInterrupt()]):
+            with self.assertRaises(KeyboardInterrupt):
+                outbox.send_batch(entries, 'worker-1')
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.status, second.status), ('sent', 'sending'))
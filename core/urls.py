@@ -1,13 +1,17 @@
 from django.urls import path,include
 from rest_framework.routers import  DefaultRouter
-from .views import InterviewViewSet,ProgrammingSkillViewSet
+from . import async_views
+from .views import InterviewViewSet,ProgrammingSkillViewSet,GenerationJobViewSet
 
 router = DefaultRouter()
 
 router.register(r'interviews', InterviewViewSet, basename='interview')
 router.register(r'skills', ProgrammingSkillViewSet, basename='skill')
+router.register(r'generation-jobs', GenerationJobViewSet, basename='generation-job')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('async/interviews/<int:pk>/generate-questions/', async_views.generate_questions, name='interview-generate-questions-async'),
+    path('async/interviews/<int:pk>/submit-response/', async_views.submit_response, name='interview-submit-response-async'),
 ]
 
@@ -2,23 +2,37 @@ from rest_framework import viewsets,status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-import openai
-from openai import OpenAI
-from django.core.mail import send_mail
+from rest_framework.renderers import JSONRenderer
+from rest_framework.parsers import MultiPartParser
+from rest_framework.exceptions import ValidationError
 from django.conf import settings
-from .serializers import InterviewSerializer,UserSerializer,ProgrammingSkillSerializer
-from .models import Interview, ProgrammingSkill, Question, Response as ResponseModel
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.db import transaction
+from django.db.models import Count
+from django.utils.dateparse import parse_date, parse_datetime
+from .serializers import InterviewSerializer,UserSerializer,ProgrammingSkillSerializer,GenerationJobSerializer,ResponseSerializer
+from .models import Interview, ProgrammingSkill, Question, Response as ResponseModel, GenerationJob
+from . import analytics, evaluation_cache, export, interview_cache, llm, question_bank, rate_limit
+from .generation import QuestionGenerationError, generate_interview_questions
+from .jobs import enqueue_generation
+from .evaluation import evaluate_answer, evaluate_answers, extract_score, stream_evaluation
+from .renderers import EventStreamRenderer, server_sent_event
+from .parsers import CSVStreamParser, NDJSONStreamParser
+from .bulk_import import format_from_name, import_interviews, read_rows
+from .pagination import InterviewCursorPagination
+from .scoring import add_responses
+from .outbox import enqueue_email
 from rest_framework import generics
 from rest_framework.views import APIView
 from django.contrib.auth import authenticate
 from rest_framework_simplejwt.tokens import RefreshToken
 
-import google.generativeai as genai
-# Set up the Gemini API key
-genai.configure(api_key=settings.GOOGLE_GEMINI_API_KEY)
-
-# Initialize the model
-model = genai.GenerativeModel("gemini-2.0-flash")
+import math
+from collections.abc import Mapping
+from datetime import datetime
+from itertools import chain
 
 
 
@@ -70,166 +84,472 @@ class ProgrammingSkillViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user = self.request.user)
 
-# Test openAI key function
+# Test the configured LLM provider
 def test_gemini_connection():
     try:
-        # Configure Gemini API key
-        client = genai.GenerativeModel(model="gemini-2.0-flash", api_key=settings.GEMINI_API_KEY)
-
         # Make a simple API call to test connection
-        response = client.generate_content(contents="hello")
+        llm.get_client().generate("hello")
 
         return True, "Gemini API connection successful"
     except Exception as e:
-        logger.error(f"Gemini API connection test failed: {e}")
+        logger.error("Gemini API connection test failed: %s", e)
         return False, str(e)
 
 
+def rate_limited_response(message, error, response_class=Response):
+    # Plain Django views (core.async_views) pass JsonResponse
+    retry_after = max(1, math.ceil(error.retry_after))
+    response = response_class({"error": message, "retry_after": retry_after}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def request_fields(request):
+    # A JSON body can be any value (e.g. a list); the actions below read fields from an object
+    return request.data if isinstance(request.data, Mapping) else None
+
+
+def body_not_an_object():
+    return Response({"error": "Request body must be a JSON object"}, status=status.HTTP_400_BAD_REQUEST)
+
+
 class InterviewViewSet(viewsets.ModelViewSet):
     serializer_class = InterviewSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = InterviewCursorPagination
 
     def get_queryset(self):
+        # Candidate/recruiter are joined and questions prefetched so list and
+        # detail cost a fixed number of queries however many rows are returned
+        queryset = Interview.objects.select_related('candidate', 'recruiter')
+        if self.action in ('list', 'retrieve', 'create', 'update', 'partial_update'):
+            queryset = queryset.prefetch_related('questions')
+        if self.action == 'complete_interview':
+            # Lets the analytics rollup count questions without another query
+            queryset = queryset.annotate(question_count=Count('questions'))
+        if self.action in ('list', 'export_results'):
+            queryset = self._filter_list(queryset)
         if self.request.user.is_recruiter:
-            return Interview.objects.all()
-        return Interview.objects.filter(candidate=self.request.user)  # Unchanged, still uses 'candidate'
-
-    def _generate_technical_questions(self, skill):
-        prompts = {
-            'beginner': f"Generate 3 basic technical interview questions for a beginner {skill.language} developer.",
-            'intermediate': f"Generate 3 intermediate technical interview questions for a {skill.language} developer.",
-            'advanced': f"Generate 3 advanced technical interview questions for an expert {skill.language} developer."
-        }
-        level = 'beginner' if skill.proficiency <= 4 else 'intermediate' if skill.proficiency <= 7 else 'advanced'
+            return queryset
+        return queryset.filter(candidate=self.request.user)  # Unchanged, still uses 'candidate'
+
+    def retrieve(self, request, *args, **kwargs):
+        # While the interview's version is cached, revalidation and repeat reads
+        # are answered without a query; see core.interview_cache
+        pk = kwargs['pk']
+        cached = interview_cache.cached_version(pk)
+        if cached and (request.user.is_recruiter or cached[1] == request.user.pk):
+            version = cached[0]
+            payload = interview_cache.cached_payload(pk, version)
+            if payload is not None or interview_cache.etag_matches(request, interview_cache.etag(pk, version)):
+                return self._detail_response(request, pk, version, payload)
+
+        response = super().retrieve(request, *args, **kwargs)
+        interview_cache.store(dict(response.data))
+        return self._detail_response(request, pk, response.data['version'], response.data)
+
+    def _detail_response(self, request, pk, version, payload):
+        tag = interview_cache.etag(pk, version)
+        if interview_cache.etag_matches(request, tag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(payload)
+        response['ETag'] = tag
+        # Per-user data: browsers may keep it but must revalidate before reuse
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def perform_update(self, serializer):
+        # Only the submitted fields are written, in the same UPDATE that bumps
+        # the version: a full-row save would overwrite running totals added
+        # concurrently as F() deltas and could reuse a version
+        interview = serializer.instance
+        interview_cache.bump(interview.pk, **serializer.validated_data)
+        for name, value in serializer.validated_data.items():
+            setattr(interview, name, value)
+        interview.refresh_from_db(fields=['version', 'score_sum', 'score_count'])
+
+    def perform_destroy(self, instance):
+        pk = instance.pk
+        instance.delete()
+        interview_cache.invalidate(pk)
+
+    def _filter_list(self, queryset):
+        params = self.request.query_params
+        errors = {}
+
+        interview_status = params.get('status')
+        if interview_status:
+            if interview_status not in dict(Interview._meta.get_field('status').choices):
+                errors['status'] = f"Unknown status '{interview_status}'"
+            queryset = queryset.filter(status=interview_status)
+
+        candidate = params.get('candidate')
+        if candidate:
+            if not candidate.isdigit():
+                errors['candidate'] = "Must be a user id"
+            else:
+                queryset = queryset.filter(candidate_id=int(candidate))
+
+        for param, lookup in (('created_after', 'created_at__gte'), ('created_before', 'created_at__lt')):
+            value = params.get(param)
+            if not value:
+                continue
+            moment = self._parse_moment(value)
+            if moment is None:
+                errors[param] = "Must be an ISO 8601 date or datetime"
+            else:
+                queryset = queryset.filter(**{lookup: moment})
+
+        if errors:
+            raise ValidationError(errors)
+        return queryset
+
+    def _parse_moment(self, value):
         try:
-            response = model.generate_content(
-                prompts[level],
-                generation_config={"temperature": 0.7, "max_output_tokens": 500}
-            )
-            questions = response.candidates[0].content.parts[0].text.split("\n")
-            return [q.strip() for q in questions if q.strip()]
-        except Exception as e:
-            logger.error(f"Gemini API error: {str(e)}")
+            moment = parse_datetime(value)
+            if moment is None:
+                day = parse_date(value)
+                if day is None:
+                    return None
+                moment = datetime.combine(day, datetime.min.time())
+        except ValueError:
             return None
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        return moment
+
+    def _wants_async(self, request, data):
+        value = request.query_params.get('async', data.get('async'))
+        if value is None:
+            return settings.QUESTION_GENERATION_ASYNC
+        return str(value).lower() in ('1', 'true', 'yes')
+
+    @action(detail=False, methods=['post'], url_path='import',
+            parser_classes=[CSVStreamParser, NDJSONStreamParser, MultiPartParser])
+    def bulk_import(self, request):
+        if not request.user.is_recruiter:
+            return Response({"error": "Only recruiters can import interviews"}, status=status.HTTP_403_FORBIDDEN)
+
+        # Either the raw CSV/NDJSON body or a multipart upload in 'file'
+        upload = request.data.get('file')
+        if upload is not None:
+            stream, fmt = upload, format_from_name(upload.name)
+        else:
+            stream, fmt = request.data.get('stream'), request.data.get('format')
+        if stream is None:
+            return Response({"error": "Send a CSV or NDJSON body, or upload one as 'file'"}, status=status.HTTP_400_BAD_REQUEST)
+
+        generate = str(request.query_params.get('generate_questions', '')).lower() in ('1', 'true', 'yes')
+        report = import_interviews(read_rows(stream, fmt), request.user, queue_generation=generate)
+        status_code = status.HTTP_201_CREATED if report['interviews_created'] else status.HTTP_400_BAD_REQUEST
+        return Response(report, status=status_code)
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export_results(self, request):
+        # ?output=, because DRF reserves ?format= for picking a renderer
+        fmt = request.query_params.get('output', 'csv')
+        if fmt not in export.FORMATS:
+            return Response({"error": f"output must be one of {', '.join(export.FORMATS)}"}, status=status.HTTP_400_BAD_REQUEST)
+        # Rows are written as the interviews are read, a chunk at a time, so memory stays flat
+        response = StreamingHttpResponse(export.stream(self.get_queryset(), fmt), content_type=export.FORMATS[fmt])
+        response['Content-Disposition'] = f'attachment; filename="interviews.{fmt}"'
+        response['X-Accel-Buffering'] = 'no'
+        return response
 
     @action(detail=True, methods=['post'], url_path='generate-questions')
     def generate_questions(self, request, pk=None):
-        logger.info(f'Starting question generation for interview {pk}')
+        logger.info('Starting question generation for interview %s', pk)
+        data = request_fields(request)
+        if data is None:
+            return body_not_an_object()
         try:
             # Manually check if the interview exists
-            interview = Interview.objects.filter(pk=pk).first()
+            interview = Interview.objects.select_related('candidate').filter(pk=pk).first()
             if not interview:
                 return Response({"error": "Interview not found"}, status=status.HTTP_404_NOT_FOUND)
 
-            skills = ProgrammingSkill.objects.filter(user=interview.candidate)
-            logger.info(f"Found skills for candidate {interview.candidate}: {list(skills)}")
-            if not skills.exists():
-                return Response({"error": "No programming skills found"}, status=status.HTTP_400_BAD_REQUEST)
-
-            generated_questions = []
-            questions_count = 0
-
-            for skill in skills:
-                questions = self._generate_technical_questions(skill)
-                if not questions:
-                    return Response({"error": f"Failed to generate questions for {skill.language}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-                skill_questions = []
-                for question in questions:
-                    if len(question) > 10:
-                        question_obj = Question.objects.create(
-                            interview=interview,
-                            type='technical',
-                            content=question,
-                            skill=skill
-                        )
-                        questions_count += 1
-                        skill_questions.append({
-                            "id": question_obj.id,
-                            "content": question,
-                            "type": "technical"
-                        })
-                if skill_questions:
-                    generated_questions.append({
-                        "language": skill.language,
-                        "proficiency": skill.proficiency,
-                        "questions": skill_questions
-                    })
-
-            if questions_count == 0:
-                return Response({"error": "No valid questions generated"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-            interview.status = 'in_progress'
-            interview.save()
-
-            return Response({
-                "status": "Questions generated successfully",
-                "total_questions": questions_count,
-                "questions_by_skill": generated_questions
-            }, status=status.HTTP_201_CREATED)
-
+            if self._wants_async(request, data):
+                job, created = enqueue_generation(interview, request.user)
+                return Response({
+                    "status": "Question generation queued" if created else "Question generation already in progress",
+                    "job_id": job.id,
+                    "job": GenerationJobSerializer(job).data
+                }, status=status.HTTP_202_ACCEPTED)
+
+            payload = generate_interview_questions(interview)
+            return Response(payload, status=status.HTTP_201_CREATED)
+
+        except llm.LLMRateLimited as e:
+            return rate_limited_response("Question generation is rate limited, retry later", e)
+        except QuestionGenerationError as e:
+            body = {"error": str(e)}
+            if e.failed_skills:
+                body["failed_skills"] = e.failed_skills
+            return Response(body, status=e.status_code)
         except Exception as e:
-            logger.error(f"Critical error: {str(e)}")
+            logger.exception("Critical error: %s", e)
             return Response({"error": "Failed to generate questions", "details": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     @action(detail=True, methods=['post'], url_path='submit-response')
     def submit_response(self, request, pk=None):
         interview = self.get_object()
-        question_id = request.data.get('question_id')
-        response_content = request.data.get('content')
+        data = request_fields(request)
+        if data is None:
+            return body_not_an_object()
+        question_id = data.get('question_id')
+        response_content = data.get('content')
 
         if not question_id or not response_content:
             return Response({"error": "Missing question_id or content"}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            question = Question.objects.get(id=question_id, interview=interview)
-            prompt = f"""
-            Question: {question.content}
-            Answer: {response_content}
-            Evaluate this answer and provide:
-            1. Score (0-100)
-            2. Detailed feedback
-            """
-            gpt_response = model.generate_content(prompt)
-            evaluation = gpt_response.candidates[0].content.parts[0].text
-
-            score = 75  # Placeholder
-            feedback = evaluation
-
-            response_obj = Response.objects.create(
+            question = Question.objects.select_related('skill').get(id=question_id, interview=interview)
+            score, feedback = evaluate_answer(question.content, response_content)
+
+            response_obj, = add_responses(interview, [ResponseModel(
                 question=question,
                 content=response_content,
                 score=score,
                 feedback=feedback
-            )
+            )])
 
             return Response(ResponseSerializer(response_obj).data, status=status.HTTP_201_CREATED)
 
         except Question.DoesNotExist:
             return Response({"error": "Question not found"}, status=status.HTTP_404_NOT_FOUND)
+        except llm.LLMRateLimited as e:
+            return rate_limited_response("Evaluation is rate limited, retry later", e)
+        except llm.LLMUnavailable as e:
+            return Response({"error": "Evaluation service unavailable", "details": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         except Exception as e:
-            logger.error(f"Failed to evaluate response: {str(e)}")
+            logger.exception("Failed to evaluate response: %s", e)
             return Response({"error": "Failed to evaluate response", "details": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(detail=True, methods=['post'], url_path='submit-responses')
+    def submit_responses(self, request, pk=None):
+        interview = self.get_object()
+        data = request_fields(request)
+        if data is None:
+            return body_not_an_object()
+        items = data.get('responses')
+
+        if not isinstance(items, list) or not items:
+            return Response({"error": "Provide a non-empty 'responses' list"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > settings.SUBMIT_RESPONSES_MAX_ITEMS:
+            return Response({"error": f"Submit at most {settings.SUBMIT_RESPONSES_MAX_ITEMS} responses at once"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        errors = []
+        submitted = []
+        for index, item in enumerate(items):
+            question_id = item.get('question_id') if isinstance(item, dict) else None
+            content = item.get('content') if isinstance(item, dict) else None
+            if not question_id or not content:
+                errors.append({"index": index, "error": "Missing question_id or content"})
+                continue
+            try:
+                submitted.append((index, int(question_id), content))
+            except (TypeError, ValueError):
+                errors.append({"index": index, "error": "Invalid question_id"})
+
+        # One query validates every question against this interview
+        questions = Question.objects.select_related('skill').filter(
+            interview=interview, id__in={question_id for _, question_id, _ in submitted}
+        ).in_bulk()
+        valid = []
+        for index, question_id, content in submitted:
+            if question_id in questions:
+                valid.append((questions[question_id], content))
+            else:
+                errors.append({"index": index, "question_id": question_id, "error": "Question not found"})
+
+        if not valid:
+            return Response({"error": "No valid responses submitted", "errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            evaluations = evaluate_answers([(question.content, content) for question, content in valid])
+            created = add_responses(interview, [
+                ResponseModel(question=question, content=content, score=score, feedback=feedback)
+                for (question, content), (score, feedback) in zip(valid, evaluations)
+            ])
+        except llm.LLMRateLimited as e:
+            return rate_limited_response("Evaluation is rate limited, retry later", e)
+        except llm.LLMUnavailable as e:
+            return Response({"error": "Evaluation service unavailable", "details": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        except Exception as e:
+            logger.exception("Failed to evaluate responses: %s", e)
+            return Response({"error": "Failed to evaluate responses", "details": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        return Response({
+            "responses": [
+                dict(ResponseSerializer(response_obj).data, question_id=response_obj.question_id)
+                for response_obj in created
+            ],
+            "errors": sorted(errors, key=lambda error: error["index"])
+        }, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'], url_path='submit-response-stream',
+            renderer_classes=[JSONRenderer, EventStreamRenderer])
+    def submit_response_stream(self, request, pk=None):
+        interview = self.get_object()
+        data = request_fields(request)
+        if data is None:
+            return body_not_an_object()
+        question_id = data.get('question_id')
+        response_content = data.get('content')
+
+        if not question_id or not response_content:
+            return Response({"error": "Missing question_id or content"}, status=status.HTTP_400_BAD_REQUEST)
+
+        question = Question.objects.select_related('skill').filter(id=question_id, interview=interview).first()
+        if not question:
+            return Response({"error": "Question not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        # The stream is opened before the response starts, so quota and outage errors
+        # still get a 429/503 status; failures after that arrive as an error event
+        try:
+            cached = evaluation_cache.get(question.content, response_content)
+            if cached is None:
+                chunks = stream_evaluation(question.content, response_content)
+                first = next(chunks, '')
+        except llm.LLMRateLimited as e:
+            return rate_limited_response("Evaluation is rate limited, retry later", e)
+        except llm.LLMUnavailable as e:
+            return Response({"error": "Evaluation service unavailable", "details": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        except Exception as e:
+            logger.exception("Failed to evaluate response: %s", e)
+            return Response({"error": "Failed to evaluate response", "details": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        def events():
+            try:
+                if cached is not None:
+                    score, feedback = cached
+                    yield server_sent_event('feedback', {"text": feedback})
+                else:
+                    parts = []
+                    for text in chain([first], chunks):
+                        if not text:
+                            continue
+                        parts.append(text)
+                        yield server_sent_event('feedback', {"text": text})
+                    feedback = ''.join(parts)
+                    score = extract_score(feedback)
+                    evaluation_cache.put(question.content, response_content, score, feedback)
+
+                # The row is only written once the model has finished its evaluation
+                response_obj, = add_responses(interview, [ResponseModel(
+                    question=question,
+                    content=response_content,
+                    score=score,
+                    feedback=feedback
+                )])
+                yield server_sent_event('done', ResponseSerializer(response_obj).data)
+            except llm.LLMRateLimited as e:
+                yield server_sent_event('error', {
+                    "error": "Evaluation is rate limited, retry later", "retry_after": max(1, math.ceil(e.retry_after))
+                })
+            except Exception as e:
+                logger.exception("Failed to evaluate response: %s", e)
+                yield server_sent_event('error', {"error": "Failed to evaluate response", "details": str(e)})
+
+        response = StreamingHttpResponse(events(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    @action(detail=True, methods=['get'], url_path='score')
+    def score(self, request, pk=None):
+        interview = self.get_object()
+        return Response({
+            "interview_id": interview.pk,
+            "status": interview.status,
+            "live_score": interview.live_score,
+            "scored_responses": interview.score_count,
+            "total_score": interview.total_score
+        })
+
     @action(detail=True, methods=['post'], url_path='complete-interview')
     def complete_interview(self, request, pk=None):
         interview = self.get_object()
-        responses = Response.objects.filter(question__interview=interview)
-
-        if not responses.exists():
+        # Running totals are kept on the row, so completion needs no aggregate over
+        # responses; only an interview with no scored ones needs the existence check
+        if not interview.score_count and not ResponseModel.objects.filter(question__interview=interview).exists():
             return Response({"error": "No responses found"}, status=status.HTTP_400_BAD_REQUEST)
 
-        total_score = responses.aggregate(Avg('score'))['score__avg']
-        interview.total_score = total_score
-        interview.status = 'completed'
-        interview.save()
+        completed_at = timezone.now()
+        # The result email is queued with the completion and sent by send_outbox_emails
+        with transaction.atomic():
+            # The version bump is the first statement, so the write lock (SQLite) or row
+            # lock (PostgreSQL) is held before the row is read. Concurrent completions
+            # queue on it, and each one takes back the outcome the previous one counted.
+            # Reading first would leave SQLite upgrading a read lock, which fails at once
+            interview_cache.bump(interview.pk)
+            locked = Interview.objects.only(
+                'status', 'completed_at', 'created_at', 'total_score', 'score_sum', 'score_count'
+            ).get(pk=interview.pk)
+            locked.question_count = interview.question_count
+            total_score = locked.live_score
+            Interview.objects.filter(pk=interview.pk).update(total_score=total_score, status='completed', completed_at=completed_at)
+            analytics.record_completion(locked, total_score, completed_at)
+            enqueue_email(
+                'Interview Results',
+                f'Your interview has been completed. Total Score: {total_score}',
+                [interview.candidate.email]  # Uses 'candidate'
+            )
 
-        send_mail(
-            'Interview Results',
-            f'Your interview has been completed. Total Score: {total_score}',
-            settings.DEFAULT_FROM_EMAIL,
-            [interview.candidate.email],  # Uses 'candidate'
-            fail_silently=True
-        )
+        return Response({"status": "Interview completed", "total_score": total_score}, status=status.HTTP_200_OK)
+
+
+class GenerationJobViewSet(viewsets.ReadOnlyModelViewSet):
+    serializer_class = GenerationJobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        if self.request.user.is_recruiter:
+            return GenerationJob.objects.all()
+        return GenerationJob.objects.filter(interview__candidate=self.request.user)
+
+
+class AnalyticsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        if not request.user.is_recruiter:
+            return Response({"error": "Only recruiters can view analytics"}, status=status.HTTP_403_FORBIDDEN)
+        params = request.query_params
+        period = params.get('period', 'day')
+        errors = {}
+        if period not in analytics.PERIODS:
+            errors['period'] = f"Must be one of {', '.join(analytics.PERIODS)}"
+        dates = {}
+        for param in ('since', 'until'):
+            value = params.get(param)
+            if value:
+                try:
+                    dates[param] = parse_date(value)
+                except ValueError:
+                    dates[param] = None
+                if dates[param] is None:
+                    errors[param] = "Must be an ISO 8601 date"
+        if errors:
+            raise ValidationError(errors)
+        # Reads only the rollup tables, never responses or interviews
+        return Response({
+            "skills": analytics.skill_summary(params.get('language')),
+            "outcomes": analytics.outcome_summary(period, **dates),
+            "pass_score": settings.ANALYTICS_PASS_SCORE
+        })
+
+
+class StatsView(APIView):
+    permission_classes = [IsAuthenticated]
 
-        return Response({"status": "Interview completed", "total_score": total_score}, status=status.HTTP_200_OK)
\ No newline at end of file
+    def get(self, request):
+        if not request.user.is_recruiter:
+            return Response({"error": "Only recruiters can view stats"}, status=status.HTTP_403_FORBIDDEN)
+        return Response({
+            "question_bank": question_bank.stats(),
+            "evaluation_cache": evaluation_cache.stats(),
+            "llm_rate_limit": rate_limit.stats()
+        })
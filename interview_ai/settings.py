@@ -54,7 +54,7 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.CachedJWTAuthentication',
     ],
 }
 
@@ -64,6 +64,18 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
 }
+# REDIS_URL gives every process one shared cache (install requirements-redis.txt), so
+# invalidations such as a changed user role apply everywhere at once. Without it each
+# process keeps its own LocMemCache and only sees another process's changes on expiry
+REDIS_URL = os.environ.get('REDIS_URL', '')
+if REDIS_URL:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': REDIS_URL}}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+# Authenticated users are resolved from this cache (see core.authentication); 0 disables it.
+# A per-process cache keeps the TTL short, which bounds how long other workers act on a stale role
+AUTH_USER_CACHE = 'default'
+AUTH_USER_CACHE_TTL = int(os.environ.get('AUTH_USER_CACHE_TTL', 60 if REDIS_URL else 5))
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -94,9 +106,42 @@ LOGGING = {
     },
 }
 
+# LOG_MODE=production writes JSON lines tagged with the request's correlation id
+# from a background thread, so log I/O stays off the request path. Output goes to
+# stderr unless LOG_FILE is set; each process then writes its own size-rotated
+# file (LOG_FILE with the pid added), since rotation cannot be shared between processes
+LOG_MODE = os.environ.get('LOG_MODE', 'development')
+LOG_FILE = os.environ.get('LOG_FILE', '')
+if LOG_MODE == 'production':
+    LOGGING = {
+        'version': 1,
+        'disable_existing_loggers': False,
+        'filters': {
+            'correlation_id': {'()': 'core.log.CorrelationIdFilter'},
+        },
+        'handlers': {
+            'background': {
+                'class': 'core.log.BackgroundHandler',
+                'filters': ['correlation_id'],
+                'filename': LOG_FILE or None,
+                'max_bytes': int(os.environ.get('LOG_MAX_BYTES', 10 * 1024 * 1024)),
+                'backup_count': int(os.environ.get('LOG_BACKUP_COUNT', 5)),
+                # LOG_STDERR=1 keeps stderr output alongside a LOG_FILE
+                'stream': not LOG_FILE or os.environ.get('LOG_STDERR', '0') == '1',
+                'queue_size': 10000,
+            },
+        },
+        'root': {
+            'handlers': ['background'],
+            'level': os.environ.get('LOG_LEVEL', 'INFO'),
+        },
+    }
+
 AUTH_USER_MODEL = 'core.User' 
 
 MIDDLEWARE = [
+    'core.log.CorrelationIdMiddleware',
+    'core.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -130,12 +175,61 @@ WSGI_APPLICATION = 'interview_ai.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_PROFILE selects the database setup:
+#   sqlite      - development default, one connection per request
+#   sqlite-wal  - production SQLite: WAL journal, busy timeout, persistent connections
+#   postgres    - pooled PostgreSQL, configured from POSTGRES_* variables;
+#                 install requirements-postgres.txt for the psycopg driver and pool
+DB_PROFILE = os.environ.get('DB_PROFILE', 'sqlite')
+
+if DB_PROFILE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'interview_ai'),
+            'USER': os.environ.get('POSTGRES_USER', 'interview_ai'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            # Pooled connections are returned to the pool after each request,
+            # so CONN_MAX_AGE must stay 0; health checks drop dead connections
+            'CONN_MAX_AGE': 0,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.environ.get('POSTGRES_POOL_MIN', 2)),
+                    'max_size': int(os.environ.get('POSTGRES_POOL_MAX', 20)),
+                    'timeout': float(os.environ.get('POSTGRES_POOL_TIMEOUT', 10)),
+                },
+            },
+        }
+    }
+elif DB_PROFILE == 'sqlite-wal':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': int(os.environ.get('SQLITE_CONN_MAX_AGE', 600)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                # WAL lets readers run alongside the single writer; NORMAL sync is
+                # safe with WAL and avoids an fsync per commit
+                'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL',
+                # Take the write lock at BEGIN so writers queue on the timeout below
+                # instead of failing with "database is locked" on lock upgrade
+                'transaction_mode': 'IMMEDIATE',
+                # Seconds a writer waits for the lock (sqlite3's busy timeout)
+                'timeout': float(os.environ.get('SQLITE_BUSY_TIMEOUT', 20)),
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
     }
-}
 
 
 # Password validation
@@ -184,3 +278,116 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
 GOOGLE_GEMINI_API_KEY = secrets['GOOGLE_GEMINI_API_KEY']
+
+
+# LLM provider (see core.llm)
+# Dotted path to the backend class; core.llm.FakeBackend runs offline for tests and benchmarks
+LLM_BACKEND = os.environ.get('LLM_BACKEND', 'core.llm.GeminiBackend')
+LLM_MODEL = 'gemini-2.0-flash'
+# Default seconds per provider call when the caller does not pass its own timeout
+LLM_TIMEOUT = float(os.environ.get('LLM_TIMEOUT', 30))
+# Retries for transient provider errors, with full-jitter exponential backoff
+LLM_MAX_RETRIES = 2
+LLM_BACKOFF_BASE = 0.5
+LLM_BACKOFF_MAX = 8
+# Consecutive failures that open the circuit, and seconds before a trial call is let through
+LLM_CIRCUIT_FAILURE_THRESHOLD = 5
+LLM_CIRCUIT_RESET_SECONDS = 30
+# Provider quota shared by every web and worker process (a token bucket in the database); 0 disables a limit
+LLM_RATE_LIMIT_RPM = int(os.environ.get('LLM_RATE_LIMIT_RPM', 60))
+LLM_RATE_LIMIT_TPM = int(os.environ.get('LLM_RATE_LIMIT_TPM', 250000))
+# Share of both buckets that bulk question generation leaves for candidate-facing evaluations
+LLM_RATE_LIMIT_INTERACTIVE_RESERVE = 0.25
+# Seconds a call may wait for quota before it is rejected, by priority
+LLM_RATE_LIMIT_MAX_WAIT = {'interactive': 5, 'bulk': 60}
+# Output tokens charged up front for calls that do not cap max_output_tokens
+LLM_RATE_LIMIT_OUTPUT_TOKENS = 1000
+# FakeBackend behaviour
+LLM_FAKE_LATENCY = float(os.environ.get('LLM_FAKE_LATENCY', 0))
+LLM_FAKE_SCORE = 75
+
+
+# Prometheus text endpoint served by core.metrics. Scrapers send "Authorization: Bearer <METRICS_TOKEN>";
+# with no token the endpoint answers 404 unless METRICS_PUBLIC=1 exposes it without authentication
+METRICS_PATH = '/metrics'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_PUBLIC = os.environ.get('METRICS_PUBLIC', '0') == '1'
+# Metrics are kept in process memory. With several worker processes behind one
+# scrape target, set METRICS_MULTIPROCESS_DIR to a directory every process can
+# write so each scrape reports the sum of all of them; otherwise run one worker
+# or scrape each process separately. Processes flush at most every METRICS_FLUSH_INTERVAL seconds
+METRICS_MULTIPROCESS_DIR = os.environ.get('METRICS_MULTIPROCESS_DIR', '')
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 5))
+
+
+# Question generation
+# Number of skills whose questions are generated in parallel (1 = sequential)
+QUESTION_GENERATION_CONCURRENCY = int(os.environ.get('QUESTION_GENERATION_CONCURRENCY', 4))
+# Seconds allowed for a single model call
+QUESTION_GENERATION_TIMEOUT = float(os.environ.get('QUESTION_GENERATION_TIMEOUT', 30))
+QUESTIONS_PER_SKILL = 3
+
+# Question bank: pooled questions per (language, level) reused across interviews
+QUESTION_BANK_ENABLED = os.environ.get('QUESTION_BANK_ENABLED', '1') == '1'
+# Serve from the pool once it holds at least this many live questions
+QUESTION_BANK_MIN_POOL = 9
+# Upper bound of stored questions per (language, level)
+QUESTION_BANK_MAX_PER_KEY = 60
+# Seconds before a pooled question expires
+QUESTION_BANK_TTL = 60 * 60 * 24 * 30
+# Share of pool hits that still call the model to keep the pool fresh
+QUESTION_BANK_REFRESH_RATE = 0.05
+# In-process LRU in front of the pool table
+QUESTION_BANK_LRU_SIZE = 256
+QUESTION_BANK_LRU_TTL = 300
+
+# Background question generation (see `manage.py run_generation_worker`)
+# Queue generate-questions requests by default instead of running them inline
+QUESTION_GENERATION_ASYNC = os.environ.get('QUESTION_GENERATION_ASYNC', '0') == '1'
+# Seconds a worker holds a job before another worker may take it over
+GENERATION_JOB_LEASE_SECONDS = 120
+# How often a running job renews its lease; keep well under the lease so a slow renewal is not fatal
+GENERATION_JOB_HEARTBEAT_SECONDS = 30
+GENERATION_JOB_MAX_ATTEMPTS = 3
+
+# Batch answer evaluation: answers are grouped into one prompt up to this many estimated tokens
+EVALUATION_BATCH_TOKEN_BUDGET = 3000
+EVALUATION_BATCH_MAX_ITEMS = 10
+# Responses accepted by one submit-responses request, which is evaluated synchronously
+SUBMIT_RESPONSES_MAX_ITEMS = 50
+
+# Evaluation cache: reuses the evaluation of an identical (normalized) answer to the same question
+EVALUATION_CACHE_ENABLED = os.environ.get('EVALUATION_CACHE_ENABLED', '1') == '1'
+EVALUATION_CACHE_TTL = 60 * 60 * 24 * 30
+# Rows kept by manage.py prune_evaluation_cache, which should run periodically (e.g. hourly from cron)
+EVALUATION_CACHE_MAX_ENTRIES = 100000
+EVALUATION_CACHE_LRU_SIZE = 2048
+EVALUATION_CACHE_LRU_TTL = 600
+
+# Interview detail ETags and payload cache (see core.interview_cache)
+INTERVIEW_DETAIL_CACHE = 'default'
+# Seconds a cached version is trusted without a query; bounds staleness when the cache is per-process
+INTERVIEW_VERSION_CACHE_TTL = 5
+INTERVIEW_PAYLOAD_CACHE_TTL = 300
+
+
+# Bulk interview import (POST /interviews/import/)
+BULK_IMPORT_CHUNK_SIZE = 500
+# Row errors listed in the report; the rest are only counted
+BULK_IMPORT_MAX_ERRORS = 1000
+
+
+# Interviews read per chunk by GET /interviews/export/
+EXPORT_CHUNK_SIZE = 200
+
+
+# Analytics rollups (see core.analytics); run `manage.py rebuild_analytics` after changing the pass score
+ANALYTICS_PASS_SCORE = 60
+
+
+# Email outbox (see `manage.py send_outbox_emails`)
+EMAIL_OUTBOX_BATCH_SIZE = 50
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+# Seconds before the first retry; doubles on every further attempt
+EMAIL_OUTBOX_RETRY_BASE = 30
+EMAIL_OUTBOX_LEASE_SECONDS = 300
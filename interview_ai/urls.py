@@ -14,14 +14,18 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path,include
 from rest_framework.routers import  DefaultRouter
-from core.views import InterviewViewSet,UserRegistrationView,LoginView,ProgrammingSkillViewSet
+from core import async_views
+from core.metrics import metrics_view
+from core.views import InterviewViewSet,UserRegistrationView,LoginView,ProgrammingSkillViewSet,GenerationJobViewSet,StatsView,AnalyticsView
 
 router = DefaultRouter()
 router.register(r'interviews', InterviewViewSet, basename='interview')
 router.register(r'skills', ProgrammingSkillViewSet, basename='skill')
+router.register(r'generation-jobs', GenerationJobViewSet, basename='generation-job')
 router.register(r'interviews', InterviewViewSet, basename='interviews')
 router.register(r'interviews', InterviewViewSet,basename='int')
 
@@ -31,6 +35,12 @@ urlpatterns = [
 
     path('register/',UserRegistrationView.as_view(),name='register'),
     path('login/',LoginView.as_view(),name='login'),
+    path('stats/',StatsView.as_view(),name='stats'),
+    path('analytics/',AnalyticsView.as_view(),name='analytics'),
+    # Served at METRICS_PATH, the same path MetricsMiddleware leaves unmeasured
+    path(settings.METRICS_PATH.lstrip('/'),metrics_view,name='metrics'),
+    path('async/interviews/<int:pk>/generate-questions/',async_views.generate_questions,name='interview-generate-questions-async'),
+    path('async/interviews/<int:pk>/submit-response/',async_views.submit_response,name='interview-submit-response-async'),
 
 
 ]